@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Compare the wall time of a large paged lease read with and without
+# compressed responses over a simulated slow link: a local HTTP server
+# answers the paged queries and sends at most RATE bytes per second.
+#
+#     python benchmarks/compression.py [count] [rate]
+#
+
+import gzip
+import io
+import json
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urlparse import parse_qs, urlparse
+
+from infoblox import infoblox
+
+
+def leases(count):
+    return [{
+        '_ref': 'lease/ZG5zLmxlYXNlJDEw%06d:10.%d.%d.%d/default' % (
+            i, i >> 16 & 255, i >> 8 & 255, i & 255),
+        'address': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255),
+        'hardware': '00:50:56:%02x:%02x:%02x' % (
+            i >> 16 & 255, i >> 8 & 255, i & 255),
+        'client_hostname': 'build%06d' % i,
+        'binding_state': 'ACTIVE',
+        'network': '10.%d.0.0/16' % (i >> 16 & 255),
+        'network_view': 'default',
+    } for i in range(count)]
+
+
+def gzipped(data):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    """ Paged WAPI lease queries over a slow link.
+    """
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        if '_page_id' in query:
+            start = int(query['_page_id'][0])
+            size = server.page_size
+        else:
+            start = 0
+            size = server.page_size = int(query['_max_results'][0])
+        end = start + size
+        page = {'result': server.objects[start:end]}
+        if end < len(server.objects):
+            page['next_page_id'] = str(end)
+        body = json.dumps(page).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzipped(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for offset in range(0, len(body), 16384):
+            chunk = body[offset:offset + 16384]
+            time.sleep(float(len(chunk)) / server.rate)
+            self.wfile.write(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+def read(port, compress):
+    """Return the wall time and the bytes received and decoded."""
+    iba_api = infoblox.Infoblox('127.0.0.1', 'foo', 'bar', '1.6',
+                                'default', 'default')
+    iba_api.util.base_url = 'http://127.0.0.1:%d/wapi/v1.6/' % port
+    iba_api.session.compress = compress
+    start = time.time()
+    for __ in iba_api.iter_lease(page_size=5000):
+        pass
+    elapsed = time.time() - start
+    return (elapsed,
+            sum(r.bytes_received for r in iba_api.session.history),
+            sum(r.bytes_decoded for r in iba_api.session.history))
+
+
+def main(count=50000, rate=2000000):
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.objects = leases(count)
+    server.rate = rate
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        print('%d leases, link of %d bytes/s' % (count, rate))
+        for compress in (False, True):
+            elapsed, received, decoded = read(server.server_port, compress)
+            print('compression %-3s %6.2fs  %10d bytes received, '
+                  '%10d decoded' % ('on' if compress else 'off', elapsed,
+                                    received, decoded))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Compare the response size and JSON decode time of large queries with the
+# minimal _return_fields of Infoblox.field_profiles and with the WAPI
+# default fields. A stub transport plays the server: it returns the fields
+# asked for, or the default fields of the object type.
+#
+#     python benchmarks/field_profiles.py [count]
+#
+
+import json
+import sys
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # Python 2
+    from urlparse import parse_qs, urlparse
+
+from infoblox import infoblox
+
+
+def hosts(count):
+    objects = []
+    for i in range(count):
+        name = 'host%06d.example.com' % i
+        address = '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255)
+        objects.append({
+            '_ref': 'record:host/ZG5zLmhvc3QkLl9kZWZhdWx0%06d:%s/default' % (
+                i, name),
+            'name': name,
+            'view': 'default',
+            'ipv4addrs': [{
+                '_ref': 'record:host_ipv4addr/ZG5zLmhvc3RfYWRkcmVzcyQ%06d:'
+                        '%s/%s/default' % (i, address, name),
+                'host': name,
+                'ipv4addr': address,
+                'configure_for_dhcp': False,
+            }],
+        })
+    return objects
+
+
+class StubAdapter(BaseAdapter):
+
+    """ Transport answering host searches from a list of host records.
+    """
+
+    # WAPI default fields of record:host
+    DEFAULT_FIELDS = ['name', 'view', 'ipv4addrs']
+
+    def __init__(self, objects):
+        super(StubAdapter, self).__init__()
+        self.objects = objects
+
+    def send(self, request, **kwargs):
+        query = parse_qs(urlparse(request.url).query,
+                         keep_blank_values=True)
+        if '_return_fields' in query:
+            fields = [f for f in query['_return_fields'][0].split(',') if f]
+        else:
+            fields = self.DEFAULT_FIELDS
+        objects = self.objects
+        if '_max_results' in query:
+            # exists() truncates the result with a negative maximum
+            objects = objects[:abs(int(query['_max_results'][0]))]
+        body = [dict((field, obj[field]) for field in ['_ref'] + fields)
+                for obj in objects]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def measure(iba_api, call):
+    """Return the response bytes and the seconds spent decoding them."""
+    bodies = []
+
+    def record(send, method, url, *args, **kwargs):
+        response = send(method, url, *args, **kwargs)
+        bodies.append(response.content)
+        return response
+
+    iba_api.session.middleware = []
+    iba_api.session.add_middleware(record)
+    call()
+    start = time.time()
+    for body in bodies:
+        json.loads(body.decode('utf-8'))
+    return sum(len(body) for body in bodies), time.time() - start
+
+
+def main(count=50000):
+    iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                'default', 'default')
+    iba_api.session.mount('https://', StubAdapter(hosts(count)))
+    query = {'name~': '^host', 'view': 'default'}
+
+    def without_profiles(call):
+        def run():
+            profiles = iba_api.field_profiles
+            iba_api.field_profiles = {}
+            try:
+                call()
+            finally:
+                iba_api.field_profiles = profiles
+        return run
+
+    search = lambda: iba_api.get_host_by_regexp('^host')  # noqa: E731
+    rows = [
+        ('get_host_by_regexp', without_profiles(search), search),
+        ('exists', lambda: iba_api.util.request_json('GET', 'record:host',
+                                                     query),
+         lambda: iba_api.exists('record:host', query)),
+    ]
+    print('%d host records' % count)
+    for name, default, minimal in rows:
+        default_bytes, default_time = measure(iba_api, default)
+        minimal_bytes, minimal_time = measure(iba_api, minimal)
+        print('%-20s default fields %10d bytes %6.3fs decode, '
+              'minimal %10d bytes %6.3fs decode' %
+              (name, default_bytes, default_time, minimal_bytes,
+               minimal_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
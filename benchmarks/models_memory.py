@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Compare the memory held by WAPI results decoded into plain dictionaries
+# and into the record objects of infoblox.models.
+#
+#     python benchmarks/models_memory.py [count]
+#
+
+import json
+import sys
+import tracemalloc
+
+from infoblox import models
+
+
+def leases(count):
+    return json.dumps([{
+        '_ref': 'lease/ZG5zLmxlYXNlJDEw:10.%d.%d.%d/default' % (
+            i >> 16 & 255, i >> 8 & 255, i & 255),
+        'address': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255),
+        'hardware': '00:50:56:%02x:%02x:%02x' % (
+            i >> 16 & 255, i >> 8 & 255, i & 255),
+        'client_hostname': 'build%06d' % i,
+        'binding_state': 'ACTIVE',
+        'network': '10.%d.0.0/16' % (i >> 16 & 255),
+        'network_view': 'default',
+    } for i in range(count)])
+
+
+def measure(decode, text):
+    """Return the bytes still allocated after decoding text."""
+    tracemalloc.start()
+    try:
+        result = decode(text)
+        current, __ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+
+def main(count=100000):
+    text = leases(count)
+    as_dicts = measure(json.loads, text)
+    as_models = measure(models.decode, text)
+    print('%d leases' % count)
+    print('dicts:  %10d bytes (%d per lease)' % (as_dicts, as_dicts // count))
+    print('models: %10d bytes (%d per lease)' % (as_models,
+                                                  as_models // count))
+    print('saved:  %.0f%%' % (100.0 - 100.0 * as_models / as_dicts))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
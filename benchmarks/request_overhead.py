@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Measure the Python overhead per WAPI call: the time spent in this package
+# and requests for a call whose transport answers instantly, with the
+# environment settings looked up once per host (the default) and on every
+# request (plain requests behaviour).
+#
+#     python benchmarks/request_overhead.py [count]
+#
+
+import sys
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+from infoblox import infoblox
+
+HOST = (b'[{"_ref": "record:host/ZG5zLmhvc3QkLl9kZWZhdWx0:a.example.com/'
+        b'default", "name": "a.example.com", "view": "default", '
+        b'"ipv4addrs": [{"ipv4addr": "10.0.0.1"}]}]')
+
+
+class StubAdapter(BaseAdapter):
+
+    """ Transport answering every request with one host record.
+    """
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = HOST
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def api(cache_environment):
+    iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                'default', 'default')
+    iba_api.session.mount('https://', StubAdapter())
+    if not cache_environment:
+        iba_api.session.merge_environment_settings = \
+            requests.Session.merge_environment_settings.__get__(
+                iba_api.session)
+    return iba_api
+
+
+def per_call(call, count):
+    """Return the microseconds per call."""
+    call()
+    start = time.time()
+    for __ in range(count):
+        call()
+    return (time.time() - start) / count * 1e6
+
+
+def main(count=5000):
+    print('%d calls each, microseconds per call' % count)
+    for cache_environment in (False, True):
+        iba_api = api(cache_environment)
+        print('%-28s get_host %6.0f  get_ip_by_host %6.0f' % (
+            'environment cached:' if cache_environment
+            else 'environment per request:',
+            per_call(lambda: iba_api.get_host('a.example.com'), count),
+            per_call(lambda: iba_api.get_ip_by_host('a.example.com'),
+                     count)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# Client-side planning of network allocations within a network container.
+#
+# An Allocator loads the child networks and network containers of a network
+# container once and keeps the free address space as a sorted list of
+# disjoint intervals. Free blocks, fragmentation and any number of
+# allocations are then worked out in memory; the allocations can be created
+# on the grid afterwards.
+#
+# Example:
+#
+#     plan = allocator.Allocator.load(iba_api, '10.20.0.0/16')
+#     print(plan.largest_free_block(), plan.fragmentation())
+#     networks = plan.next_available(24, count=200)
+#     results = plan.commit(iba_api, jobs=8)
+#
+
+import bisect
+
+from .infoblox import (InfobloxBadInputParameter,
+                       InfobloxNoNetworkAvailableException)
+from .resultset import int_to_ip, parse_network
+
+
+def _range(network):
+    first, mask = parse_network(network)
+    return first, first + (~mask & 0xffffffff) + 1
+
+
+def _cidr(start, size):
+    return '%s/%d' % (int_to_ip(start), 33 - size.bit_length())
+
+
+def _blocks(start, end):
+    """Yield (start, size) of the largest aligned blocks covering the
+    addresses from start up to (excluding) end."""
+    while start < end:
+        size = start & -start if start else 1 << 32
+        while size > end - start:
+            size >>= 1
+        yield start, size
+        start += size
+
+
+class Allocator(object):
+
+    """ Free space of a network container, planned locally.
+    """
+
+    def __init__(self, networkcontainer, used=()):
+        """ Class initialization method
+        :param networkcontainer: network container in CIDR format
+        :param used: networks and network containers in CIDR format which
+            already take space in the container
+        """
+        self.networkcontainer = networkcontainer
+        start, end = _range(networkcontainer)
+        self._starts = [start]
+        self._ends = [end]
+        self.allocated = []
+        for network in used:
+            self._reserve(*_range(network))
+
+    @classmethod
+    def load(cls, api, networkcontainer):
+        """Read the networks and network containers directly within a
+        network container, one paged query each.
+        :param api: Infoblox object
+        :param networkcontainer: network container in CIDR format
+        """
+        used = []
+        for wapi_type in ('network', 'networkcontainer'):
+            used.extend(obj['network'] for obj in api.util.get_paged(
+                wapi_type,
+                query_params={'network_container': networkcontainer,
+                              'network_view': api.iba_network_view},
+                fields=['network']))
+        return cls(networkcontainer, used)
+
+    def _reserve(self, start, end):
+        """Remove the addresses from start up to end from the free space."""
+        first = last = bisect.bisect_right(self._ends, start)
+        starts, ends = [], []
+        while last < len(self._starts) and self._starts[last] < end:
+            if self._starts[last] < start:
+                starts.append(self._starts[last])
+                ends.append(start)
+            if self._ends[last] > end:
+                starts.append(end)
+                ends.append(self._ends[last])
+            last += 1
+        self._starts[first:last] = starts
+        self._ends[first:last] = ends
+
+    def is_free(self, network):
+        """Return whether all addresses of a network are free."""
+        start, end = _range(network)
+        index = bisect.bisect_right(self._ends, start)
+        return (index < len(self._starts) and
+                self._starts[index] <= start and end <= self._ends[index])
+
+    def allocate(self, network):
+        """Take a specific network from the free space.
+        :param network: network in CIDR format
+        """
+        if not self.is_free(network):
+            raise InfobloxNoNetworkAvailableException(
+                'Network %s is not free in %s' %
+                (network, self.networkcontainer))
+        self._reserve(*_range(network))
+        self.allocated.append(network)
+        return network
+
+    def release(self, network):
+        """Return an allocated network to the free space.
+        :param network: network in CIDR format
+        """
+        self.allocated.remove(network)
+        start, end = _range(network)
+        index = bisect.bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+        # merge with the neighbouring intervals
+        if index + 1 < len(self._starts) and \
+                self._starts[index + 1] == self._ends[index]:
+            self._ends[index] = self._ends.pop(index + 1)
+            self._starts.pop(index + 1)
+        if index > 0 and self._ends[index - 1] == self._starts[index]:
+            self._ends[index - 1] = self._ends.pop(index)
+            self._starts.pop(index)
+
+    def _free_blocks(self):
+        for start, end in zip(self._starts, self._ends):
+            for block in _blocks(start, end):
+                yield block
+
+    def free_blocks(self):
+        """Return the free space as the list of the largest aligned
+        networks in CIDR format, in address order."""
+        return [_cidr(start, size) for start, size in self._free_blocks()]
+
+    def free_addresses(self):
+        """Return the number of free addresses."""
+        return sum(end - start
+                   for start, end in zip(self._starts, self._ends))
+
+    def largest_free_block(self):
+        """Return the largest free network in CIDR format (the lowest one
+        if several are equally large), or None if nothing is free."""
+        best = None
+        for start, size in self._free_blocks():
+            if best is None or size > best[1]:
+                best = (start, size)
+        return None if best is None else _cidr(*best)
+
+    def fragmentation(self):
+        """Return how fragmented the free space is, from 0.0 (all free
+        space is in one block) towards 1.0 (the largest block is a tiny part
+        of the free space)."""
+        free = self.free_addresses()
+        if not free:
+            return 0.0
+        largest = max(size for __, size in self._free_blocks())
+        return 1.0 - float(largest) / free
+
+    def next_available(self, prefixlen, count=1, best_fit=True):
+        """Allocate networks of a given size.
+        :param prefixlen: prefix length of the networks (e.g. 24)
+        :param count: number of networks to allocate; if they do not all
+            fit, none is allocated
+        :param best_fit: take each network from the smallest free block it
+            fits in, keeping large blocks whole; otherwise take the lowest
+            free network like the grid's next_available_network does
+        :return: list of the networks in CIDR format
+        """
+        container_prefixlen = int(self.networkcontainer.partition('/')[2])
+        if not container_prefixlen <= prefixlen <= 32:
+            raise InfobloxBadInputParameter(
+                'Prefix length %d does not fit in %s' %
+                (prefixlen, self.networkcontainer))
+        wanted = 1 << (32 - prefixlen)
+        networks = []
+        for __ in range(count):
+            candidates = [(size, start) if best_fit else (start, size)
+                          for start, size in self._free_blocks()
+                          if size >= wanted]
+            if not candidates:
+                # all or nothing
+                for network in networks:
+                    self.release(network)
+                raise InfobloxNoNetworkAvailableException(
+                    'No free /%d in %s after allocating %d' %
+                    (prefixlen, self.networkcontainer, len(networks)))
+            first = min(candidates)
+            start = first[1] if best_fit else first[0]
+            networks.append(self.allocate(_cidr(start, wanted)))
+        return networks
+
+    def commit(self, api, jobs=1, batch_size=None):
+        """Create the allocated networks on the grid.
+        :param api: Infoblox object
+        :param jobs: number of requests running concurrently
+        :param batch_size: networks per WAPI multi-object request (optional)
+        :return: list of (network, error) tuples in address order, where
+            error is None for networks which were created
+        """
+        return api.create_networks(self.allocated, jobs=jobs,
+                                   batch_size=batch_size)
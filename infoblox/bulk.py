@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Helpers for running many API calls concurrently.
+#
+
+import collections
+
+# threading.local objects whose attributes the worker threads of imap() take
+# over from the thread calling it
+_inherited = []
+
+
+def inherit(local):
+    """Make the worker threads of imap() see the calling thread's attributes
+    of a threading.local object.
+    :param local: threading.local object
+    """
+    _inherited.append(local)
+
+
+def _inheriting(func):
+    """Wrap func to run with the calling thread's inherited attributes."""
+    state = [(local, dict(local.__dict__)) for local in _inherited]
+
+    def run(item):
+        for local, attributes in state:
+            local.__dict__.update(attributes)
+        try:
+            return func(item)
+        finally:
+            for local, __ in state:
+                local.__dict__.clear()
+    return run
+
+
+def imap(func, items, jobs=1):
+    """Like map(), with up to ``jobs`` calls running in threads at once.
+    Results are yielded in input order while reading at most 2 * jobs
+    items ahead, so arbitrarily long inputs use constant memory. The
+    threads inherit the caller's attributes of locals registered with
+    inherit().
+    :param func: callable applied to every item
+    :param items: iterable of items
+    :param jobs: number of concurrent calls
+    """
+    if jobs <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    func = _inheriting(func)
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Record and replay WAPI traffic.
+#
+# A cassette is a JSON-lines file (gzip compressed when the file name ends
+# in ``.gz``) with one entry per HTTP exchange: method, URL, request body,
+# response status, headers and content, and the time the exchange took.
+#
+# Example:
+#
+#     iba_api = infoblox.Infoblox(...)
+#     recorder = cassette.record(iba_api.session, 'workload.jsonl.gz')
+#     run_workload(iba_api)
+#     recorder.close()
+#
+#     iba_api = infoblox.Infoblox(...)
+#     cassette.replay(iba_api.session, 'workload.jsonl.gz', latency_scale=0)
+#     run_workload(iba_api)
+#
+
+import base64
+import collections
+import gzip
+import io
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .infoblox import InfobloxException
+
+
+class CassetteError(InfobloxException):
+    pass
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+def _body_text(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode('utf-8', 'replace')
+    return body
+
+
+def _key(method, url, body):
+    return (method.upper(), url, _body_text(body))
+
+
+class RecordingAdapter(HTTPAdapter):
+
+    """ Transport adapter which performs real requests and appends every
+    exchange to a cassette file.
+    """
+
+    def __init__(self, path, **kwargs):
+        """ Class initialization method
+        :param path: cassette file to write
+        """
+        super(RecordingAdapter, self).__init__(**kwargs)
+        self.path = path
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        start = time.time()
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        content = response.content
+        entry = {
+            'method': request.method,
+            'url': request.url,
+            'body': _body_text(request.body),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {'Content-Type': response.headers.get('Content-Type')},
+            'elapsed': round(time.time() - start, 6),
+        }
+        try:
+            entry['content'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['content_b64'] = base64.b64encode(content).decode('ascii')
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True)
+        with self._lock:
+            self._file.write(line + u'\n')
+        return response
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        super(RecordingAdapter, self).close()
+
+
+class ReplayAdapter(BaseAdapter):
+
+    """ Transport adapter which serves responses from a cassette file
+    instead of talking to the grid.
+    """
+
+    def __init__(self, path, latency_scale=1.0, repeat=False,
+                 sleep=time.sleep):
+        """ Class initialization method
+        :param path: cassette file to read
+        :param latency_scale: multiplier for the recorded latency
+            (0 replays as fast as possible)
+        :param repeat: serve recorded responses again once all responses
+            for a request have been used
+        :param sleep: function used to wait out the scaled latency
+        """
+        super(ReplayAdapter, self).__init__()
+        self.path = path
+        self.latency_scale = latency_scale
+        self.repeat = repeat
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._entries = collections.defaultdict(collections.deque)
+        with _open(path, 'r') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = _key(entry['method'], entry['url'], entry['body'])
+                self._entries[key].append(entry)
+
+    def send(self, request, **kwargs):
+        key = _key(request.method, request.url, request.body)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteError('No recorded response for %s %s' %
+                                    (request.method, request.url))
+            entry = entries.popleft()
+            if self.repeat:
+                entries.append(entry)
+
+        if self.latency_scale:
+            self._sleep(entry['elapsed'] * self.latency_scale)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(
+            (k, v) for k, v in entry.get('headers', {}).items()
+            if v is not None)
+        if 'content_b64' in entry:
+            response._content = base64.b64decode(entry['content_b64'])
+        else:
+            response._content = entry.get('content', '').encode('utf-8')
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+def record(session, path, **kwargs):
+    """Record all traffic of a session to a cassette.
+    :param session: requests session (e.g. Infoblox.session)
+    :param path: cassette file to write
+    :return: the mounted adapter; close it to finish the cassette
+    """
+    adapter = RecordingAdapter(path, **kwargs)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
+
+
+def replay(session, path, latency_scale=1.0, repeat=False):
+    """Serve all requests of a session from a cassette.
+    :param session: requests session (e.g. Infoblox.session)
+    :param path: cassette file to read
+    :param latency_scale: multiplier for the recorded latency
+    :param repeat: reuse responses once they have all been served
+    :return: the mounted adapter
+    """
+    adapter = ReplayAdapter(path, latency_scale=latency_scale, repeat=repeat)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
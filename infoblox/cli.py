@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+import sys
+import threading
+
 import click
-from .infoblox import Infoblox
+from .lazy import LazyObject
+
+# requests, json and the Infoblox class are imported on first use only, so
+# that --help, usage errors and daemon forwarding start up quickly
 
 
 class InvalidParameter(Exception):
@@ -22,11 +30,263 @@ class InvalidParameter(Exception):
               help='Default network view')
 @click.option('--verify-ssl/--no-verify-ssl', envvar='IB_VERIFY_SSL',
               default=False, help='Enable SSL verification')
+@click.option('--slow-threshold', envvar='IB_SLOW_THRESHOLD', type=float,
+              default=None,
+              help='Log API calls taking at least this many seconds')
+@click.option('--dump-requests', envvar='IB_DUMP_REQUESTS', is_flag=True,
+              default=False,
+              help='Print the recent API calls and timings to stderr on exit')
+@click.option('--compression/--no-compression', envvar='IB_COMPRESSION',
+              default=True, help='Ask for compressed responses')
 @click.pass_context
-def cli(ctx, ipaddr, user, password, wapi_version, dns_view, network_view, verify_ssl):
+def cli(ctx, ipaddr, user, password, wapi_version, dns_view, network_view, verify_ssl,
+        slow_threshold, dump_requests, compression):
     '''Clinfobloxs is a command line interface for the Infoblox API.'''
-    ctx.obj = Infoblox(ipaddr, user, password, wapi_version,
-                       dns_view, network_view, verify_ssl)
+    # commands run by the daemon reuse the daemon's Infoblox object; the
+    # connection options were checked by execute()
+    shared = ctx.obj is not None
+    if not shared:
+        ctx.obj = LazyObject(_make_api, ipaddr, user, password, wapi_version,
+                             dns_view, network_view, verify_ssl)
+    if slow_threshold is not None:
+        _set_session(ctx, shared, slow_threshold=slow_threshold)
+    # a new session compresses already, don't create it just for that
+    if shared or not compression:
+        _set_session(ctx, shared, compress=compression)
+    if dump_requests:
+        stderr = click.get_text_stream('stderr')
+        ctx.call_on_close(lambda: ctx.obj.session.dump_history(stderr))
+
+
+def _set_session(ctx, shared, **settings):
+    '''Change session settings. If the session is shared with other
+    commands, possibly running concurrently, they are overridden for this
+    command's thread only.'''
+    session = ctx.obj.session
+    if shared:
+        previous = session.override(**settings)
+        ctx.call_on_close(lambda: session.restore(previous))
+        return
+    for name, value in settings.items():
+        setattr(session, name, value)
+
+
+def _make_api(*args):
+    from .infoblox import Infoblox
+    return Infoblox(*args)
+
+
+@cli.command('daemon')
+@click.option('--socket', 'socket_path', envvar='IB_DAEMON_SOCKET',
+              required=True, help='Path of the Unix socket to listen on')
+@click.pass_obj
+def run_daemon(api, socket_path):
+    '''Keep a warm API session and serve commands over a Unix socket.
+
+    Set IB_DAEMON_SOCKET to the same path and every infoblox command is
+    forwarded to the daemon.
+    '''
+    from . import daemon
+    api.session.install_dump_handler()
+    click.echo('serving on %s' % (socket_path))
+    daemon.serve(socket_path, lambda argv: execute(api, argv))
+
+
+@cli.command('batch')
+@click.argument('commands', type=click.File('r'), default='-')
+@click.option('--jobs', default=1, type=click.IntRange(1, None),
+              help='Number of commands to run concurrently')
+@click.pass_context
+def run_batch(ctx, commands, jobs):
+    '''Run many commands through one API session.
+
+    COMMANDS is a file (default: stdin) with one command line per line,
+    either shell-quoted ("cname create a.example.com b.example.com") or a
+    JSON list of arguments. One JSON result per command is written to
+    stdout, in input order.
+    '''
+    import json
+    from .bulk import imap
+    api = ctx.obj
+    if jobs > 1:
+        api.session.ensure_pool_size(jobs)
+
+    def run(numbered_line):
+        lineno, argv = numbered_line
+        if isinstance(argv, Exception):
+            return lineno, None, 2, '', 'Error: %s\n' % (argv,)
+        return (lineno, argv) + execute(api, argv)
+
+    total = failed = 0
+    results = imap(run, _batch_commands(commands), jobs)
+    for lineno, argv, exit_code, out, err in results:
+        total += 1
+        if exit_code != 0:
+            failed += 1
+        click.echo(json.dumps({'line': lineno, 'argv': argv,
+                               'exit_code': exit_code,
+                               'stdout': out, 'stderr': err}))
+    click.echo('%d commands, %d failed' % (total, failed), err=True)
+    if failed:
+        ctx.exit(1)
+
+
+def _batch_commands(lines):
+    '''Yield (line number, argv) for every command in a batch file.'''
+    import json
+    import shlex
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            if line.startswith('['):
+                argv = [str(arg) for arg in json.loads(line)]
+            else:
+                argv = shlex.split(line)
+            command = _local_command(argv)
+            if command:
+                raise ValueError('%s cannot be run from a batch' % command)
+        except ValueError as e:
+            argv = e
+        yield lineno, argv
+
+
+@cli.command('shell')
+@click.option('--cache-ttl', default=300.0, type=float,
+              help='Seconds read results are reused (0 disables the cache)')
+@click.pass_obj
+def run_shell(api, cache_ttl):
+    '''Interactive shell running commands through one API session.
+
+    Reads are cached until something is written or they expire; names and
+    networks from cached results are offered for tab completion.
+    '''
+    from . import shell
+    from .infoblox import ReadCache
+    if cache_ttl > 0:
+        api.session.cache = ReadCache(ttl=cache_ttl)
+    shell.run(api, cli, execute)
+
+
+FORMATS = ('text', 'json', 'jsonl', 'csv')
+
+
+def format_option(f):
+    '''Add the --format option of read commands.'''
+    return click.option('--format', 'fmt', type=click.Choice(FORMATS),
+                        default='text',
+                        help='Output format (jsonl and csv are streamed)')(f)
+
+
+def full_option(f):
+    '''Add the --full option of search commands.'''
+    return click.option('--full', default=False, is_flag=True,
+                        help='Return complete objects in machine-readable '
+                        'formats instead of the default fields.')(f)
+
+
+def _fields(return_fields):
+    return return_fields.split(',') if return_fields else None
+
+
+def _check_csv_columns(fmt, return_fields, full=None):
+    '''Reject csv output of a paged read without its columns, which are
+    written before the first object arrives. full is None for commands
+    without --full.'''
+    if fmt == 'csv' and not (return_fields or full):
+        raise click.UsageError('--format csv needs --return-fields' +
+                               ('' if full is None else ' or --full'))
+
+
+def _check_search_format(fmt, return_fields, full=None):
+    '''Reject the options a search command only has for machine-readable
+    formats, its text output is the list of names.'''
+    if fmt == 'text' and (return_fields or full):
+        raise click.UsageError('--return-fields and --full need --format '
+                               'json, jsonl or csv')
+    _check_csv_columns(fmt, return_fields, full)
+
+
+def _search_columns(wapi_type, return_fields, full):
+    '''Return the fields a search command writes: --return-fields, plus the
+    commonly used fields of the object type with --full.'''
+    if not full:
+        return return_fields
+    from .infoblox import FULL_FIELDS
+    columns = _fields(return_fields) or []
+    columns.extend(f for f in FULL_FIELDS[wapi_type] if f not in columns)
+    return ','.join(columns)
+
+
+def _output(data, fmt, return_fields=None):
+    '''Write a read command's result in a machine-readable format.'''
+    from . import formats
+    formats.emit(data, fmt, _fields(return_fields))
+
+
+def _stream(rows, fmt, return_fields=None):
+    '''Write objects from a paged query as they arrive.'''
+    from . import formats
+    formats.stream(rows, fmt, _fields(return_fields))
+
+
+@cli.command('reconcile')
+@click.argument('inventory', type=click.Path(exists=True, dir_okay=False))
+@click.option('--zone', default=None,
+              help='Zone to reconcile (default: zone of the inventory)')
+@click.option('--confirm', default=False, is_flag=True,
+              help='Apply the plan; without it nothing is changed')
+@click.option('--jobs', default=1, type=click.IntRange(1, None),
+              help='Number of requests to run concurrently')
+@click.option('--batch-size', default=None, type=click.IntRange(1, None),
+              help='Changes sent per WAPI multi-object request')
+@format_option
+@click.pass_context
+def run_reconcile(ctx, inventory, zone, confirm, jobs, batch_size, fmt):
+    '''Make the DNS records of a zone match an inventory.
+
+    INVENTORY is a JSON or YAML file listing the host, a, cname and txt
+    records the zone should have. Records of those types which are not in
+    the inventory are deleted. The plan is printed and, with --confirm,
+    applied.
+    '''
+    import json
+    from . import reconcile
+    from .infoblox import InfobloxException
+    api = ctx.obj
+    try:
+        changes = reconcile.plan(api, reconcile.load_inventory(inventory),
+                                 zone=zone)
+    except InfobloxException as e:
+        raise click.ClickException(str(e))
+    if confirm:
+        changes = reconcile.apply(api, changes, jobs=jobs,
+                                  batch_size=batch_size)
+
+    failed = []
+
+    def rows():
+        for change in changes:
+            if change.status == 'failed':
+                failed.append(change)
+            yield change
+
+    if fmt == 'text':
+        for change in rows():
+            click.echo('%-6s %-5s %-7s %s %s' % (
+                change.action, change.type, change.status, change.name,
+                change.detail or json.dumps(change.data or {},
+                                            sort_keys=True)))
+    else:
+        _stream((change._asdict() for change in rows()), fmt,
+                ','.join(reconcile.Change._fields))
+    if not confirm:
+        click.echo('DRY-RUN -- NO CHANGES MADE (use --confirm to apply)',
+                   err=True)
+    if failed:
+        click.echo('%d changes failed' % len(failed), err=True)
+        ctx.exit(1)
 
 
 @cli.group()
@@ -74,33 +334,45 @@ def hostrecord():
 @click.argument('fqdn')
 @click.option('--return-fields',
               help='Comma-separated list of fields to include in output.')
+@format_option
 @click.pass_obj
-def get_by_fqdn(api, fqdn, return_fields):
+def get_by_fqdn(api, fqdn, return_fields, fmt):
     '''Get a host record.'''
     data = api.get_host(fqdn, return_fields)
-    click.echo(data)
+    if fmt == 'text':
+        click.echo(data)
+    else:
+        _output(data, fmt)
 
 
 @hostrecord.command('get_by_alias')
 @click.argument('alias')
 @click.option('--return-fields',
               help='Comma-separated list of fields to include in output.')
+@format_option
 @click.pass_obj
-def get_host_by_alias(api, alias, return_fields):
+def get_host_by_alias(api, alias, return_fields, fmt):
     '''Get Host by Alias'''
     data = api.get_host_by_alias(alias, return_fields)
-    click.echo(data)
+    if fmt == 'text':
+        click.echo(data)
+    else:
+        _output(data, fmt)
 
 
 @hostrecord.command('get_by_ip')
 @click.argument('address')
 @click.option('--return-fields',
               help='Comma-separated list of fields to include in output.')
+@format_option
 @click.pass_obj
-def get_host_by_ip(api, address, return_fields):
+def get_host_by_ip(api, address, return_fields, fmt):
     '''Get Host by IP Address'''
     data = api.get_host_by_ip(address, return_fields)
-    click.echo(data)
+    if fmt == 'text':
+        click.echo(data)
+    else:
+        _output(data, fmt)
 
 
 @hostrecord.command('create')
@@ -144,47 +416,97 @@ def delete_host_alias(api, host_fqdn, host_alias):
 
 @hostrecord.command('by_extattrs')
 @click.argument('extattrs')
+@click.option('--return-fields',
+              help='Comma-separated list of fields to include in output.')
+@full_option
+@format_option
 @click.pass_obj
-def get_host_by_extattrs(api, extattrs):
+def get_host_by_extattrs(api, extattrs, return_fields, full, fmt):
     '''Get host by extensible attributes.'''
-    click.echo('getting host by extensible attributes')
-    api.get_host_by_extattrs(extattrs)
+    _check_search_format(fmt, return_fields, full)
+    if fmt == 'text':
+        click.echo('getting host by extensible attributes')
+        api.get_host_by_extattrs(extattrs)
+    else:
+        _stream(api.iter_host_by_extattrs(extattrs, _fields(return_fields),
+                                          full=full),
+                fmt, _search_columns('record:host', return_fields, full))
 
 
 @hostrecord.command('by_regexp')
 @click.argument('regexp')
+@click.option('--return-fields',
+              help='Comma-separated list of fields to include in output.')
+@full_option
+@format_option
 @click.pass_obj
-def get_host_by_regexp(api, regexp):
+def get_host_by_regexp(api, regexp, return_fields, full, fmt):
     '''Get host by fqdn regexp filter.'''
-    click.echo('getting host by fqdn regexp filter')
-    api.get_host_by_regexp(regexp)
+    _check_search_format(fmt, return_fields, full)
+    if fmt == 'text':
+        click.echo('getting host by fqdn regexp filter')
+        api.get_host_by_regexp(regexp)
+    else:
+        _stream(api.iter_host_by_regexp(regexp, _fields(return_fields),
+                                        full=full),
+                fmt, _search_columns('record:host', return_fields, full))
 
 
 @hostrecord.command('extattrs')
 @click.argument('fqdn')
+@format_option
 @click.pass_obj
-def get_host_extattrs(api, fqdn):
+def get_host_extattrs(api, fqdn, fmt):
     '''Get host extensible attributes'''
-    click.echo('getting host extensible attributes %s ' % (fqdn))
-    click.echo(api.get_host_extattrs(fqdn))
+    if fmt == 'text':
+        click.echo('getting host extensible attributes %s ' % (fqdn))
+        click.echo(api.get_host_extattrs(fqdn))
+    else:
+        _output(api.get_host_extattrs(fqdn), fmt)
 
 
 @hostrecord.command('get')
 @click.argument('fqdn')
+@format_option
 @click.pass_obj
-def get_host(api, fqdn):
+def get_host(api, fqdn, fmt):
     '''Get a host record.'''
-    click.echo('get host record %s ' % (fqdn))
-    click.echo(api.get_host(fqdn))
+    if fmt == 'text':
+        click.echo('get host record %s ' % (fqdn))
+        click.echo(api.get_host(fqdn))
+    else:
+        _output(api.get_host(fqdn), fmt)
 
 
 @hostrecord.command('by_ip')
-@click.argument('ip')
+@click.argument('ip', required=False)
+@click.option('--file', 'ip_file', type=click.File('r'), default=None,
+              help='Look up the IP addresses listed in a file, one per '
+              'line ("-" for stdin), with a few range queries.')
+@click.option('--jobs', default=1, type=click.IntRange(1, None),
+              help='Number of requests to run concurrently with --file')
+@format_option
 @click.pass_obj
-def get_host_by_ip(api, ip):
+def get_host_by_ip(api, ip, ip_file, jobs, fmt):
     '''Get a host by ip.'''
-    click.echo('getting host record by ip %s ' % (ip))
-    click.echo(api.get_host_by_ip(ip))
+    if (ip is None) == (ip_file is None):
+        raise click.UsageError('Give either IP or --file')
+    if ip_file is not None:
+        ips = [line.strip() for line in ip_file
+               if line.strip() and not line.startswith('#')]
+        names = api.get_hosts_by_ips(ips, jobs=jobs)
+        if fmt == 'text':
+            for address in ips:
+                click.echo('%s %s' % (address, ','.join(names[address])))
+        else:
+            _output([{'ip': address, 'names': names[address]}
+                     for address in ips], fmt, 'ip,names')
+        return
+    if fmt == 'text':
+        click.echo('getting host record by ip %s ' % (ip))
+        click.echo(api.get_host_by_ip(ip))
+    else:
+        _output(api.get_host_by_ip(ip), fmt)
 
 
 @cli.group()
@@ -223,34 +545,90 @@ def next_available_network(api, networkcontainer, cidr):
 
 @network.command('get')
 @click.argument('network')
+@format_option
 @click.pass_obj
-def get_networkobject(api, network):
-    click.echo('getting networkobject %s ' % (network))
-    click.echo(api.get_network(network))
+def get_networkobject(api, network, fmt):
+    if fmt == 'text':
+        click.echo('getting networkobject %s ' % (network))
+        click.echo(api.get_network(network))
+    else:
+        _output(api.get_network(network), fmt)
 
 
 @network.command('by_ip')
 @click.argument('ip')
+@format_option
 @click.pass_obj
-def get_network_by_ip(api, ip):
-    click.echo('getting network by ip %s' % (ip))
-    click.echo(api.get_network_by_ip(ip))
+def get_network_by_ip(api, ip, fmt):
+    if fmt == 'text':
+        click.echo('getting network by ip %s' % (ip))
+        click.echo(api.get_network_by_ip(ip))
+    else:
+        _output(api.get_network_by_ip(ip), fmt)
 
 
 @network.command('by_extattrs')
 @click.argument('extattrs')
+@click.option('--return-fields',
+              help='Comma-separated list of fields to include in output.')
+@full_option
+@format_option
 @click.pass_obj
-def get_network_by_extattrs(api, extattrs):
-    click.echo('getting network by extensible attributes %s' % (extattrs))
-    click.echo(api.get_network_by_extattrs(extattrs))
+def get_network_by_extattrs(api, extattrs, return_fields, full, fmt):
+    _check_search_format(fmt, return_fields, full)
+    if fmt == 'text':
+        click.echo('getting network by extensible attributes %s' % (extattrs))
+        click.echo(api.get_network_by_extattrs(extattrs))
+    else:
+        _stream(api.iter_network_by_extattrs(extattrs,
+                                             _fields(return_fields),
+                                             full=full),
+                fmt, _search_columns('network', return_fields, full))
 
 
 @network.command('extattrs')
 @click.argument('network')
+@format_option
 @click.pass_obj
-def get_network_extattrs(api, network):
-    click.echo('getting network extensible attributes %s' % (network))
-    click.echo(api.get_network_extattrs(network))
+def get_network_extattrs(api, network, fmt):
+    if fmt == 'text':
+        click.echo('getting network extensible attributes %s' % (network))
+        click.echo(api.get_network_extattrs(network))
+    else:
+        _output(api.get_network_extattrs(network), fmt)
+
+
+@network.command('utilization')
+@click.argument('network')
+@click.option('--container', is_flag=True, default=False,
+              help='NETWORK is a network container; report all networks '
+                   'within it')
+@click.option('--jobs', default=1, type=click.IntRange(1, None),
+              help='Number of networks read concurrently')
+@click.option('--blocks', default=3, type=click.IntRange(0, None),
+              help='Number of largest free blocks to report')
+@format_option
+@click.pass_obj
+def get_network_utilization(api, network, container, jobs, blocks, fmt):
+    '''Used, free, DHCP and static addresses of a network.'''
+    if container:
+        results = api.iter_container_utilization(network, jobs=jobs,
+                                                 blocks=blocks)
+    else:
+        results = [api.get_network_utilization(network, blocks=blocks)]
+    if fmt != 'text':
+        _stream((result.as_dict() for result in results), fmt,
+                'network,total,used,free,dhcp,static,percent_used,'
+                'free_blocks')
+        return
+    click.echo('%-18s %8s %8s %8s %8s %8s %6s  %s' % (
+        'network', 'total', 'used', 'free', 'dhcp', 'static', 'used%',
+        'largest free blocks'))
+    for result in results:
+        click.echo('%-18s %8d %8d %8d %8d %8d %6.1f  %s' % (
+            result.network, result.total, result.used, result.free,
+            result.dhcp, result.static, result.percent_used,
+            ' '.join(result.free_blocks)))
 
 
 @network.command('update_extattrs')
@@ -318,10 +696,18 @@ def delete_txt_record(api, fqdn):
 
 @txtrecord.command('by_regexp')
 @click.argument('regexp')
+@click.option('--return-fields',
+              help='Comma-separated list of fields to include in output.')
+@format_option
 @click.pass_obj
-def get_txt_by_regexp(api, regexp):
-    click.echo('getting text record by regexp  %s ' % (regexp))
-    click.echo(api.get_txt_by_regexp(regexp))
+def get_txt_by_regexp(api, regexp, return_fields, fmt):
+    _check_search_format(fmt, return_fields)
+    if fmt == 'text':
+        click.echo('getting text record by regexp  %s ' % (regexp))
+        click.echo(api.get_txt_by_regexp(regexp))
+    else:
+        _stream(api.iter_txt_by_regexp(regexp, _fields(return_fields)),
+                fmt, return_fields)
 
 
 @cli.group()
@@ -350,10 +736,14 @@ def delete_dhcp_range(api, start_ip_v4, end_ip_v4):
 
 @dhcp.command('get')
 @click.argument('network')
+@format_option
 @click.pass_obj
-def get_dhcp_range(api, network):
-    click.echo('Getting DHCP IP range for %s ' % (network))
-    api.get_dhcp_range(network)
+def get_dhcp_range(api, network, fmt):
+    if fmt == 'text':
+        click.echo('Getting DHCP IP range for %s ' % (network))
+        api.get_dhcp_range(network)
+    else:
+        _output(api.get_dhcp_range(network), fmt)
 
 
 @cli.group()
@@ -372,10 +762,14 @@ def get_next_available_ip(api, network):
 
 @ip.command('by_host')
 @click.argument('fqdn')
+@format_option
 @click.pass_obj
-def get_ip_by_host(api, fqdn):
-    click.echo('getting ip for host  %s ' % (fqdn))
-    click.echo(api.get_ip_by_host(fqdn))
+def get_ip_by_host(api, fqdn, fmt):
+    if fmt == 'text':
+        click.echo('getting ip for host  %s ' % (fqdn))
+        click.echo(api.get_ip_by_host(fqdn))
+    else:
+        _output(api.get_ip_by_host(fqdn), fmt)
 
 
 @cli.group()
@@ -396,10 +790,14 @@ def create_fixed_address(api, ipv4addr, mac):
 @fixedaddress.command('get')
 @click.argument('ipv4addr')
 @click.argument('mac')
+@format_option
 @click.pass_obj
-def get_fixed_address(api, ipv4addr, mac):
-    click.echo('Getting Fixed Address for IP: %s, MAC Address: %s ' % (ipv4addr, mac))
-    click.echo(api.get_fixed_address(ipv4addr, mac))
+def get_fixed_address(api, ipv4addr, mac, fmt):
+    if fmt == 'text':
+        click.echo('Getting Fixed Address for IP: %s, MAC Address: %s ' % (ipv4addr, mac))
+        click.echo(api.get_fixed_address(ipv4addr, mac))
+    else:
+        _output(api.get_fixed_address(ipv4addr, mac), fmt)
 
 
 @fixedaddress.command('delete')
@@ -419,10 +817,14 @@ def grid():
 
 @grid.command('get')
 @click.option('--name', default=None)
+@format_option
 @click.pass_obj
-def get_grid(api, name):
-    click.echo('Getting Grid.')
-    click.echo(api.get_grid(name=name))
+def get_grid(api, name, fmt):
+    if fmt == 'text':
+        click.echo('Getting Grid.')
+        click.echo(api.get_grid(name=name))
+    else:
+        _output(api.get_grid(name=name), fmt)
 
 
 # TODO: ADD PAYLOAD
@@ -443,10 +845,14 @@ def restart_grid_services(api, query_params, name):
 
 
 @grid.command('pending_changes')
+@format_option
 @click.pass_obj
-def get_pending_changes(api):
-    click.echo('Getting Pending Changes for Grid..')
-    click.echo(api.get_pending_changes())
+def get_pending_changes(api, fmt):
+    if fmt == 'text':
+        click.echo('Getting Pending Changes for Grid..')
+        click.echo(api.get_pending_changes())
+    else:
+        _output(api.get_pending_changes(), fmt)
 
 
 @cli.group()
@@ -460,14 +866,24 @@ def lease():
                      ' separated by a space. Ex:'
                      ' name=test network_view=default'))
 @click.argument('query_params', nargs=-1)
+@click.option('--return-fields',
+              help='Comma-separated list of fields to include in output.')
+@format_option
 @click.pass_obj
-def get_lease(api, query_params):
+def get_lease(api, query_params, return_fields, fmt):
     if len(query_params) == 0:
         click.echo('Please provide query_params. See help for more info.')
         return
+    _check_csv_columns(fmt, return_fields)
     params = process_query_params(query_params)
-    click.echo('Getting Lease.')
-    click.echo(api.get_lease(query_params=params))
+    if fmt == 'text':
+        click.echo('Getting Lease.')
+        click.echo(api.get_lease(query_params=params,
+                                 fields=_fields(return_fields)))
+    else:
+        _stream(api.iter_lease(query_params=params,
+                               fields=_fields(return_fields)),
+                fmt, return_fields)
 
 
 def process_query_params(query_params):
@@ -481,3 +897,214 @@ def process_query_params(query_params):
             raise InvalidParameter(msg)
         params[k] = v
     return params
+
+
+class _ThreadOutput(object):
+    '''Stand-in for sys.stdout/sys.stderr which sends writes of threads
+    running a command to that command's buffer.'''
+
+    encoding = 'utf-8'
+    errors = 'strict'
+
+    def __init__(self, stream, local, name):
+        self._stream = stream
+        self._local = local
+        self._name = name
+
+    def _target(self):
+        return getattr(self._local, self._name, None) or self._stream
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+    def isatty(self):
+        target = self._target()
+        return target is self._stream and target.isatty()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+_capture = threading.local()
+_capture_lock = threading.Lock()
+_capture_users = [0]
+
+
+def _install_capture():
+    with _capture_lock:
+        if _capture_users[0] == 0:
+            sys.stdout = _ThreadOutput(sys.stdout, _capture, 'stdout')
+            sys.stderr = _ThreadOutput(sys.stderr, _capture, 'stderr')
+        _capture_users[0] += 1
+
+
+def _uninstall_capture():
+    with _capture_lock:
+        _capture_users[0] -= 1
+        if _capture_users[0] == 0:
+            sys.stdout = sys.stdout._stream
+            sys.stderr = sys.stderr._stream
+
+
+def execute(api, argv):
+    '''Run one command line against an existing Infoblox object.
+
+    Output is captured per thread, so several command lines may run
+    concurrently. Connection options on the command line (--ipaddr, --user,
+    ...) must match the object's, session options (--slow-threshold, ...)
+    only apply to this command. Commands which must run in the client
+    (LOCAL_COMMANDS) are refused. Returns a tuple of exit code, stdout text
+    and stderr text.
+    '''
+    command = _local_command(argv)
+    if command:
+        return 2, u'', u'Error: %s cannot be run here\n' % command
+    options, __ = _split_global_options(argv)
+    for name, attribute in CONNECTION_OPTIONS:
+        if name in options and options[name] != getattr(api, attribute):
+            return 2, u'', (u'Error: --%s does not match the API session '
+                            u'the command runs in\n' % name.replace('_', '-'))
+    out, err = io.StringIO(), io.StringIO()
+    _install_capture()
+    _capture.stdout, _capture.stderr = out, err
+    try:
+        rv = cli.main(args=list(argv), prog_name='infoblox', obj=api,
+                      standalone_mode=False)
+        # click returns the exit code of ctx.exit() instead of raising
+        exit_code = rv if isinstance(rv, int) else 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(bool(e.code))
+    except click.ClickException as e:
+        e.show(file=err)
+        exit_code = e.exit_code
+    except click.Abort:
+        err.write(u'Aborted!\n')
+        exit_code = 1
+    except Exception as e:
+        err.write(u'Error: %s\n' % (e,))
+        exit_code = 1
+    finally:
+        _capture.stdout = _capture.stderr = None
+        _uninstall_capture()
+    return exit_code, out.getvalue(), err.getvalue()
+
+
+# global options choosing the grid and account, and the Infoblox attributes
+# they set; commands run through execute() can't change them
+CONNECTION_OPTIONS = (
+    ('ipaddr', 'iba_host'),
+    ('user', 'iba_user'),
+    ('password', 'iba_password'),
+    ('wapi_version', 'iba_wapi_version'),
+    ('dns_view', 'iba_dns_view'),
+    ('network_view', 'iba_network_view'),
+    ('verify_ssl', 'iba_verify_ssl'),
+)
+
+# commands which read the client's stdin, files or terminal, or start the
+# daemon, and therefore always run in the client
+LOCAL_COMMANDS = ('daemon', 'batch', 'shell')
+
+
+def _split_global_options(args):
+    '''Split a command line into the global options given on it and the
+    rest, which starts with the subcommand.
+
+    Returns a dictionary of parameter name to value and the list of the
+    remaining arguments. Parsing stops at the first argument which is not a
+    global option (e.g. --help).
+    '''
+    params = {}
+    for param in cli.params:
+        for opt in param.opts:
+            params[opt] = (param, True)
+        for opt in param.secondary_opts:
+            params[opt] = (param, False)
+    options = {}
+    index = 0
+    while index < len(args):
+        name, sep, value = args[index].partition('=')
+        if name not in params:
+            break
+        param, flag_value = params[name]
+        if param.is_flag:
+            value = flag_value
+        elif not sep:
+            index += 1
+            if index == len(args):
+                break
+            value = args[index]
+        options[param.name] = value
+        index += 1
+    return options, list(args[index:])
+
+
+def _environment_options(args):
+    '''Return the global options set through environment variables (IB_*)
+    but not on a command line, as arguments to add to it.
+
+    A forwarded command line then carries the client's settings, which the
+    daemon checks or applies like options given on the command line. Returns
+    None if a variable has an invalid value.
+    '''
+    given, __ = _split_global_options(args)
+    options = []
+    for param in cli.params:
+        value = os.environ.get(param.envvar or '')
+        if param.name in given or not value:
+            continue
+        if param.is_flag:
+            try:
+                value = click.BOOL.convert(value, param, None)
+            except click.BadParameter:
+                return None
+            if value:
+                options.append(param.opts[0])
+            elif param.secondary_opts:
+                options.append(param.secondary_opts[0])
+        else:
+            options.append('%s=%s' % (param.opts[0], value))
+    return options
+
+
+def _local_command(args):
+    '''Return the subcommand of a command line if it is one of
+    LOCAL_COMMANDS, else None.'''
+    __, rest = _split_global_options(args)
+    if rest and rest[0] in LOCAL_COMMANDS:
+        return rest[0]
+    return None
+
+
+def main(args=None):
+    '''Entry point of the infoblox command.
+
+    Forwards the command line to a running daemon when IB_DAEMON_SOCKET is
+    set, and runs it in-process otherwise. The global options set through
+    IB_* environment variables are forwarded with it.
+    '''
+    if args is None:
+        args = sys.argv[1:]
+    socket_path = os.environ.get('IB_DAEMON_SOCKET')
+    __, rest = _split_global_options(args)
+    environment = _environment_options(args)
+    if (socket_path and rest and not rest[0].startswith('-') and
+            rest[0] not in LOCAL_COMMANDS and environment is not None):
+        import socket
+        from .daemon import DaemonError, forward
+        try:
+            exit_code, out, err = forward(socket_path, environment + args)
+        except socket.error:
+            pass  # no daemon listening, run the command ourselves
+        except DaemonError as e:
+            # the daemon may have run the command, don't run it again
+            sys.stderr.write('Error: %s\n' % (e,))
+            sys.exit(1)
+        else:
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            sys.exit(exit_code)
+    cli.main(args=args, prog_name='infoblox')
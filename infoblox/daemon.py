@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Persistent command server for the infoblox CLI.
+#
+# ``infoblox daemon --socket PATH`` keeps one authenticated, pooled Infoblox
+# object alive and runs command lines sent to it over a Unix socket. When
+# IB_DAEMON_SOCKET is set, the ``infoblox`` entry point forwards its
+# arguments to the daemon instead of building its own session.
+#
+# The protocol is one JSON line per connection in each direction:
+#
+#     -> {"argv": ["hostrecord", "get", "host.example.com"]}
+#     <- {"exit_code": 0, "stdout": "...", "stderr": "..."}
+#
+# This module only uses the standard library so that forwarding a command
+# stays cheap.
+
+import json
+import os
+import signal
+import socket
+
+try:
+    import socketserver
+except ImportError:  # Python 2
+    import SocketServer as socketserver
+
+
+class DaemonError(Exception):
+    pass
+
+
+def forward(socket_path, argv):
+    """Run a command line on a running daemon.
+    :param socket_path: path of the daemon's Unix socket
+    :param argv: list of command line arguments (without the program name)
+    :return: tuple of exit code, stdout text and stderr text
+    :raises socket.error: if no daemon is listening on socket_path
+    :raises DaemonError: if the connection fails after connecting, when the
+        daemon may already have run the command
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        chunks = []
+        try:
+            request = json.dumps({'argv': list(argv)}) + '\n'
+            sock.sendall(request.encode('utf-8'))
+            sock.shutdown(socket.SHUT_WR)
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except socket.error as e:
+            raise DaemonError('Lost connection to daemon at %s: %s' %
+                              (socket_path, e))
+    finally:
+        sock.close()
+    try:
+        reply = json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError:
+        raise DaemonError('Invalid reply from daemon at ' + socket_path)
+    return reply['exit_code'], reply['stdout'], reply['stderr']
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            argv = request['argv']
+        except (ValueError, KeyError, TypeError):
+            exit_code, out, err = 2, '', 'Error: malformed request\n'
+        else:
+            exit_code, out, err = self.server.execute(argv)
+        reply = json.dumps({'exit_code': exit_code,
+                            'stdout': out,
+                            'stderr': err})
+        self.wfile.write(reply.encode('utf-8') + b'\n')
+
+
+class CommandServer(socketserver.UnixStreamServer):
+
+    """ Unix socket server running one command at a time through
+    ``execute(argv) -> (exit_code, stdout, stderr)``.
+    """
+
+    def __init__(self, socket_path, execute):
+        self.execute = execute
+        socketserver.UnixStreamServer.__init__(self, socket_path,
+                                               _CommandHandler)
+
+
+def _is_listening(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def serve(socket_path, execute):
+    """Serve commands until interrupted or terminated.
+    :param socket_path: path of the Unix socket to listen on
+    :param execute: callable running one command line
+    """
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            raise DaemonError('A daemon is already listening on ' +
+                              socket_path)
+        os.unlink(socket_path)
+
+    # the daemon holds the API credentials; only its owner may use it
+    old_umask = os.umask(0o177)
+    try:
+        server = CommandServer(socket_path, execute)
+    finally:
+        os.umask(old_umask)
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
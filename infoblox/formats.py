@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Machine-readable output for the infoblox CLI.
+#
+# json  - one JSON document (lists are written element by element)
+# jsonl - one JSON value per line
+# csv   - a header row and one row per object; nested values as JSON
+#
+# Rows are written as they come, so results read page by page from WAPI are
+# streamed with constant memory. A csv stream therefore needs its columns up
+# front; the columns of a single result are all the fields of its objects.
+
+import csv
+import json
+
+import click
+
+
+class _EchoWriter(object):
+
+    """ File-like object for csv.writer which writes through click.echo. """
+
+    def write(self, data):
+        click.echo(data, nl=False)
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def emit(data, fmt, fields=None):
+    """Write a single API result (object, list or scalar).
+    :param data: the result to write
+    :param fmt: 'json', 'jsonl' or 'csv'
+    :param fields: list of csv columns (default: the fields of all objects)
+    """
+    if fmt == 'json':
+        click.echo(json.dumps(data, sort_keys=True))
+        return
+    if data is None:
+        rows = []
+    elif isinstance(data, list):
+        rows = data
+    else:
+        rows = [data]
+    if fmt == 'csv' and not fields:
+        rows = [row if isinstance(row, dict) else {'value': row}
+                for row in rows]
+        fields = sorted(set(key for row in rows for key in row))
+    stream(rows, fmt, fields)
+
+
+def stream(rows, fmt, fields=None):
+    """Write an iterable of API objects, one at a time.
+    :param rows: iterable of dicts or scalars
+    :param fmt: 'json', 'jsonl' or 'csv'
+    :param fields: list of csv columns, required for csv; objects are not
+        looked at before they are written, so later ones may have other
+        fields
+    """
+    if fmt == 'json':
+        click.echo('[', nl=False)
+        for i, row in enumerate(rows):
+            click.echo((',' if i else '') + _dumps(row), nl=False)
+        click.echo(']')
+    elif fmt == 'jsonl':
+        for row in rows:
+            click.echo(_dumps(row))
+    elif fmt == 'csv':
+        if fields is None:
+            raise ValueError('csv output of a stream needs its columns')
+        writer = csv.writer(_EchoWriter(), lineterminator='\n')
+        columns = list(fields)
+        writer.writerow(columns)
+        for row in rows:
+            if not isinstance(row, dict):
+                row = {'value': row}
+            writer.writerow([_csv_value(row.get(column))
+                             for column in columns])
+    else:
+        raise ValueError('Unknown output format: %s' % (fmt,))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list, bool)):
+        return _dumps(value)
+    return value
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import click
-from .hlinfoblox import HighLevelInfobloxActions
+from .lazy import LazyObject
 
 # hla == High Level Abstractions or, if you like, High Level Actions
 
@@ -24,8 +24,13 @@ from .hlinfoblox import HighLevelInfobloxActions
 def cli(ctx, ipaddr, user, password, wapi_version, dns_view, network_view,
         verify_ssl):
     '''Hlinfobloxs is a CLI for High-Level Infoblox commands.'''
-    ctx.obj = HighLevelInfobloxActions(ipaddr, user, password, wapi_version,
-                                       dns_view, network_view, verify_ssl)
+    ctx.obj = LazyObject(_make_actions, ipaddr, user, password, wapi_version,
+                         dns_view, network_view, verify_ssl)
+
+
+def _make_actions(*args):
+    from .hlinfoblox import HighLevelInfobloxActions
+    return HighLevelInfobloxActions(*args)
 
 
 @cli.command('lease2fixed')
@@ -39,3 +44,32 @@ def convert_lease_to_fixed_address(api, address, fqdn=None, confirm=False):
        Must be executed on the node for which we want to convert.
     '''
     api.convert_lease_to_fixed_address(address, fqdn=fqdn, confirm=confirm)
+
+
+@cli.command('lease2fixed-subnet')
+@click.argument('network')
+@click.option('--domain', default=None,
+              help='Domain appended to lease hostnames without one.')
+@click.option('--jobs', default=1, type=click.IntRange(1, None),
+              help='Number of conversions applied concurrently.')
+@click.option('--confirm', default=False, is_flag=True,
+              help='Apply the plan; without it nothing is changed.')
+@click.pass_context
+def convert_subnet_leases(ctx, network, domain, jobs, confirm):
+    '''Convert all DHCP leases of a network (in CIDR format) to fixed
+       addresses. Prints the plan unless --confirm is given.
+    '''
+    failed = 0
+    for result in ctx.obj.convert_subnet_leases_to_fixed_addresses(
+            network, domain=domain, confirm=confirm, jobs=jobs):
+        if result.status == 'failed':
+            failed += 1
+        click.echo('%-15s %-6s %-7s %s %s %s' % (
+            result.address, result.action, result.status, result.fqdn or '-',
+            result.mac or '-', result.detail))
+    if not confirm:
+        click.echo('DRY-RUN -- NO CHANGES MADE (use --confirm to apply)',
+                   err=True)
+    if failed:
+        click.echo('%d conversions failed' % failed, err=True)
+        ctx.exit(1)
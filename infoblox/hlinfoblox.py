@@ -5,16 +5,39 @@
 # License stuff
 #
 
+import collections
 import json
-from .infoblox import Infoblox, InfobloxGeneralException, Util
+
+import requests
+
+from . import bulk
+from .infoblox import (Infoblox, InfobloxException,
+                       InfobloxGeneralException, Util)
+from .models import Ref
 
 # import more stuff
 
 
+class LeaseConversion(collections.namedtuple(
+        'LeaseConversion',
+        ['address', 'action', 'fqdn', 'mac', 'detail', 'ref', 'status'])):
+
+    """ Planned or applied conversion of one leased address.
+    action is one of 'create' (new host record), 'update' (existing host
+    record address) or 'skip'; status is 'planned', 'done' or 'failed'.
+    """
+
+    def __new__(cls, address, action, fqdn, mac, detail='', ref=None,
+                status='planned'):
+        return super(LeaseConversion, cls).__new__(
+            cls, address, action, fqdn, mac, detail, ref, status)
+
+
 class HighLevelInfobloxActions(object):
 
     """ Implements the following high level infoblox actions
     convert_lease_to_fixed_address
+    convert_subnet_leases_to_fixed_addresses
     """
 
     def __init__(self,
@@ -123,6 +146,107 @@ class HighLevelInfobloxActions(object):
                 break
 
 
+    def plan_subnet_lease_conversion(self, network, domain=None):
+        """Work out how to convert all DHCP leases of a network to fixed
+        addresses. The leases and the host record addresses of the network
+        are each read in one paged pass and joined by address.
+        :param network: network in CIDR format
+        :param domain: domain appended to lease client hostnames without
+            one (optional)
+        :return: list of LeaseConversion, ordered by address
+        """
+        leases = self.api.iter_lease(
+            query_params={'network': network,
+                          'network_view': self.iba_network_view},
+            fields=['address', 'hardware', 'client_hostname',
+                    'binding_state'])
+        host_addrs = self.api.util.get_paged(
+            'record:host_ipv4addr',
+            query_params={'network': network,
+                          'network_view': self.iba_network_view},
+            fields=['ipv4addr', 'host', 'mac', 'configure_for_dhcp'])
+        hosts_by_address = dict((h['ipv4addr'], h) for h in host_addrs)
+
+        plan = {}
+        for lease in leases:
+            address = lease['address']
+            if lease.get('binding_state', 'ACTIVE') != 'ACTIVE':
+                # keep the active lease if an address has several
+                if address not in plan:
+                    plan[address] = LeaseConversion(
+                        address, 'skip', lease.get('client_hostname'),
+                        lease.get('hardware'),
+                        'lease is %s' % lease['binding_state'])
+                continue
+            plan[address] = self._plan_conversion(
+                lease, hosts_by_address.get(address), domain)
+
+        return [plan[address] for address in
+                sorted(plan, key=lambda a: tuple(int(o) for o in
+                                                 a.split('.')))]
+
+    def _plan_conversion(self, lease, host_addr, domain):
+        address = lease['address']
+        mac = lease.get('hardware')
+        if host_addr is not None:
+            if host_addr.get('configure_for_dhcp'):
+                return LeaseConversion(address, 'skip', host_addr['host'],
+                                       host_addr.get('mac'),
+                                       'already a fixed address')
+            if not mac:
+                return LeaseConversion(address, 'skip', host_addr['host'],
+                                       None, 'cannot determine mac')
+            return LeaseConversion(address, 'update', host_addr['host'], mac,
+                                   ref=host_addr['_ref'])
+
+        fqdn = lease.get('client_hostname')
+        if fqdn and domain and '.' not in fqdn:
+            fqdn = fqdn + '.' + domain
+        if not fqdn:
+            return LeaseConversion(address, 'skip', None, mac,
+                                   'cannot determine fqdn')
+        if not mac:
+            return LeaseConversion(address, 'skip', fqdn, None,
+                                   'cannot determine mac')
+        return LeaseConversion(address, 'create', fqdn, mac)
+
+    def convert_subnet_leases_to_fixed_addresses(self, network, domain=None,
+                                                 confirm=False, jobs=1):
+        """Convert all DHCP-assigned leases of a network to fixed addresses.
+        :param network: network in CIDR format
+        :param domain: domain appended to lease client hostnames without
+            one (optional)
+        :param confirm: apply the plan; without it nothing is changed
+        :param jobs: number of conversions applied concurrently
+        :return: iterator of LeaseConversion results, ordered by address
+        """
+        plan = self.plan_subnet_lease_conversion(network, domain=domain)
+        if not confirm:
+            return iter(plan)
+        if jobs > 1:
+            self.api.session.ensure_pool_size(jobs)
+        return bulk.imap(self._apply_conversion, plan, jobs=jobs)
+
+    def _apply_conversion(self, conversion):
+        if conversion.action == 'skip':
+            return conversion
+        try:
+            if conversion.action == 'update':
+                self.api.util.put({'_ref': conversion.ref},
+                                  {'configure_for_dhcp': True,
+                                   'mac': conversion.mac})
+            else:
+                self.api.util.post('record:host', {
+                    'name': conversion.fqdn,
+                    'view': self.iba_dns_view,
+                    'ipv4addrs': [{'ipv4addr': conversion.address,
+                                   'configure_for_dhcp': True,
+                                   'mac': conversion.mac}]}, None)
+        except (InfobloxException,
+                requests.exceptions.RequestException) as e:
+            return conversion._replace(status='failed', detail=str(e))
+        return conversion._replace(status='done')
+
     def _create_host_record(self, address, fqdn, mac):
         if fqdn is None:
             raise(InfobloxGeneralException(
@@ -148,15 +272,20 @@ class HighLevelInfobloxActions(object):
         if 'dhcp_client_identifier' in ipv4address_record:
             return ipv4address_record['dhcp_client_identifier']
 
-        for ref in ipv4address_record['objects']:
-            if ref.startswith('lease/'):
-                lease_ref = ref
-                print("Lease Reference [%s]" % (lease_ref))
-                lease_record = self.api.util.get(lease_ref,
-                                                 fields=['client_hostname'])
-                print("Lease Record [%s]" % (lease_record))
+        if not any(Ref(ref).type == 'lease'
+                   for ref in ipv4address_record['objects']):
+            return None
+
+        # all leases of the address in one round trip
+        leases = self.api.get_lease(
+            query_params={'address': address,
+                          'network_view': self.iba_network_view},
+            fields=['client_hostname'],
+            not_found_fail=False)
+        print("Lease Records [%s]" % (leases))
 
-                if 'client_hostname' in lease_record:
-                    return lease_record['client_hostname']
+        for lease_record in leases or []:
+            if lease_record.get('client_hostname'):
+                return lease_record['client_hostname']
 
         return None
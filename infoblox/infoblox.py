@@ -15,13 +15,65 @@
 
 import re
 import requests
+from requests.compat import quote_plus
 import json
 import logging
 import collections
+import copy
+import functools
+import signal
+import sys
+import threading
+import time
+
+from .bulk import imap, inherit
+from .models import Ref, decode as decode_models
 
 
 logger = logging.getLogger(__name__)
 
+# first WAPI version used with incremental field updates (aliases+,
+# extattrs-, ...) sent through the request object in one call
+INCREMENTAL_UPDATES_WAPI_VERSION = (2, 3)
+
+# fields returned by the iter_* search methods with full=True
+FULL_FIELDS = {
+    'record:host': ['name', 'view', 'zone', 'ipv4addrs', 'aliases',
+                    'configure_for_dns', 'ttl', 'comment', 'extattrs'],
+    'network': ['network', 'network_view', 'network_container', 'members',
+                'options', 'comment', 'extattrs'],
+}
+
+# _return_fields of the methods which only use some fields of the objects
+# they read, instead of the WAPI default fields; an empty list returns _ref
+# only. Infoblox.field_profiles starts as a copy of this.
+FIELD_PROFILES = {
+    'get_ip_by_host': ['ipv4addrs'],
+    'get_host_by_ip': ['names'],
+    'get_host_by_regexp': ['name'],
+    'get_host_by_extattrs': ['name'],
+    'get_txt_by_regexp': ['name', 'text'],
+    'get_network_by_ip': ['network'],
+    'get_network_by_extattrs': ['network'],
+    'get_next_available_ip': [],
+    'get_next_available_network': [],
+    'comment_network': [],
+    'delete_host_record': [],
+    'delete_txt_record': [],
+    'delete_cname_record': [],
+    'delete_dhcp_range': [],
+    'delete_network': [],
+    'delete_networkcontainer': [],
+}
+
+# object types of the bulk extensible attribute updates: WAPI type, field
+# reported, field matched by values/regexp, view field
+EXTATTR_OBJECT_TYPES = {
+    'network': ('network', 'network', 'network', 'network_view'),
+    'host': ('record:host', 'name', 'name', 'view'),
+    'fixedaddress': ('fixedaddress', 'ipv4addr', 'network', 'network_view'),
+}
+
 
 class InfobloxException(Exception):
     pass
@@ -51,8 +103,193 @@ class InfobloxBadInputParameter(InfobloxException):
     pass
 
 
+# bytes_received is the size of the response body as transferred (e.g.
+# gzip compressed), bytes_decoded its size after decompression
+RequestRecord = collections.namedtuple(
+    'RequestRecord',
+    ['timestamp', 'method', 'url', 'params', 'status', 'elapsed',
+     'bytes_received', 'bytes_decoded'])
+
+
+# per-thread Session settings, see Session.override(); threads running bulk
+# requests for a command inherit them
+_thread_settings = threading.local()
+inherit(_thread_settings)
+
+
+def _bytes_received(response, decoded):
+    """Return the size of a response body as it was transferred."""
+    try:
+        # urllib3 counts the bytes read before decompressing them
+        received = response.raw.tell()
+    except (AttributeError, TypeError, ValueError):
+        received = None
+    if not received and not response.headers.get('Content-Encoding'):
+        return decoded
+    return received
+
+
+class ReadCache(object):
+
+    """ Cache of successful GET responses. Entries expire after ttl seconds
+    and the whole cache is dropped whenever anything is written.
+    """
+
+    def __init__(self, ttl=300, max_entries=1000):
+        """ Class initialization method
+        :param ttl: seconds a response may be reused
+        :param max_entries: number of responses kept, least recently used
+            responses are dropped first
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None, data=None):
+        """Return the cache key of a request, or None if it can't be cached."""
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        key = (url, params, data)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                return None
+            self._entries[key] = entry
+            return entry[1]
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), response)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def responses(self):
+        """Return the cached responses which have not expired."""
+        now = time.time()
+        with self._lock:
+            return [response for stored, response in self._entries.values()
+                    if now - stored <= self.ttl]
+
+
+def _accept_encoding(compress):
+    return 'gzip, deflate' if compress else 'identity'
+
+
 class Session(requests.Session):
 
+    """ Session all WAPI requests go through.
+    Requests pass the read cache, then the middleware chain (see
+    add_middleware) and finally the transport; failed requests are logged
+    and every request is recorded in the history.
+    """
+
+    def __init__(self, history_size=100, slow_threshold=None, cache=None,
+                 compress=True):
+        """ Class initialization method
+        :param history_size: number of recent requests kept for dumping
+        :param slow_threshold: log requests taking at least this many
+            seconds (optional, disabled if None)
+        :param cache: ReadCache reused for GET requests (optional)
+        :param compress: ask for gzip or deflate compressed responses
+        """
+        super(Session, self).__init__()
+        self.compress = compress
+        self.history = collections.deque(maxlen=history_size)
+        self._slow_threshold = slow_threshold
+        self.cache = cache
+        self.middleware = []
+        self._send = super(Session, self).request
+        # proxy and CA bundle settings from the environment per host, which
+        # requests would otherwise look up again on every request
+        self._environment_settings = {}
+
+    @property
+    def compress(self):
+        """Whether responses may be compressed. They are decompressed
+        while they are read."""
+        settings = self._settings()
+        if 'compress' in settings:
+            return settings['compress']
+        return self.headers.get('Accept-Encoding') != 'identity'
+
+    @compress.setter
+    def compress(self, compress):
+        self.headers['Accept-Encoding'] = _accept_encoding(compress)
+
+    @property
+    def slow_threshold(self):
+        """Seconds from which requests are logged as slow, or None."""
+        return self._settings().get('slow_threshold', self._slow_threshold)
+
+    @slow_threshold.setter
+    def slow_threshold(self, slow_threshold):
+        self._slow_threshold = slow_threshold
+
+    def _settings(self):
+        return getattr(_thread_settings, 'sessions', {}).get(self, {})
+
+    def override(self, **settings):
+        """Change settings (compress, slow_threshold) for the requests of
+        the current thread only, e.g. for one command of several sharing
+        the session concurrently.
+        :return: the previous overrides, to pass to restore()
+        """
+        previous = self._settings()
+        self.restore(dict(previous, **settings))
+        return previous
+
+    def restore(self, settings):
+        """Replace the current thread's overrides (see override())."""
+        sessions = dict(getattr(_thread_settings, 'sessions', {}))
+        sessions[self] = settings
+        if not settings:
+            del sessions[self]
+        _thread_settings.sessions = sessions
+
+    def add_middleware(self, middleware):
+        """Add a step to the request pipeline, outside of the steps added
+        before.
+        :param middleware: callable(send, method, url, *args, **kwargs)
+            returning the response; it calls send(method, url, *args,
+            **kwargs) to run the rest of the pipeline
+        """
+        self.middleware.append(middleware)
+        self._send = super(Session, self).request
+        for step in self.middleware:
+            self._send = functools.partial(step, self._send)
+
+    def merge_environment_settings(self, url, proxies, stream, verify, cert):
+        if not self.trust_env:
+            return super(Session, self).merge_environment_settings(
+                url, proxies, stream, verify, cert)
+        scheme, __, rest = url.partition('://')
+        key = (scheme, rest.partition('/')[0],
+               tuple(sorted((proxies or {}).items())), stream, verify, cert,
+               tuple(sorted(self.proxies.items())), self.stream, self.verify,
+               self.cert)
+        settings = self._environment_settings.get(key)
+        if settings is None:
+            settings = super(Session, self).merge_environment_settings(
+                url, proxies, stream, verify, cert)
+            self._environment_settings[key] = settings
+        return dict(settings, proxies=dict(settings['proxies']))
+
     def request(self, method, url, *args, **kwargs):
         """Do a request and return the response.
 
@@ -63,11 +300,30 @@ class Session(requests.Session):
         :return: response data
         :rtype: object
         """
+        cache_key = None
+        if self.cache is not None:
+            if method.upper() == 'GET':
+                cache_key = ReadCache.key(url, kwargs.get('params'),
+                                          kwargs.get('data'))
+                cached = cache_key and self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            else:
+                self.cache.clear()
+
+        if 'compress' in self._settings():
+            kwargs['headers'] = dict(
+                kwargs.get('headers') or {},
+                **{'Accept-Encoding': _accept_encoding(self.compress)})
+        start = time.time()
+        status = received = decoded = None
         try:
-            response = super(Session, self).request(method, url, *args, **kwargs)
+            response = self._send(method, url, *args, **kwargs)
             # inject things into the locals namespace for potential logging
             content = response.content
             status = response.status_code
+            decoded = len(content or b'')
+            received = _bytes_received(response, decoded)
             response.raise_for_status()
         except Exception as e:
             logger.exception(e)
@@ -77,8 +333,61 @@ class Session(requests.Session):
                          'method={0[method]!r}, response-status={0[status]!r}, '
                          'response-content={0[content]!r}'.format(data))
             raise
+        finally:
+            self._record(method, url, kwargs.get('params'), status,
+                         time.time() - start, received, decoded)
+        if cache_key is not None and status == 200:
+            self.cache.put(cache_key, response)
         return response
 
+    def _record(self, method, url, params, status, elapsed,
+                received=None, decoded=None):
+        """Remember a finished request and log it if it was slow."""
+        self.history.append(RequestRecord(time.time(), method, url, params,
+                                          status, elapsed, received, decoded))
+        if (self.slow_threshold is not None and
+                elapsed >= self.slow_threshold):
+            logger.warning('Slow request: url=%r, method=%r, params=%r, '
+                           'response-status=%r, duration=%.3fs',
+                           url, method, params, status, elapsed)
+
+    def dump_history(self, stream=None):
+        """Write the recently recorded requests, oldest first.
+        :param stream: file-like object to write to (default: stderr)
+        """
+        if stream is None:
+            stream = sys.stderr
+        for record in list(self.history):
+            stream.write('%s %s %s %.3fs %s/%sB %s %s\n' % (
+                time.strftime('%Y-%m-%dT%H:%M:%S',
+                              time.localtime(record.timestamp)),
+                record.method, record.status, record.elapsed,
+                record.bytes_received, record.bytes_decoded,
+                record.url, record.params or ''))
+        stream.flush()
+
+    def ensure_pool_size(self, size):
+        """Make sure up to size connections per host are kept alive,
+        e.g. before running size requests concurrently.
+        :param size: number of pooled connections per host
+        """
+        for prefix in ('https://', 'http://'):
+            adapter = self.get_adapter(prefix)
+            if (type(adapter) is requests.adapters.HTTPAdapter and
+                    adapter._pool_maxsize < size):
+                self.mount(prefix, requests.adapters.HTTPAdapter(
+                    pool_maxsize=size))
+
+    def install_dump_handler(self, signum=None, stream=None):
+        """Dump the request history whenever the process gets a signal.
+        :param signum: signal number (default: SIGUSR1)
+        :param stream: file-like object to write to (default: stderr)
+        """
+        if signum is None:
+            signum = signal.SIGUSR1
+        signal.signal(signum,
+                      lambda *args: self.dump_history(stream=stream))
+
 
 class Infoblox(object):
 
@@ -87,6 +396,12 @@ class Infoblox(object):
     delete_network
     create_networkcontainer
     delete_networkcontainer
+    create_networks
+    delete_networks
+    create_networkcontainers
+    delete_networkcontainers
+    update_extattrs
+    delete_extattrs
     get_next_available_network
     create_host_record
     create_txt_record
@@ -94,18 +409,25 @@ class Infoblox(object):
     delete_host_record
     add_host_alias
     delete_host_alias
+    add_host_ipv4addr
+    delete_host_ipv4addr
     get_a_record_by_ip
     get_a_record_by_fqdn
     get_cname_record
+    get_cname_records
     create_cname_record
     delete_cname_record
     update_cname_record
     create_dhcp_range
     delete_dhcp_range
     get_next_available_ip
+    exists
     get_host
+    get_hosts
     get_host_by_ip
     get_ip_by_host
+    get_ips_by_hosts
+    get_hosts_by_ips
     get_host_by_regexp
     get_txt_by_regexp
     get_host_by_extattrs
@@ -124,6 +446,13 @@ class Infoblox(object):
     restart_grid_services
     get_pending_changes
     get_lease
+    iter_lease
+    iter_host_by_regexp
+    iter_txt_by_regexp
+    iter_host_by_extattrs
+    iter_network_by_extattrs
+    get_network_utilization
+    iter_container_utilization
     """
 
     def __init__(self,
@@ -152,6 +481,11 @@ class Infoblox(object):
         self.iba_verify_ssl = iba_verify_ssl
         self.base_url = "https://{0}/wapi/v{1}".format(self.iba_host,
                                                        self.iba_wapi_version)
+        # None: use incremental updates if the WAPI version supports them
+        self.incremental_updates = None
+        # method name to _return_fields, see FIELD_PROFILES; methods without
+        # an entry get the WAPI default fields
+        self.field_profiles = dict(FIELD_PROFILES)
         self._setup_session()
 
         self.util = Util(self.session,
@@ -164,48 +498,73 @@ class Infoblox(object):
         self.session.auth = (self.iba_user, self.iba_password)
         self.session.verify = self.iba_verify_ssl
 
+    def _profile(self, method):
+        return self.field_profiles.get(method)
+
+    def _use_incremental_updates(self):
+        if self.incremental_updates is not None:
+            return self.incremental_updates
+        try:
+            version = tuple(int(part)
+                            for part in self.iba_wapi_version.split('.'))
+        except ValueError:
+            return False
+        return version >= INCREMENTAL_UPDATES_WAPI_VERSION
+
+    def _update_by_query(self, object_type, checks, payload):
+        """Update an object in one request (see Util.update_by_query). The
+        object is found by the last query of checks; if the update fails,
+        the first query finding nothing raises InfobloxNotFoundException.
+        :param checks: list of (query_params, not found text) pairs, each
+            query narrowing down the one before
+        """
+        try:
+            self.util.update_by_query(object_type, checks[-1][0], payload)
+        except (InfobloxGeneralException,
+                requests.exceptions.HTTPError):
+            for query_params, text in checks:
+                if not self.exists(object_type, query_params):
+                    raise InfobloxNotFoundException(text)
+            raise
+
+    def _update_host(self, host_fqdn, payload, field=None, value=None,
+                     notFoundText=None):
+        """Update a host record in one request.
+        :param field: search field the host must have value in, e.g. to
+            fail with notFoundText if an alias to remove is missing
+        """
+        query_params = {'name': host_fqdn, 'view': self.iba_dns_view}
+        checks = [(query_params, "No requested host found: " + host_fqdn)]
+        if field is not None:
+            checks.append((dict(query_params, **{field: value}),
+                           notFoundText))
+        self._update_by_query('record:host', checks, payload)
+
+    def _update_network(self, network, payload):
+        self._update_by_query(
+            'network',
+            [({'network': network, 'network_view': self.iba_network_view},
+              "No requested network found: " + network)],
+            payload)
+
     def get_next_available_ip(self, network):
         """ Implements IBA next_available_ip REST API call
         Returns IP v4 address
         :param network: network in CIDR format
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' +  \
-                   self.iba_wapi_version + '/network?network=' \
-                   + network + '&network_view=' + self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    net_ref = r_json[0]['_ref']
-                    rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                        self.iba_wapi_version + '/' + net_ref + \
-                        '?_function=next_available_ip&num=1'
-                    r = self.session.post(url=rest_url)
-                    r_json = r.json()
-                    if r.status_code == 200:
-                        ip_v4 = r_json['ips'][0]
-                        return ip_v4
-                    else:
-                        if 'text' in r_json:
-                            if ('code' in r_json
-                                    and r_json['code'] == 'Client.Ibap.Data'):
-                                raise InfobloxNoIPavailableException(
-                                    r_json['text'])
-                            else:
-                                raise InfobloxGeneralException(r_json['text'])
-                        else:
-                            r.raise_for_status()
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields=self._profile('get_next_available_ip'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        r_json = self.util.request_json(
+            'POST', r_json[0]['_ref'],
+            {'_function': 'next_available_ip', 'num': 1},
+            error_codes={'Client.Ibap.Data': InfobloxNoIPavailableException})
+        return r_json['ips'][0]
 
     def create_host_record(self, address, fqdn, payload=None):
         """ Implements IBA REST API call to create IBA host record
@@ -244,34 +603,31 @@ class Infoblox(object):
                                            "host record for [%s]" % (address))
         return r_json['ipv4addrs'][0]['ipv4addr']
 
+    def get_cname_records(self, fqdns, fields=None):
+        """ Retrieves many CNAME records by FQDN with a few chunked searches
+        Returns hash table of CNAME records with the given FQDN as a hash
+        key, None for FQDNs without a CNAME record
+        :param fqdns: list of hostnames in FQDN
+        :param fields: comma-separated list of field names (optional)
+        """
+        return self._get_by_names('record:cname', fqdns,
+                                  {'view': self.iba_dns_view}, fields)
+
     def get_cname_record(self, fqdn):
         """ Retrieves a CNAME record by FQDN
         :param fqdn: hostname in FQDN
         """
 
         # canonical instead of name?
-        rest_url = "{}/record:cname?name={}".format(self.base_url, fqdn)
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    cname_ref = r_json[0]['_ref']
-                    if cname_ref and re.match("record:cname\/[^:]+:([^\/]+)\/", cname_ref).group(1) == fqdn:
-                        return r_json[0]
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected cname record  reference: " + cname_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested cname record found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        r_json = self.util.request_json('GET', 'record:cname', {'name': fqdn})
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested cname record found: " + fqdn)
+        cname_ref = Ref(r_json[0]['_ref'])
+        if cname_ref.matches('record:cname', fqdn):
+            return r_json[0]
+        raise InfobloxGeneralException(
+            "Received unexpected cname record  reference: " + cname_ref)
 
     def create_txt_record(self, text, fqdn):
         """ Implements IBA REST API call to create IBA txt record
@@ -279,297 +635,186 @@ class Infoblox(object):
         :param text: free text to be added to the record
         :param fqdn: hostname in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:txt'
-        payload = '{"text": "' + text + '","name": "' + fqdn + \
-            '","view": "' + self.iba_dns_view + '"}'
-        try:
-            r = self.session.post(url=rest_url, data=payload)
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        self.util.request_json('POST', 'record:txt',
+                               payload={'text': text,
+                                        'name': fqdn,
+                                        'view': self.iba_dns_view})
 
     def delete_host_record(self, fqdn):
         """ Implements IBA REST API call to delete IBA host record
         :param fqdn: hostname in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name=' + fqdn + '&view=' \
-            + self.iba_dns_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    host_ref = r_json[0]['_ref']
-                    if (host_ref and
-                            re.match("record:host\/[^:]+:([^\/]+)\/",
-                                     host_ref).group(1) == fqdn):
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + host_ref
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected host reference: " + host_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested host found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'record:host', {'name': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('delete_host_record'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested host found: " + fqdn)
+        host_ref = Ref(r_json[0]['_ref'])
+        if not host_ref.matches('record:host', fqdn):
+            raise InfobloxGeneralException(
+                "Received unexpected host reference: " + host_ref)
+        self.util.write('DELETE', host_ref)
 
     def delete_txt_record(self, fqdn):
         """ Implements IBA REST API call to delete IBA TXT record
         :param fqdn: hostname in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:txt?name=' + fqdn + \
-            '&view=' + self.iba_dns_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    host_ref = r_json[0]['_ref']
-                    if (host_ref and
-                        re.match("record:txt\/[^:]+:([^\/]+)\/",
-                                 host_ref).group(1) == fqdn):
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + host_ref
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected host reference: " + host_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested host found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'record:txt', {'name': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('delete_txt_record'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested host found: " + fqdn)
+        host_ref = Ref(r_json[0]['_ref'])
+        if not host_ref.matches('record:txt', fqdn):
+            raise InfobloxGeneralException(
+                "Received unexpected host reference: " + host_ref)
+        self.util.write('DELETE', host_ref)
 
     def add_host_alias(self, host_fqdn, alias_fqdn):
         """ Implements IBA REST API call to add an alias to IBA host record
         :param host_fqdn: host record name in FQDN
         :param alias_fqdn: host record name in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name=' + host_fqdn + \
-            '&view=' + self.iba_dns_view + '&_return_fields=name,aliases'
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    host_ref = r_json[0]['_ref']
-                    if (host_ref and
-                        re.match("record:host\/[^:]+:([^\/]+)\/",
-                                 host_ref).group(1) == host_fqdn):
-                        if 'aliases' in r_json[0]:
-                            aliases = r_json[0]['aliases']
-                            aliases.append(alias_fqdn)
-                            payload = '{"aliases": ' + \
-                                json.JSONEncoder().encode(aliases) + '}'
-                        else:
-                            payload = '{"aliases": ["' + alias_fqdn + '"]}'
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + host_ref
-                        r = self.session.put(url=rest_url, data=payload)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected host reference: " + host_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested host found: " + host_fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        if self._use_incremental_updates():
+            self._update_host(host_fqdn, {'aliases+': [alias_fqdn]})
+            return
+        r_json = self.util.request_json(
+            'GET', 'record:host',
+            {'name': host_fqdn, 'view': self.iba_dns_view},
+            fields='name,aliases')
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested host found: " + host_fqdn)
+        host_ref = Ref(r_json[0]['_ref'])
+        if not host_ref.matches('record:host', host_fqdn):
+            raise InfobloxGeneralException(
+                "Received unexpected host reference: " + host_ref)
+        # the host may be shared through the identity map, leave it as read
+        aliases = list(r_json[0].get('aliases', []))
+        aliases.append(alias_fqdn)
+        self.util.write('PUT', host_ref, payload={'aliases': aliases})
 
     def delete_host_alias(self, host_fqdn, alias_fqdn):
         """ Implements IBA REST API call to add an alias to IBA host record
         :param host_fqdn: host record name in FQDN
         :param alias_fqdn: host record name in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name=' + host_fqdn + \
-            '&view=' + self.iba_dns_view + '&_return_fields=name,aliases'
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    host_ref = r_json[0]['_ref']
-                    if (host_ref
-                            and re.match("record:host\/[^:]+:([^\/]+)\/",
-                                         host_ref).group(1) == host_fqdn):
-                        if 'aliases' in r_json[0]:
-                            aliases = r_json[0]['aliases']
-                            aliases.remove(alias_fqdn)
-                            payload = '{"aliases": ' \
-                                + json.JSONEncoder().encode(aliases) + '}'
-                            rest_url = 'https://' + self.iba_host + \
-                                '/wapi/v' + self.iba_wapi_version + \
-                                '/' + host_ref
-                            r = self.session.put(url=rest_url, data=payload)
-                            if r.status_code == 200:
-                                return
-                            else:
-                                if 'text' in r_json:
-                                    raise InfobloxGeneralException(
-                                        r_json['text'])
-                                else:
-                                    r.raise_for_status()
-                        else:
-                            raise InfobloxNotFoundException(
-                                "No requested host alias found: " + alias_fqdn)
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected host reference: " + host_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested host found: " + host_fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        if self._use_incremental_updates():
+            self._update_host(host_fqdn, {'aliases-': [alias_fqdn]},
+                              'aliases', alias_fqdn,
+                              "No requested host alias found: " + alias_fqdn)
+            return
+        r_json = self.util.request_json(
+            'GET', 'record:host',
+            {'name': host_fqdn, 'view': self.iba_dns_view},
+            fields='name,aliases')
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested host found: " + host_fqdn)
+        host_ref = Ref(r_json[0]['_ref'])
+        if not host_ref.matches('record:host', host_fqdn):
+            raise InfobloxGeneralException(
+                "Received unexpected host reference: " + host_ref)
+        if alias_fqdn not in r_json[0].get('aliases', []):
+            raise InfobloxNotFoundException(
+                "No requested host alias found: " + alias_fqdn)
+        aliases = list(r_json[0]['aliases'])
+        aliases.remove(alias_fqdn)
+        self.util.write('PUT', host_ref, payload={'aliases': aliases})
+
+    def add_host_ipv4addr(self, host_fqdn, ipv4addr, mac=None,
+                          configure_for_dhcp=False):
+        """ Implements IBA REST API call to add an IP v4 address to IBA host
+            record
+        :param host_fqdn: host record name in FQDN
+        :param ipv4addr: IP v4 address
+        :param mac: MAC address (optional, needed for DHCP)
+        :param configure_for_dhcp: serve the address as fixed address
+        """
+        address = {'ipv4addr': ipv4addr,
+                   'configure_for_dhcp': configure_for_dhcp}
+        if mac is not None:
+            address['mac'] = mac
+        if self._use_incremental_updates():
+            self._update_host(host_fqdn, {'ipv4addrs+': [address]})
+            return
+        host = self.get_host(host_fqdn, fields=['name', 'ipv4addrs'])
+        addresses = _host_addresses(host) + [address]
+        self.util.write('PUT', host['_ref'], payload={'ipv4addrs': addresses},
+                        error=InfobloxNotUpdatedException)
+
+    def delete_host_ipv4addr(self, host_fqdn, ipv4addr):
+        """ Implements IBA REST API call to remove an IP v4 address from IBA
+            host record
+        :param host_fqdn: host record name in FQDN
+        :param ipv4addr: IP v4 address
+        """
+        if self._use_incremental_updates():
+            self._update_host(host_fqdn,
+                              {'ipv4addrs-': [{'ipv4addr': ipv4addr}]},
+                              'ipv4addr', ipv4addr,
+                              "No requested host address found: " + ipv4addr)
+            return
+        host = self.get_host(host_fqdn, fields=['name', 'ipv4addrs'])
+        addresses = [address for address in _host_addresses(host)
+                     if address['ipv4addr'] != ipv4addr]
+        if len(addresses) == len(host['ipv4addrs']):
+            raise InfobloxNotFoundException(
+                "No requested host address found: " + ipv4addr)
+        self.util.write('PUT', host['_ref'], payload={'ipv4addrs': addresses},
+                        error=InfobloxNotUpdatedException)
 
     def create_cname_record(self, canonical, name):
         """ Implements IBA REST API call to create IBA cname record
         :param canonical: canonical name in FQDN format
         :param name: the name for a CNAME record in FQDN format
         """
-        rest_url = "{0}/record:cname".format(self.base_url)
-        payload = {"canonical": canonical,
-                   "name": name,
-                   "view": self.iba_dns_view}
-        try:
-            r = self.session.post(url=rest_url, data=payload)
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        self.util.request_json('POST', 'record:cname',
+                               payload={'canonical': canonical,
+                                        'name': name,
+                                        'view': self.iba_dns_view})
 
     def delete_cname_record(self, fqdn):
         """ Implements IBA REST API call to delete IBA cname record
         :param fqdn: cname in FQDN
         """
-        rest_url = "{0}/record:cname?name={1}&view={2}".format(
-            self.base_url, fqdn, self.iba_dns_view)
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    cname_ref = r_json[0]['_ref']
-                    if (cname_ref and
-                            re.match("record:cname\/[^:]+:([^\/]+)\/",
-                                     cname_ref).group(1) == fqdn):
-                        rest_url = "{0}/{1}".format(self.base_url, cname_ref)
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected cname record  reference: " + cname_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested cname record found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'record:cname', {'name': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('delete_cname_record'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested cname record found: " + fqdn)
+        cname_ref = Ref(r_json[0]['_ref'])
+        if not cname_ref.matches('record:cname', fqdn):
+            raise InfobloxGeneralException(
+                "Received unexpected cname record  reference: " + cname_ref)
+        self.util.write('DELETE', cname_ref)
 
     def update_cname_record(self, canonical, name):
         """ Implements IBA REST API call to update or repoint IBA cname record
         :param canonical: canonical name in FQDN format
         :param name: the name for the new CNAME record in FQDN format
         """
-        rest_url = 'https://' + self.iba_host + \
-            '/wapi/v' + self.iba_wapi_version + '/record:cname'
-        payload = json.dumps({'name': name})
-        try:
-            r = self.session.get(url=rest_url, data=payload)
-            r_json = r.json()
-            # RFC1912 - A CNAME can not coexist with any other data, we
-            # should expect utmost one entry
-            if r.status_code == 200 and len(r_json) == 1:
-                ibx_cname = r.json()[0]
-                cname_ref = ibx_cname['_ref']
-                payload = '{"canonical": ' + \
-                    json.JSONEncoder().encode(canonical) + '}'
-                rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                    self.iba_wapi_version + '/' + cname_ref
-                r = self.session.put(url=rest_url, data=payload)
-                if r.status_code == 200 or r.status_code == 201:
-                    return
-                else:
-                    r.raise_for_status()
-            elif len(r_json) == 0:
-                raise InfobloxNotFoundException("CNAME: " +
-                                                name + " not found.")
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json('GET', 'record:cname',
+                                        payload={'name': name})
+        # RFC1912 - A CNAME can not coexist with any other data, we
+        # should expect utmost one entry
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException("CNAME: " +
+                                            name + " not found.")
+        if len(r_json) == 1:
+            self.util.write('PUT', r_json[0]['_ref'],
+                            payload={'canonical': canonical})
 
     def create_dhcp_range(self, start_ip_v4, end_ip_v4):
         """ Implements IBA REST API call to add DHCP range for given
@@ -577,22 +822,10 @@ class Infoblox(object):
         :param start_ip_v4: IP v4 address
         :param end_ip_v4: IP v4 address
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/range'
-        payload = '{"start_addr": "' + start_ip_v4 + \
-            '","end_addr": "' + end_ip_v4 + '"}'
-        try:
-            r = self.session.post(url=rest_url, data=payload)
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        self.util.request_json('POST', 'range',
+                               payload={'start_addr': start_ip_v4,
+                                        'end_addr': end_ip_v4})
 
     def delete_dhcp_range(self, start_ip_v4, end_ip_v4):
         """ Implements IBA REST API call to delete DHCP range for given
@@ -600,40 +833,34 @@ class Infoblox(object):
         :param start_ip_v4: IP v4 address
         :param end_ip_v4: IP v4 address
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/range?start_addr=' + \
-            start_ip_v4 + '?end_addr=' + end_ip_v4 + '&network_view=' + \
-            self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    range_ref = r_json[0]['_ref']
-                    if range_ref:
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + range_ref
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No range reference received in IBA reply")
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested range found: " + start_ip_v4 + "-" + end_ip_v4)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'range', {'start_addr': start_ip_v4,
+                             'end_addr': end_ip_v4,
+                             'network_view': self.iba_network_view},
+            fields=self._profile('delete_dhcp_range'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested range found: " + start_ip_v4 + "-" + end_ip_v4)
+        range_ref = Ref(r_json[0]['_ref'])
+        if not range_ref.matches('range'):
+            raise InfobloxGeneralException(
+                "No range reference received in IBA reply")
+        self.util.write('DELETE', range_ref)
+
+    def exists(self, object_type, query_params):
+        """ Implements IBA REST API call to check whether objects exist,
+            reading their reference only
+        Returns True if any object matches the query
+        :param object_type: WAPI object type (e.g. record:host, network)
+        :param query_params: Key/Value query parameter dictonary (e.g.
+            {'name': 'a.example.com', 'view': 'default'})
+        """
+        query_params = dict(query_params)
+        # a negative maximum truncates the result instead of failing
+        query_params['_max_results'] = -1
+        return len(self.util.request_json('GET', object_type, query_params,
+                                          fields=[])) > 0
 
     def get_host(self, fqdn, fields=None, notFoundFail=True):
         """ Implements IBA REST API call to retrieve host record fields
@@ -654,6 +881,28 @@ class Infoblox(object):
             return r_json
         return r_json[0]
 
+    def get_hosts(self, fqdns, fields=None):
+        """ Implements IBA REST API calls to retrieve many host records with
+            a few chunked searches
+        Returns hash table of host records with the given FQDN as a hash key,
+        None for FQDNs without a host record
+        :param fqdns: list of hostnames in FQDN
+        :param fields: comma-separated list of field names (optional)
+        """
+        return self._get_by_names('record:host', fqdns,
+                                  {'view': self.iba_dns_view}, fields)
+
+    def _get_by_names(self, wapi_type, fqdns, query_params, fields):
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        if fields is not None and 'name' not in fields:
+            fields = ['name'] + list(fields)
+        # WAPI names are lower case and compared without case
+        found = dict((obj['name'], obj) for obj in self.util.get_in(
+            wapi_type, 'name', set(fqdn.lower() for fqdn in fqdns),
+            query_params=query_params, fields=fields))
+        return dict((fqdn, found.get(fqdn.lower())) for fqdn in fqdns)
+
     def get_host_by_alias(self, fqdn, fields=None, notFoundFail=True):
         """ Implements IBA REST API call to retrieve host record fields by alias
         Returns hash table of fields with field name as a hash key
@@ -675,31 +924,17 @@ class Infoblox(object):
 
     def get_host_by_regexp(self, fqdn):
         """ Implements IBA REST API call to retrieve host records by fqdn regexp filter
-        Returns array of host names in FQDN matched to given regexp filter
+        Returns array of host names in FQDN matched to given regexp filter,
+        see iter_host_by_regexp for the host records themselves
         :param fqdn: hostname in FQDN or FQDN regexp filter
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name~=' + \
-            fqdn + '&view=' + self.iba_dns_view
-        hosts = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        hosts.append(host['name'])
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No hosts found for regexp filter: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        r_json = self.util.request_json(
+            'GET', 'record:host', {'name~': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('get_host_by_regexp'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for regexp filter: " + fqdn)
+        return [host['name'] for host in r_json]
 
     def get_txt_by_regexp(self, fqdn):
         """ Implements IBA REST API call to retrieve TXT records by fqdn
@@ -708,34 +943,22 @@ class Infoblox(object):
             filter with the TXT value
         :param fqdn: hostname in FQDN or FQDN regexp filter
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:txt?name~=' + fqdn + \
-            '&view=' + self.iba_dns_view
-        hosts = {}
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        hosts[host['name']] = host['text']
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No txt records found for regexp filter: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'record:txt', {'name~': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('get_txt_by_regexp'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No txt records found for regexp filter: " + fqdn)
+        return dict((host['name'], host['text']) for host in r_json)
 
     def get_host_by_ip(self, ip_v4, fields=None, notFoundFail=True):
         """ Implements IBA REST API call to find hostname by IP address
         Returns array of host names in FQDN associated with given IP address
         :param ip_v4: IP v4 address
         """
+        if fields is None:
+            fields = self._profile('get_host_by_ip')
         r_json = self.get_ipv4address_by_ip(ip_v4, fields, notFoundFail)
         if r_json is None and notFoundFail is False:
             return r_json
@@ -759,36 +982,90 @@ class Infoblox(object):
             return r_json
         return r_json[0]
 
+    def get_hosts_by_ips(self, ips, jobs=1, prefixlen=24, min_addresses=4):
+        """ Implements IBA REST API calls to find the hostnames of many IP
+            addresses
+        Addresses are grouped by the network of the given prefix length they
+        are in. Groups with at least min_addresses addresses are read with
+        one paged ipv4address query for the range they span, the addresses
+        of smaller groups one by one.
+        Returns hash table of arrays of names with the IP v4 address as a
+        hash key, empty for addresses without names
+        :param ips: list of IP v4 addresses
+        :param jobs: number of requests running concurrently
+        :param prefixlen: prefix length of the groups (from 0 to 32)
+        :param min_addresses: smallest number of addresses of a group read
+            with one range query
+        """
+        import ipaddress
+        from .resultset import int_to_ip
+
+        mask = (0xffffffff << (32 - prefixlen)) & 0xffffffff
+        groups = {}
+        for ip in set(ips):
+            # dotted quads only, the keys of the result are the addresses
+            # as WAPI returns them (inet_aton would take 10.1 for 10.0.0.1)
+            try:
+                address = int(ipaddress.IPv4Address(u'%s' % (ip,)))
+            except ValueError:
+                raise InfobloxBadInputParameter(
+                    'Expected IP v4 address, got: %s' % (ip,))
+            groups.setdefault(address & mask, []).append(address)
+        queries = []
+        for block in sorted(groups):
+            addresses = sorted(groups[block])
+            if len(addresses) >= min_addresses:
+                queries.append((addresses[0], addresses[-1]))
+            else:
+                queries.extend((address, address) for address in addresses)
+
+        def names_in(query):
+            first, last = int_to_ip(query[0]), int_to_ip(query[1])
+            if first == last:
+                query_params = {'ip_address': first}
+            else:
+                query_params = {'ip_address>': first, 'ip_address<': last,
+                                'status': 'USED'}
+            query_params['network_view'] = self.iba_network_view
+            return [(obj['ip_address'], obj.get('names') or [])
+                    for obj in self.util.get_paged(
+                        'ipv4address', query_params=query_params,
+                        fields=['ip_address', 'names'])]
+
+        if jobs > 1:
+            self.session.ensure_pool_size(jobs)
+        found = {}
+        for names in imap(names_in, queries, jobs):
+            found.update(names)
+        return dict((ip, found.get(ip, [])) for ip in ips)
+
     def get_ip_by_host(self, fqdn):
         """ Implements IBA REST API call to find IP addresses by hostname
         Returns array of IP v4 addresses associated with given hostname
         :param fqdn: hostname in FQDN
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name=' + \
-            fqdn + '&view=' + self.iba_dns_view
-        ipv4addrs = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    if len(r_json[0]['ipv4addrs']) > 0:
-                        for ipv4addr in r_json[0]['ipv4addrs']:
-                            ipv4addrs.append(ipv4addr['ipv4addr'])
-                        return ipv4addrs
-                    else:
-                        raise InfobloxNotFoundException(
-                            "No host records found for FQDN: " + fqdn)
-                else:
-                    raise InfobloxNotFoundException("No hosts found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'record:host', {'name': fqdn, 'view': self.iba_dns_view},
+            fields=self._profile('get_ip_by_host'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException("No hosts found: " + fqdn)
+        if len(r_json[0]['ipv4addrs']) == 0:
+            raise InfobloxNotFoundException(
+                "No host records found for FQDN: " + fqdn)
+        return [ipv4addr['ipv4addr'] for ipv4addr in r_json[0]['ipv4addrs']]
+
+    def get_ips_by_hosts(self, fqdns):
+        """ Implements IBA REST API calls to find the IP addresses of many
+            hostnames with a few chunked searches
+        Returns hash table of arrays of IP v4 addresses with the given FQDN as
+        a hash key, None for FQDNs without a host record
+        :param fqdns: list of hostnames in FQDN
+        """
+        hosts = self.get_hosts(fqdns, fields=['name', 'ipv4addrs'])
+        return dict((fqdn, None if host is None else
+                     [a['ipv4addr'] for a in host.get('ipv4addrs', [])])
+                    for fqdn, host in hosts.items())
 
     def get_host_extattrs(self, fqdn, attributes=None):
         """ Implements IBA REST API call to retrieve host extensible attributes
@@ -796,38 +1073,24 @@ class Infoblox(object):
         :param fqdn: hostname in FQDN
         :param attributes: array of extensible attribute names (optional)
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name=' + fqdn + \
-            '&view=' + self.iba_dns_view + '&_return_fields=name,extattrs'
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    extattrs = {}
-                    if attributes:
-                        for attribute in attributes:
-                            if attribute in r_json[0]['extattrs']:
-                                extattrs[attribute] = \
-                                    r_json[0]['extattrs'][attribute]['value']
-                            else:
-                                raise InfobloxNotFoundException(
-                                    "No requested attribute found: " + attribute)
-                    else:
-                        for attribute in r_json[0]['extattrs'].keys():
-                            extattrs[attribute] = \
-                                r_json[0]['extattrs'][attribute]['value']
-                    return extattrs
-                else:
+
+        r_json = self.util.request_json(
+            'GET', 'record:host', {'name': fqdn, 'view': self.iba_dns_view},
+            fields='name,extattrs', error=InfobloxNotFoundException)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested host found: " + fqdn)
+        extattrs = {}
+        if attributes:
+            for attribute in attributes:
+                if attribute not in r_json[0]['extattrs']:
                     raise InfobloxNotFoundException(
-                        "No requested host found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+                        "No requested attribute found: " + attribute)
+                extattrs[attribute] = r_json[0]['extattrs'][attribute]['value']
+        else:
+            for attribute in r_json[0]['extattrs'].keys():
+                extattrs[attribute] = r_json[0]['extattrs'][attribute]['value']
+        return extattrs
 
     def get_network(self, network, fields=None):
         """ Implements IBA REST API call to retrieve network object fields
@@ -837,30 +1100,16 @@ class Infoblox(object):
             (optional, returns network in CIDR format and netmask if
              not specified)
         """
-        if not fields:
-            fields = 'network,netmask'
-        if type(fields) is not str:
-            fields = ','.join(fields)
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + network + \
-            '&network_view=' + self.iba_network_view + '&_return_fields=' + \
-            fields
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    return r_json[0]
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields=fields or 'network,netmask',
+            error=InfobloxNotFoundException)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        return r_json[0]
 
     def get_network_by_ip(self, ip_v4):
         """ Implements IBA REST API call to find network by IP address which
@@ -868,33 +1117,24 @@ class Infoblox(object):
         Returns network in CIDR format
         :param ip_v4: IP v4 address
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/ipv4address?ip_address=' + ip_v4 + \
-            '&network_view=' + self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    if 'network' in r_json[0]:
-                        return r_json[0]['network']
-                    else:
-                        raise InfobloxNotFoundException(
-                            "No network found for IP: " + ip_v4)
-                else:
-                    raise InfobloxNotFoundException("No IP found: " + ip_v4)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'ipv4address', {'ip_address': ip_v4,
+                                   'network_view': self.iba_network_view},
+            fields=self._profile('get_network_by_ip'),
+            error=InfobloxNotFoundException)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException("No IP found: " + ip_v4)
+        if 'network' not in r_json[0]:
+            raise InfobloxNotFoundException(
+                "No network found for IP: " + ip_v4)
+        return r_json[0]['network']
 
     def get_network_by_extattrs(self, attributes):
         """ Implements IBA REST API call to find a network by it's
             extensible attributes
-        Returns array of networks in CIDR format
+        Returns array of networks in CIDR format, see iter_network_by_extattrs
+        for the networks themselves
         :param attributes: comma-separated list of attrubutes name/value
             pairs in the format:
             attr_name=attr_value - exact match for attribute value
@@ -905,34 +1145,21 @@ class Infoblox(object):
             attr_name<=attr_value - search by number less than value
             attr_name!=attr_value - search by number not equal of value
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?*' + \
-            "&*".join(attributes.split(",")) + '&network_view=' + \
-            self.iba_network_view
-        networks = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for network in r_json:
-                        if 'network' in network:
-                            networks.append(network['network'])
-                    return networks
-                else:
-                    raise InfobloxNotFoundException(
-                        "No networks found for extensible attributes: " + attributes)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        query_params = extattrs_query(attributes)
+        query_params['network_view'] = self.iba_network_view
+        r_json = self.util.request_json(
+            'GET', 'network', query_params,
+            fields=self._profile('get_network_by_extattrs'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No networks found for extensible attributes: " + attributes)
+        return [network['network'] for network in r_json
+                if 'network' in network]
 
     def get_host_by_extattrs(self, attributes):
         """ Implements IBA REST API call to find host by it's extensible attributes
-        Returns array of hosts in FQDN
+        Returns array of hosts in FQDN, see iter_host_by_extattrs for the
+        host records themselves
         :param attributes: comma-separated list of attrubutes name/value
             pairs in the format:
             attr_name=attr_value - exact match for attribute value
@@ -943,29 +1170,16 @@ class Infoblox(object):
             attr_name<=attr_value - search by number less than value
             attr_name!=attr_value - search by number not equal of value
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?*' + \
-            "&*".join(attributes.split(",")) + '&view=' + self.iba_dns_view
-        hosts = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        if 'name' in host:
-                            hosts.append(host['name'])
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No hosts found for extensible attributes: " + attributes)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        query_params = extattrs_query(attributes)
+        query_params['view'] = self.iba_dns_view
+        r_json = self.util.request_json(
+            'GET', 'record:host', query_params,
+            fields=self._profile('get_host_by_extattrs'),
+            error=InfobloxNotFoundException)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for extensible attributes: " + attributes)
+        return [host['name'] for host in r_json if 'name' in host]
 
     def get_network_extattrs(self, network, attributes=None):
         """ Implements IBA REST API call to retrieve network extensible attributes
@@ -973,38 +1187,25 @@ class Infoblox(object):
         :param network: network in CIDR format
         :param attributes: array of extensible attribute names (optional)
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + network + \
-            '&network_view=' + self.iba_network_view + \
-            '&_return_fields=network,extattrs'
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    extattrs = {}
-                    if attributes:
-                        for attribute in attributes:
-                            if attribute in r_json[0]['extattrs']:
-                                extattrs[attribute] = r_json[0]['extattrs'][attribute]['value']
-                            else:
-                                raise InfobloxNotFoundException(
-                                    "No requested attribute found: " + attribute)
-                    else:
-                        for attribute in r_json[0]['extattrs'].keys():
-                            extattrs[attribute] = \
-                                r_json[0]['extattrs'][attribute]['value']
-                        return extattrs
-                else:
+
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields='network,extattrs', error=InfobloxNotFoundException)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        extattrs = {}
+        if attributes:
+            for attribute in attributes:
+                if attribute not in r_json[0]['extattrs']:
                     raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+                        "No requested attribute found: " + attribute)
+                extattrs[attribute] = r_json[0]['extattrs'][attribute]['value']
+        else:
+            for attribute in r_json[0]['extattrs'].keys():
+                extattrs[attribute] = r_json[0]['extattrs'][attribute]['value']
+        return extattrs
 
     def update_network_extattrs(self, network, attributes):
         """ Implements IBA REST API call to add or update network extensible attributes
@@ -1012,260 +1213,391 @@ class Infoblox(object):
         :param attributes: hash table of extensible attributes with attribute
             name as a hash key
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + \
-            network + '&network_view=' + self.iba_network_view + \
-            '&_return_fields=network,extattrs'
-        extattrs = {}
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    network_ref = r_json[0]['_ref']
-                    if network_ref:
-                        extattrs = r_json[0]['extattrs']
-                        for attr_name, attr_value in attributes.items():
-                            if attr_name in extattrs:
-                                extattrs[attr_name]['value'] = attr_value
-                            else:
-                                extattrs.update({attr_name: {"value": attr_value}})
-                        payload = '{"extattrs": ' + \
-                            json.JSONEncoder().encode(extattrs) + '}'
-                        rest_url = 'https://' + self.iba_host + \
-                            '/wapi/v' + self.iba_wapi_version + \
-                            '/' + network_ref
-                        r = self.session.put(url=rest_url, data=payload)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No network reference received in IBA reply for network: " + network)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
+
+        if self._use_incremental_updates():
+            self._update_network(network, {'extattrs+': dict(
+                (name, {'value': value})
+                for name, value in attributes.items())})
+            return
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields='network,extattrs')
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        network_ref = Ref(r_json[0]['_ref'])
+        if not network_ref.matches('network', network):
+            raise InfobloxGeneralException(
+                "No network reference received in IBA reply for network: " + network)
+        extattrs = copy.deepcopy(r_json[0]['extattrs'])
+        for attr_name, attr_value in attributes.items():
+            if attr_name in extattrs:
+                extattrs[attr_name]['value'] = attr_value
             else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+                extattrs.update({attr_name: {"value": attr_value}})
+        self.util.write('PUT', network_ref, payload={'extattrs': extattrs})
 
     def delete_network_extattrs(self, network, attributes):
         """ Implements IBA REST API call to delete network extensible attributes
         :param network: network in CIDR format
-        :param attributes: array of extensible attribute names
+        :param attributes: array of extensible attribute names, names the
+            network doesn't have are ignored
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + \
-            network + '&network_view=' + self.iba_network_view + \
-            '&_return_fields=network,extattrs'
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    network_ref = r_json[0]['_ref']
-                    if network_ref:
-                        extattrs = r_json[0]['extattrs']
-                        for attribute in attributes:
-                            if attribute in extattrs:
-                                del extattrs[attribute]
-                        payload = '{"extattrs": ' + \
-                            json.JSONEncoder().encode(extattrs) + '}'
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + network_ref
-                        r = self.session.put(url=rest_url, data=payload)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No network reference received in IBA reply for network: " + network)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
 
+        if self._use_incremental_updates():
+            self._update_network(network, {'extattrs-': dict(
+                (name, {}) for name in attributes)})
+            return
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields='network,extattrs')
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        network_ref = Ref(r_json[0]['_ref'])
+        if not network_ref.matches('network', network):
+            raise InfobloxGeneralException(
+                "No network reference received in IBA reply for network: " + network)
+        extattrs = dict(r_json[0]['extattrs'])
+        for attribute in attributes:
+            if attribute in extattrs:
+                del extattrs[attribute]
+        self.util.write('PUT', network_ref, payload={'extattrs': extattrs})
 
     def comment_network(self, network, comment):
         """ Implements IBA REST API call to replace the comment field in a network object
         :param network: network in CIDR format
         :param comment: new comment
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + \
-            network + '&network_view=' + self.iba_network_view + \
-            '&_return_fields=network,extattrs'
-        extattrs = {}
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    network_ref = r_json[0]['_ref']
-                    if network_ref:
-                        payload = '{"comment": ' + \
-                            json.JSONEncoder().encode(comment) + '}'
-                        rest_url = 'https://' + self.iba_host + \
-                            '/wapi/v' + self.iba_wapi_version + \
-                            '/' + network_ref
-                        r = self.session.put(url=rest_url, data=payload)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No network reference received in IBA reply for network: " + network)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
 
+        r_json = self.util.request_json(
+            'GET', 'network', {'network': network,
+                               'network_view': self.iba_network_view},
+            fields=self._profile('comment_network'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        network_ref = Ref(r_json[0]['_ref'])
+        if not network_ref.matches('network', network):
+            raise InfobloxGeneralException(
+                "No network reference received in IBA reply for network: " + network)
+        self.util.write('PUT', network_ref, payload={'comment': comment})
 
     def create_network(self, network):
         """ Implements IBA REST API call to create DHCP network object
         :param network: network in CIDR format
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network'
-        payload = '{"network": "' + network + '","network_view": "' + \
-            self.iba_network_view + '"}'
-        try:
-            r = self.session.post(url=rest_url, data=payload)
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        self.util.request_json('POST', 'network',
+                               payload={'network': network,
+                                        'network_view': self.iba_network_view})
 
     def delete_network(self, network):
         """ Implements IBA REST API call to delete DHCP network object
         :param network: network in CIDR format
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?network=' + \
-            network + '&network_view=' + self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    network_ref = r_json[0]['_ref']
-                    if network_ref:
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + network_ref
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No network reference received in IBA reply for network: " + network)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No network found: " + network)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'network',
+            {'network': network, 'network_view': self.iba_network_view},
+            fields=self._profile('delete_network'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No network found: " + network)
+        network_ref = Ref(r_json[0]['_ref'])
+        if not network_ref.matches('network', network):
+            raise InfobloxGeneralException(
+                "No network reference received in IBA reply for network: " + network)
+        self.util.write('DELETE', network_ref)
 
     def create_networkcontainer(self, networkcontainer):
         """ Implements IBA REST API call to create DHCP network containert object
         :param networkcontainer: network container in CIDR format
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/networkcontainer'
-        payload = '{"network": "' + networkcontainer + \
-            '","network_view": "' + self.iba_network_view + '"}'
-        try:
-            r = self.session.post(url=rest_url, data=payload)
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        self.util.request_json('POST', 'networkcontainer',
+                               payload={'network': networkcontainer,
+                                        'network_view': self.iba_network_view})
 
     def delete_networkcontainer(self, networkcontainer):
         """ Implements IBA REST API call to delete DHCP network container object
         :param networkcontainer: network container in CIDR format
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/networkcontainer?network=' + \
-            networkcontainer + '&network_view=' + self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    network_ref = r_json[0]['_ref']
-                    if network_ref:
-                        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                            self.iba_wapi_version + '/' + network_ref
-                        r = self.session.delete(url=rest_url)
-                        if r.status_code == 200:
-                            return
-                        else:
-                            if 'text' in r_json:
-                                raise InfobloxGeneralException(r_json['text'])
-                            else:
-                                r.raise_for_status()
-                    else:
-                        raise InfobloxGeneralException(
-                            "No network container reference received in IBA reply for network container: " + networkcontainer)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No network container found: " + networkcontainer)
+
+        r_json = self.util.request_json(
+            'GET', 'networkcontainer',
+            {'network': networkcontainer, 'network_view': self.iba_network_view},
+            fields=self._profile('delete_networkcontainer'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No network container found: " + networkcontainer)
+        network_ref = Ref(r_json[0]['_ref'])
+        if not network_ref.matches('networkcontainer', networkcontainer):
+            raise InfobloxGeneralException(
+                "No network container reference received in IBA reply for network container: " + networkcontainer)
+        self.util.write('DELETE', network_ref)
+
+    def _parse_networks(self, networks):
+        """Validate and sort networks in CIDR format.
+        :return: tuple of the sorted ipaddress networks and a list of
+            (network, error) for the invalid ones and for every repetition
+            of a network given more than once
+        """
+        import ipaddress
+        valid = {}
+        invalid = []
+        for network in networks:
+            try:
+                parsed = ipaddress.ip_network(u'%s' % network)
+            except ValueError as e:
+                invalid.append((network, str(e)))
+                continue
+            if parsed.version != 4:
+                invalid.append((network, 'Expected IPv4 network'))
+                continue
+            if parsed in valid:
+                invalid.append((network, 'Duplicate network: %s' % parsed))
+                continue
+            valid[parsed] = network
+        return sorted(valid), invalid
+
+    def _nesting_levels(self, networks):
+        """Group sorted networks by how many of the others contain them."""
+        levels = []
+        for network in networks:
+            depth = sum(1 for other in networks
+                        if other.prefixlen < network.prefixlen and
+                        other.overlaps(network))
+            while len(levels) <= depth:
+                levels.append([])
+            levels[depth].append(network)
+        return levels
+
+    def _write_networks(self, method, wapi_type, networks, refs, jobs,
+                        batch_size):
+        operations = []
+        for network in networks:
+            if method == 'POST':
+                operations.append({
+                    'method': 'POST', 'object': wapi_type,
+                    'data': {'network': str(network),
+                             'network_view': self.iba_network_view}})
             else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+                operations.append({'method': 'DELETE',
+                                   'object': refs[str(network)]})
+        errors = self.util.write_many(operations, jobs=jobs,
+                                      batch_size=batch_size)
+        return [(str(network), error)
+                for network, error in zip(networks, errors)]
+
+    def create_networkcontainers(self, networkcontainers, jobs=1,
+                                 batch_size=None):
+        """Create many network containers, containers within other
+            containers of the list after those
+        :param networkcontainers: list of network containers in CIDR format
+        :param jobs: number of requests running concurrently
+        :param batch_size: containers per WAPI multi-object request
+            (optional)
+        :return: list of (network container, error) tuples, error is None
+            for the containers which were created
+        """
+        parsed, results = self._parse_networks(networkcontainers)
+        for level in self._nesting_levels(parsed):
+            results.extend(self._write_networks(
+                'POST', 'networkcontainer', level, None, jobs, batch_size))
+        return results
+
+    def create_networks(self, networks, networkcontainers=(), jobs=1,
+                        batch_size=None):
+        """Create many networks, after the network containers they go in
+        :param networks: list of networks in CIDR format
+        :param networkcontainers: list of network containers in CIDR format
+            to create first (optional)
+        :param jobs: number of requests running concurrently
+        :param batch_size: networks per WAPI multi-object request (optional)
+        :return: list of (network, error) tuples, error is None for the
+            networks and containers which were created
+        """
+        results = []
+        if networkcontainers:
+            results = self.create_networkcontainers(
+                networkcontainers, jobs=jobs, batch_size=batch_size)
+        parsed, invalid = self._parse_networks(networks)
+        results.extend(invalid)
+        results.extend(self._write_networks('POST', 'network', parsed, None,
+                                            jobs, batch_size))
+        return results
+
+    def _delete_networks(self, wapi_type, networks, jobs, batch_size):
+        parsed, results = self._parse_networks(networks)
+        refs = dict((obj['network'], obj['_ref']) for obj in self.util.get_in(
+            wapi_type, 'network', [str(network) for network in parsed],
+            query_params={'network_view': self.iba_network_view},
+            fields=['network']))
+        found = []
+        for network in parsed:
+            if str(network) in refs:
+                found.append(network)
+            else:
+                results.append((str(network),
+                                'No %s found: %s' % (wapi_type, network)))
+        # containers within other containers of the list go first
+        for level in reversed(self._nesting_levels(found)):
+            results.extend(self._write_networks('DELETE', wapi_type, level,
+                                                refs, jobs, batch_size))
+        return results
+
+    def delete_networks(self, networks, jobs=1, batch_size=None):
+        """Delete many networks, finding their references with a few paged
+            searches
+        :param networks: list of networks in CIDR format
+        :param jobs: number of requests running concurrently
+        :param batch_size: networks per WAPI multi-object request (optional)
+        :return: list of (network, error) tuples, error is None for the
+            networks which were deleted
+        """
+        return self._delete_networks('network', networks, jobs, batch_size)
+
+    def delete_networkcontainers(self, networkcontainers, jobs=1,
+                                 batch_size=None):
+        """Delete many network containers, containers within other
+            containers of the list first
+        :param networkcontainers: list of network containers in CIDR format
+        :param jobs: number of requests running concurrently
+        :param batch_size: containers per WAPI multi-object request
+            (optional)
+        :return: list of (network container, error) tuples, error is None
+            for the containers which were deleted
+        """
+        return self._delete_networks('networkcontainer', networkcontainers,
+                                     jobs, batch_size)
+
+    def _select_extattr_objects(self, object_type, extattrs, values, regexp):
+        if object_type not in EXTATTR_OBJECT_TYPES:
+            raise InfobloxBadInputParameter(
+                'Unsupported object type %r, expected one of %s' %
+                (object_type, ', '.join(sorted(EXTATTR_OBJECT_TYPES))))
+        if len([s for s in (extattrs, values, regexp) if s is not None]) != 1:
+            raise InfobloxBadInputParameter(
+                'Select the objects by exactly one of extattrs, values and '
+                'regexp')
+        wapi_type, key, field, view = EXTATTR_OBJECT_TYPES[object_type]
+        query_params = {view: self.iba_dns_view if view == 'view'
+                        else self.iba_network_view}
+        fields = sorted(set([key, field, 'extattrs']))
+        if values is not None:
+            return self.util.get_in(wapi_type, field, values,
+                                    query_params=query_params, fields=fields)
+        if extattrs is not None:
+            query_params.update(extattrs_query(extattrs))
+        else:
+            query_params[field + '~'] = regexp
+        return self.util.get_paged(wapi_type, query_params=query_params,
+                                   fields=fields)
+
+    def _write_extattrs(self, object_type, changes, selection, jobs,
+                        batch_size):
+        """Change the extensible attributes of the selected objects.
+        :param changes: function returning the new extensible attributes of
+            an object ({name: value}, None for removed ones) from the
+            current ones
+        """
+        objects = self._select_extattr_objects(object_type, *selection)
+        __, key, field, __ = EXTATTR_OBJECT_TYPES[object_type]
+        incremental = self._use_incremental_updates()
+        results = []
+        operations = []
+        found = set()
+        for obj in objects:
+            found.add(obj.get(field))
+            current = dict((name, attr.get('value'))
+                           for name, attr in (obj.get('extattrs') or
+                                              {}).items())
+            changed = dict((name, value)
+                           for name, value in changes(current).items()
+                           if current.get(name) != value)
+            if not changed:
+                # nothing to write, report it as done
+                results.append((obj[key], None))
+                continue
+            if incremental:
+                data = {}
+                updated = dict((name, {'value': value})
+                               for name, value in changed.items()
+                               if value is not None)
+                removed = dict((name, {})
+                               for name, value in changed.items()
+                               if value is None)
+                if updated:
+                    data['extattrs+'] = updated
+                if removed:
+                    data['extattrs-'] = removed
+            else:
+                current.update(changed)
+                data = {'extattrs': dict(
+                    (name, {'value': value})
+                    for name, value in current.items() if value is not None)}
+            operations.append((len(results), {'method': 'PUT',
+                                              'object': obj['_ref'],
+                                              'data': data}))
+            results.append((obj[key], None))
+        values = selection[1]
+        for value in sorted(set(values or ()) - found):
+            results.append((value, 'No %s found' % object_type))
+        errors = self.util.write_many([op for __, op in operations],
+                                      jobs=jobs, batch_size=batch_size)
+        for (index, __), error in zip(operations, errors):
+            results[index] = (results[index][0], error)
+        return results
+
+    def update_extattrs(self, object_type, attributes, extattrs=None,
+                        values=None, regexp=None, jobs=1, batch_size=None):
+        """Add or update extensible attributes of many objects, selected by
+            one paged search
+        :param object_type: 'network', 'host' or 'fixedaddress'
+        :param attributes: hash table of extensible attributes with attribute
+            name as a hash key
+        :param extattrs: select the objects by extensible attributes,
+            comma-separated list of filters, see get_host_by_extattrs
+        :param values: select the objects by a list of networks in CIDR
+            format (networks, and fixed addresses by their network) or FQDNs
+            (host records)
+        :param regexp: select the objects by a regular expression matching
+            the same field as values
+        :param jobs: number of requests running concurrently
+        :param batch_size: objects per WAPI multi-object request (optional)
+        :return: list of (name, error) tuples, where name is the network,
+            host FQDN or fixed IP v4 address and error is None for the
+            objects which have the attributes now; values matching no object
+            are reported last with the error 'No <object_type> found'
+        """
+        return self._write_extattrs(
+            object_type, lambda current: dict(attributes),
+            (extattrs, values, regexp), jobs, batch_size)
+
+    def delete_extattrs(self, object_type, attributes, extattrs=None,
+                        values=None, regexp=None, jobs=1, batch_size=None):
+        """Remove extensible attributes from many objects, selected by one
+            paged search
+        :param object_type: 'network', 'host' or 'fixedaddress'
+        :param attributes: array of extensible attribute names
+        :param extattrs: select the objects by extensible attributes, see
+            update_extattrs
+        :param values: select the objects by networks or FQDNs, see
+            update_extattrs
+        :param regexp: select the objects by a regular expression, see
+            update_extattrs
+        :param jobs: number of requests running concurrently
+        :param batch_size: objects per WAPI multi-object request (optional)
+        :return: list of (name, error) tuples, see update_extattrs; error
+            is None for the objects which do not have the attributes now
+        """
+        return self._write_extattrs(
+            object_type, lambda current: dict((name, None)
+                                              for name in attributes),
+            (extattrs, values, regexp), jobs, batch_size)
 
     def get_next_available_network(self, networkcontainer, cidr):
         """ Implements IBA REST API call to retrieve next available network
@@ -1274,44 +1606,21 @@ class Infoblox(object):
         :param networkcontainer: network container address in CIDR format
         :param cidr: requested network length (from 0 to 32)
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/networkcontainer?network=' + \
-            networkcontainer + '&network_view=' + self.iba_network_view
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    net_ref = r_json[0]['_ref']
-                    rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                        self.iba_wapi_version + '/' + net_ref + \
-                        '?_function=next_available_network&cidr=' + \
-                        str(cidr) + '&num=1'
-                    r = self.session.post(url=rest_url)
-                    r_json = r.json()
-                    if r.status_code == 200:
-                        network = r_json['networks'][0]
-                        return network
-                    else:
-                        if 'text' in r_json:
-                            if ('code' in r_json and
-                                    r_json['code'] == 'Client.Ibap.Data'):
-                                raise InfobloxNoNetworkAvailableException(
-                                    r_json['text'])
-                            else:
-                                raise InfobloxGeneralException(r_json['text'])
-                        else:
-                            r.raise_for_status()
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested network container found: " + networkcontainer)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+
+        r_json = self.util.request_json(
+            'GET', 'networkcontainer',
+            {'network': networkcontainer,
+             'network_view': self.iba_network_view},
+            fields=self._profile('get_next_available_network'))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network container found: " + networkcontainer)
+        r_json = self.util.request_json(
+            'POST', r_json[0]['_ref'],
+            {'_function': 'next_available_network', 'cidr': cidr, 'num': 1},
+            error_codes={
+                'Client.Ibap.Data': InfobloxNoNetworkAvailableException})
+        return r_json['networks'][0]
 
     def get_a_record_by_ip(self, ipaddr, fields=None, not_found_fail=True):
         """Retrieve A record by IP Address
@@ -1336,28 +1645,15 @@ class Infoblox(object):
         """
 
         # canonical instead of name?
-        rest_url = "{}/record:a?name={}".format(self.base_url, fqdn)
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    a_ref = r_json[0]['_ref']
-                    if a_ref and re.match("record:a\/[^:]+:([^\/]+)\/", a_ref).group(1) == fqdn:
-                        return r_json[0]
-                    else:
-                        raise InfobloxGeneralException(
-                            "Received unexpected A record  reference: " + a_ref)
-                else:
-                    raise InfobloxNotFoundException(
-                        "No requested A record found: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        r_json = self.util.request_json('GET', 'record:a', {'name': fqdn})
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested A record found: " + fqdn)
+        a_ref = Ref(r_json[0]['_ref'])
+        if a_ref.matches('record:a', fqdn):
+            return r_json[0]
+        raise InfobloxGeneralException(
+            "Received unexpected A record  reference: " + a_ref)
 
     def update_record(self, record, fields, confirm):
         self.util.put(record, fields, confirm)
@@ -1486,6 +1782,223 @@ class Infoblox(object):
 
         return r_json
 
+    def iter_lease(self, query_params=None, fields=None, page_size=1000,
+                   models=False):
+        """Iterate over DHCP Leases, fetching them page by page
+        :param query_params: dictionary of fields to query lease against
+        :param fields: comma-separated list of field names (optional)
+        :param page_size: number of leases fetched per request
+        :param models: yield record objects (see infoblox.models)
+            instead of dictionaries
+        """
+        return self.util.get_paged('lease', query_params=query_params,
+                                   fields=fields, page_size=page_size,
+                                   models=models)
+
+    def iter_host_by_regexp(self, fqdn, fields=None, page_size=1000,
+                            models=False, full=False):
+        """Iterate over host records matching a fqdn regexp filter,
+            fetching them page by page
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        :param fields: comma-separated list of field names (optional)
+        :param page_size: number of records fetched per request
+        :param models: yield record objects (see infoblox.models)
+            instead of dictionaries
+        :param full: also return all commonly used fields (see FULL_FIELDS)
+        """
+        return self.util.get_paged('record:host',
+                                   query_params={'name~': fqdn,
+                                                 'view': self.iba_dns_view},
+                                   fields=_search_fields('record:host',
+                                                         fields, full),
+                                   page_size=page_size, models=models)
+
+    def iter_txt_by_regexp(self, fqdn, fields=None, page_size=1000,
+                           models=False):
+        """Iterate over TXT records matching a fqdn regexp filter,
+            fetching them page by page
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        :param fields: comma-separated list of field names (optional)
+        :param page_size: number of records fetched per request
+        :param models: yield record objects (see infoblox.models)
+            instead of dictionaries
+        """
+        return self.util.get_paged('record:txt',
+                                   query_params={'name~': fqdn,
+                                                 'view': self.iba_dns_view},
+                                   fields=fields, page_size=page_size,
+                                   models=models)
+
+    def iter_host_by_extattrs(self, attributes, fields=None, page_size=1000,
+                              models=False, full=False):
+        """Iterate over host records matching extensible attributes,
+            fetching them page by page
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs, see get_host_by_extattrs
+        :param fields: comma-separated list of field names (optional)
+        :param page_size: number of records fetched per request
+        :param models: yield record objects (see infoblox.models)
+            instead of dictionaries
+        :param full: also return all commonly used fields (see FULL_FIELDS)
+        """
+        query_params = extattrs_query(attributes)
+        query_params['view'] = self.iba_dns_view
+        return self.util.get_paged('record:host', query_params=query_params,
+                                   fields=_search_fields('record:host',
+                                                         fields, full),
+                                   page_size=page_size, models=models)
+
+    def iter_network_by_extattrs(self, attributes, fields=None,
+                                 page_size=1000, models=False, full=False):
+        """Iterate over networks matching extensible attributes,
+            fetching them page by page
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs, see get_network_by_extattrs
+        :param fields: comma-separated list of field names (optional)
+        :param page_size: number of networks fetched per request
+        :param models: yield record objects (see infoblox.models)
+            instead of dictionaries
+        :param full: also return all commonly used fields (see FULL_FIELDS)
+        """
+        query_params = extattrs_query(attributes)
+        query_params['network_view'] = self.iba_network_view
+        return self.util.get_paged('network', query_params=query_params,
+                                   fields=_search_fields('network', fields,
+                                                         full),
+                                   page_size=page_size, models=models)
+
+    def get_network_utilization(self, network, blocks=3):
+        """Compute the utilization of a network from its used addresses,
+            read with one paged ipv4address query
+        :param network: network in CIDR format
+        :param blocks: number of largest free blocks to report
+        :return: infoblox.utilization.Utilization
+        """
+        from . import utilization
+        addresses = self.util.get_paged(
+            'ipv4address',
+            query_params={'network': network,
+                          'network_view': self.iba_network_view,
+                          'status': 'USED'},
+            fields=['ip_address', 'types'])
+        return utilization.compute(network, addresses, blocks=blocks)
+
+    def _container_networks(self, networkcontainer):
+        fields = ['network']
+        query_params = {'network_container': networkcontainer,
+                        'network_view': self.iba_network_view}
+        for network in self.util.get_paged('network',
+                                           query_params=dict(query_params),
+                                           fields=fields):
+            yield network['network']
+        for container in self.util.get_paged('networkcontainer',
+                                             query_params=dict(query_params),
+                                             fields=fields):
+            for network in self._container_networks(container['network']):
+                yield network
+
+    def iter_container_utilization(self, networkcontainer, jobs=1,
+                                   blocks=3):
+        """Compute the utilization of all networks in a network container
+            and the containers within it
+        :param networkcontainer: network container in CIDR format
+        :param jobs: number of networks read concurrently
+        :param blocks: number of largest free blocks to report per network
+        :return: iterator of infoblox.utilization.Utilization
+        """
+        from .bulk import imap
+        if jobs > 1:
+            self.session.ensure_pool_size(jobs)
+
+        def network_utilization(network):
+            return self.get_network_utilization(network, blocks=blocks)
+
+        return imap(network_utilization,
+                    self._container_networks(networkcontainer), jobs)
+
+
+def extattrs_query(attributes):
+    """Turn a comma-separated list of extensible attribute filters
+    (attr_name=value, attr_name~=regexp, attr_name:=value, ...) into WAPI
+    query parameters.
+    """
+    query_params = {}
+    for attribute in attributes.split(','):
+        name, sep, value = attribute.partition('=')
+        if not sep:
+            raise InfobloxBadInputParameter(
+                'Expected extensible attribute filter, got: ' + attribute)
+        query_params['*' + name] = value
+    return query_params
+
+
+def _search_fields(wapi_type, fields, full):
+    """Return the fields an iter_* search method asks for: fields, plus
+    FULL_FIELDS of the object type with full."""
+    if not full:
+        return fields
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = list(fields or [])
+    fields.extend(f for f in FULL_FIELDS[wapi_type] if f not in fields)
+    return fields
+
+
+def _fields_param(fields):
+    """Return a string or list of fields as the _return_fields value."""
+    if isinstance(fields, str):
+        return fields
+    return ','.join(fields)
+
+
+def _raise_wapi_error(r, r_json, error=InfobloxGeneralException,
+                      error_codes=None):
+    """Raise the exception for an unsuccessful WAPI response."""
+    if isinstance(r_json, dict) and 'text' in r_json:
+        error = (error_codes or {}).get(r_json.get('code'), error)
+        raise error(r_json['text'])
+    r.raise_for_status()
+    raise error(r)
+
+
+def _query_matches(obj, name, value):
+    """Return whether a known object may be found by a search field. Objects
+    read without the field match as well, and a list field (e.g. aliases)
+    matches if it contains the value."""
+    if name not in obj:
+        return True
+    if isinstance(obj[name], list):
+        return value in obj[name]
+    return obj[name] == value
+
+
+def _error_json(r):
+    """Return the decoded body of an unsuccessful response, None if it is
+    not JSON.
+    """
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+
+def _host_addresses(host):
+    """Return the addresses of a host record as they are written back."""
+    return [dict((k, v) for k, v in address.items()
+                 if k not in ('_ref', 'host'))
+            for address in host.get('ipv4addrs', [])]
+
+
+def _error_text(error):
+    """Return the WAPI error text of a failed request if there is one."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return response.json()['text']
+        except (ValueError, KeyError, TypeError):
+            pass
+    return str(error)
+
 
 class Util(object):
 
@@ -1516,6 +2029,102 @@ class Util(object):
         self.iba_dns_view = iba_dns_view
         self.iba_network_view = iba_network_view
         self.iba_verify_ssl = iba_verify_ssl
+        self.base_url = 'https://%s/wapi/v%s/' % (iba_ipaddr, iba_wapi_version)
+        # IdentityMap all decoded objects are merged into (optional)
+        self.identity_map = None
+
+    def request(self, method, uri, query_params=None, fields=None,
+                payload=None):
+        """Execute a request. All WAPI calls go through here and the
+        session's pipeline (see Session.add_middleware).
+        :param method: HTTP method
+        :param uri: The URI component (object type or reference, e.g. --
+            record:host, network/ZG5z...:10.0.0.0/24/default)
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return.
+        :param payload: data sent as JSON (optional)
+        :return: requests.Response
+        """
+        if fields is not None:
+            query_params = dict(query_params or {})
+            query_params['_return_fields'] = _fields_param(fields)
+        if method != 'GET':
+            self._evict(uri)
+        return self.session.request(
+            method, self.base_url + uri, params=query_params,
+            data=None if payload is None else json.dumps(payload))
+
+    def _evict(self, ref, query=None):
+        """Drop an object that is about to change from the identity map. With
+        a query, ref is an object type and all known objects of the type
+        matching the query are dropped.
+        """
+        if self.identity_map is None:
+            return
+        if query is None:
+            self.identity_map.discard(ref)
+            return
+        for obj in self.identity_map.objects(ref):
+            if all(_query_matches(obj, name, value)
+                   for name, value in query.items()):
+                self.identity_map.discard(obj['_ref'])
+
+    def _response(self, method, uri, **kwargs):
+        """Execute a request and return the response even if it failed, so
+        that the caller can raise the exception for the WAPI error (see
+        _raise_wapi_error). See request for the parameters.
+        """
+        try:
+            return self.request(method, uri, **kwargs)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None:
+                raise
+            return e.response
+
+    def decode(self, r, models=False):
+        """Decode a JSON response, merging the objects into the identity
+        map if there is one.
+        :param r: requests.Response
+        :param models: decode objects into record objects (see
+            infoblox.models) instead of dictionaries
+        """
+        if models:
+            return decode_models(r.content.decode(r.encoding or 'utf-8'),
+                                 identity_map=self.identity_map)
+        if self.identity_map is None:
+            return r.json()
+        return r.json(object_hook=self.identity_map.add)
+
+    def request_json(self, method, uri, query_params=None, fields=None,
+                     payload=None, error=InfobloxGeneralException,
+                     error_codes=None):
+        """Execute a request and return the decoded JSON response.
+        :param error: exception raised with the WAPI error text of an
+            unsuccessful response
+        :param error_codes: dictionary of WAPI error code to the exception
+            raised instead (optional)
+        See request for the other parameters.
+        """
+        r = self._response(method, uri, query_params=query_params,
+                           fields=fields, payload=payload)
+        if r.status_code not in (200, 201):
+            _raise_wapi_error(r, _error_json(r), error, error_codes)
+        try:
+            return self.decode(r)
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    def write(self, method, uri, query_params=None, payload=None,
+              error=InfobloxGeneralException, error_codes=None):
+        """Execute a request whose response body is not needed (PUT,
+        DELETE). See request_json for the parameters.
+        :return: requests.Response
+        """
+        r = self._response(method, uri, query_params=query_params,
+                           payload=payload)
+        if r.status_code not in (200, 201):
+            _raise_wapi_error(r, _error_json(r), error, error_codes)
+        return r
 
     def get(self, uri, query_params=None, fields=None,
             notFoundText=None, notFoundFail=True):
@@ -1526,50 +2135,115 @@ class Util(object):
         :param notFoundText: Exception text when get returns no data.
         :param notFoundFail: Raise an exception if nothing is found.
         """
+        logger.debug('util.get(uri=%r, query_params=%r, fields=%r)',
+                     uri, query_params, fields)
+        r_json = self.request_json('GET', uri, query_params=query_params,
+                                   fields=fields)
+        logger.debug('util.get result: %r', r_json)
+        if len(r_json) > 0:
+            return r_json
+        elif notFoundFail:
+            raise InfobloxNotFoundException(notFoundText)
+        return None
+
+    def get_paged(self, uri, query_params=None, fields=None,
+                  page_size=1000, models=False):
+        """Execute a paged get operation, yielding the objects one by one.
+        Only one page of results is held in memory at a time.
+        :param uri: The URI component (e.g. -- lease, record:a)
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return.
+        :param page_size: Number of objects fetched per request.
+        :param models: Decode objects into record objects (see
+            infoblox.models) instead of dictionaries.
+        """
+        query_params = dict(query_params or {})
+        query_params.update({'_paging': 1,
+                             '_return_as_object': 1,
+                             '_max_results': page_size})
+
+        while True:
+            r = self._response('GET', uri, query_params=query_params,
+                               fields=fields)
+            if r.status_code != 200:
+                _raise_wapi_error(r, _error_json(r))
+            try:
+                r_json = self.decode(r, models=models)
+            except ValueError:
+                raise InfobloxGeneralException(r)
+
+            # servers without paging support return a plain list
+            if isinstance(r_json, list):
+                for obj in r_json:
+                    yield obj
+                return
 
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                   self.iba_wapi_version + '/' + uri
-
-        if query_params is None:
-            query_params = {}
-        if fields is not None:
-            if type(fields) == str:
-                query_params['_return_fields'] = fields
-            else:
-                query_params['_return_fields'] = ','.join(fields)
+            for obj in r_json.get('result', []):
+                yield obj
+            page_id = r_json.get('next_page_id')
+            if not page_id:
+                return
+            query_params = {'_page_id': page_id}
+            fields = None
+
+    def get_in(self, uri, field, values, query_params=None, fields=None,
+               max_pattern=2000):
+        """Find the objects whose field is one of many values, with as few
+        paged regexp searches (field~=^(a|b|...)$) as the URL length allows.
+        :param uri: The URI component (e.g. -- network, record:host)
+        :param field: Searchable field to match (e.g. -- network, name)
+        :param values: Values the field may have.
+        :param query_params: Further Key/Value query parameters.
+        :param fields: String or list of fields to return.
+        :param max_pattern: Maximum length of one regular expression in the
+            URL, after URL encoding.
+        :return: iterator of the objects found
+        """
+        wanted = set(values)
+        chunk = []
+        length = len(quote_plus('^()$'))
+        chunks = []
+        separator = len(quote_plus('|'))
+        for value in sorted(wanted):
+            escaped = re.escape(value)
+            size = len(quote_plus(escaped)) + separator
+            if chunk and length + size > max_pattern:
+                chunks.append(chunk)
+                chunk, length = [], len(quote_plus('^()$'))
+            chunk.append(escaped)
+            length += size
+        if chunk:
+            chunks.append(chunk)
+
+        for chunk in chunks:
+            params = dict(query_params or {})
+            params[field + '~'] = '^(' + '|'.join(chunk) + ')$'
+            for obj in self.get_paged(uri, query_params=params,
+                                      fields=fields):
+                # WAPI regexps may ignore case; keep exact matches only
+                if obj.get(field) in wanted:
+                    yield obj
+
+    def get_resultset(self, uri, query_params=None, fields=None,
+                      page_size=1000):
+        """Execute a paged get operation and return the objects as a
+        column-oriented ResultSet (see infoblox.resultset).
+        :param uri: The URI component (e.g. -- lease, ipv4address)
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return and store.
+        :param page_size: Number of objects fetched per request.
+        """
+        from .resultset import ResultSet
 
-        try:
-            if False:  # If debug is enabled, etc...
-                print("util.get([%s][%s][%s][%s]" %
-                      (uri, query_params, fields, notFoundText))
-                print(rest_url + '?' +
-                      '&'.join("%s=%s" % (key, val)
-                               for (key, val) in query_params.items()))
-
-            r = self.session.get(url=rest_url,
-                                 params=query_params)
-
-            r_json = r.json()
-
-            if False:  # If debug is enabled, etc...
-                print("RESULT")
-                print(r)
-                print(r_json)
-
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    return r_json
-                elif notFoundFail:
-                    raise InfobloxNotFoundException(notFoundText)
-                else:
-                    return None
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        if not fields:
+            raise InfobloxBadInputParameter(
+                'A result set needs the list of fields to store')
+        if type(fields) == str:
+            fields = fields.split(',')
+        return ResultSet.from_objects(
+            self.get_paged(uri, query_params=query_params, fields=fields,
+                           page_size=page_size),
+            fields)
 
     def put(self, record, payload, confirm=True):
         """Execute a put operation to update a record.
@@ -1578,16 +2252,13 @@ class Util(object):
         """
 
         ref = record['_ref']
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                   self.iba_wapi_version + '/' + ref
-
-        print("Update [%s] with [%s]" % (rest_url, payload))
+        print("Update [%s] with [%s]" % (self.base_url + ref, payload))
         if not confirm:
             print("DRY-RUN -- NO CHANGES MADE")
             return
 
-        r = self.session.put(url=rest_url,
-                             data=json.dumps(payload))
+        r = self.write('PUT', ref, payload=payload,
+                       error=InfobloxNotUpdatedException)
 
         if r.status_code == 200:
             return
@@ -1596,37 +2267,85 @@ class Util(object):
 
     def post(self, uri, payload, fields, confirm=True):
 
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-                   self.iba_wapi_version + '/' + uri
-
         print("Create [%s] with [%s] returning [%s]" %
-              (rest_url, payload, fields))
+              (self.base_url + uri, payload, fields))
 
         if not confirm:
             print("DRY-RUN -- NO CHANGES MADE")
             return
 
-        query_params = {}
-        if fields is not None:
-            if type(fields) == str:
-                query_params['_return_fields'] = fields
-            else:
-                query_params['_return_fields'] = ','.join(fields)
+        return self.request_json('POST', uri, fields=fields, payload=payload)
 
-        try:
-            r = self.session.post(url=rest_url,
-                                  params=query_params,
-                                  data=json.dumps(payload))
-            r_json = r.json()
-            if r.status_code == 200 or r.status_code == 201:
-                return r_json
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+    def multi_request(self, requests_list):
+        """Execute several operations in one call to the WAPI request
+        object. WAPI runs them in order and stops at the first failure.
+        :param requests_list: list of dictionaries with method, object
+            (object type or reference) and optional data, e.g.
+            {'method': 'POST', 'object': 'record:cname', 'data': {...}}
+        :return: list of the results of the operations
+        """
+        for operation in requests_list:
+            if operation['method'] != 'GET':
+                self._evict(operation['object'])
+        return self.request_json('POST', 'request', payload=requests_list)
+
+    def update_by_query(self, uri, query, payload):
+        """Update the object found by a query in one call to the WAPI
+        request object, without reading it first.
+        :param uri: The URI component (e.g. -- record:host, network)
+        :param query: Key/Value search dictionary finding one object.
+        :param payload: fields to update, may use incremental operators
+            (e.g. -- {'aliases+': ['alias.example.com']}).
+        """
+        self._evict(uri, query)
+        return self.multi_request([
+            {'method': 'GET', 'object': uri, 'data': query,
+             'assign_state': {'ref': '_ref'}, 'discard': True},
+            {'method': 'PUT', 'object': '##STATE:ref:##', 'data': payload,
+             'enable_substitution': True, 'discard': True},
+        ])
+
+    def write_many(self, operations, jobs=1, batch_size=None):
+        """Execute many write operations, either one request each with up to
+        jobs requests at a time, or batch_size operations per WAPI request
+        object call.
+        :param operations: list of dictionaries with method, object and
+            optional data, see multi_request
+        :param jobs: number of requests running concurrently
+        :param batch_size: operations per multi-object request (optional);
+            a failing batch fails all of its operations
+        :return: iterator of None or the error text for every operation,
+            in order
+        """
+        if jobs > 1:
+            self.session.ensure_pool_size(jobs)
+
+        def write_one(operation):
+            try:
+                self.write(operation['method'], operation['object'],
+                           payload=operation.get('data'))
+            except (InfobloxException,
+                    requests.exceptions.RequestException) as e:
+                return [_error_text(e)]
+            return [None]
+
+        def write_batch(batch):
+            try:
+                self.multi_request(batch)
+            except (InfobloxException,
+                    requests.exceptions.RequestException) as e:
+                return [_error_text(e)] * len(batch)
+            return [None] * len(batch)
+
+        if batch_size:
+            batches = [operations[i:i + batch_size]
+                       for i in range(0, len(operations), batch_size)]
+            results = imap(write_batch, batches, jobs)
+        else:
+            results = imap(write_one, operations, jobs)
+        for errors in results:
+            for error in errors:
+                yield error
 
     def delete_by_ref(self, ref, notFoundText=None, notFoundFail=True):
         """Execute a get operation.
@@ -1635,28 +2354,9 @@ class Util(object):
         :param notFoundFail: Raise an exception if nothing is found.
         """
 
-        rest_url = 'https://%s/wapi/v%s/%s' % (self.iba_host, self.iba_wapi_version, ref)
-
         try:
-            r = self.session.delete(url=rest_url)
-        except requests.exceptions.HTTPError as e:
+            self.request('DELETE', ref)
+        except requests.exceptions.HTTPError:
             if notFoundFail:
                 raise InfobloxNotFoundException(notFoundText)
-            else:
-                raise e
-            r_json = r.json()
-
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    return r_json
-                elif notFoundFail:
-                    raise InfobloxNotFoundException(notFoundText)
-                else:
-                    return None
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+            raise
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+#
+# Deferred construction of API objects for the command line interfaces.
+#
+# Building an Infoblox object imports requests and its dependencies, which
+# dominates the start-up time of the CLIs. The entry points hand commands a
+# LazyObject instead, so --help, usage errors and commands which never talk
+# to the grid don't pay for it.
+
+import threading
+
+
+class LazyObject(object):
+
+    """ Proxy which creates the real object on first attribute access. """
+
+    def __init__(self, factory, *args, **kwargs):
+        """ Class initialization method
+        :param factory: callable returning the real object
+        :param args: positional arguments for the factory
+        :param kwargs: keyword arguments for the factory
+        """
+        self._factory = factory
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._obj = None
+
+    def _resolve(self):
+        with self._lock:
+            if self._obj is None:
+                self._obj = self._factory(*self._args, **self._kwargs)
+        return self._obj
+
+    @property
+    def resolved(self):
+        """True once the real object has been created."""
+        return self._obj is not None
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
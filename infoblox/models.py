@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+#
+# Compact record objects for large WAPI results.
+#
+# decode() parses a WAPI response like json.loads(), but turns every object
+# with a known _ref type (record:host/..., lease/..., ...) into an instance
+# of one of the classes below. Their common fields live in __slots__;
+# anything else WAPI returned (extattrs, rarely used fields) is kept in a
+# dictionary which only exists for objects which have such fields. Values
+# repeated on many objects (views, states) are interned.
+#
+# The objects can be read like the dictionaries they replace:
+#
+#     lease['address'], lease.get('client_hostname'), lease.address
+#
+# Ref is the parsed form of a _ref string:
+#
+#     ref = Ref('record:host/ZG5zLmhvc3Q:a.example.com/default')
+#     ref.type, ref.name, ref.view  # 'record:host', 'a.example.com', 'default'
+#
+
+import json
+import sys
+import threading
+import weakref
+
+try:
+    _intern = sys.intern
+except AttributeError:  # Python 2
+    _intern = intern  # noqa: F821
+
+try:
+    _text = unicode  # noqa: F821 (Python 2)
+except NameError:
+    _text = str
+
+_MISSING = object()
+
+
+class Ref(_text):
+
+    """ A WAPI object reference, parsed once.
+    A Ref is the reference string itself, so it can be used wherever a _ref
+    string is expected and compares equal to it. Equal references share one
+    instance while any of them is in use. The parts are:
+    type: object type, e.g. record:host
+    id: opaque identifier
+    name: everything between the identifier and the last '/', e.g. the FQDN
+        of a record or the network in CIDR format (None if missing)
+    view: last part, usually the DNS or network view (None if missing)
+    """
+
+    _instances = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+
+    def __new__(cls, ref):
+        if type(ref) is cls:
+            return ref
+        with cls._lock:
+            instance = cls._instances.get(ref)
+            if instance is None:
+                instance = super(Ref, cls).__new__(cls, ref)
+                instance._parse()
+                cls._instances[ref] = instance
+        return instance
+
+    def _parse(self):
+        self.type, __, rest = self.partition('/')
+        self.id, sep, path = rest.partition(':')
+        self.name = self.view = None
+        if sep:
+            name, sep, view = path.rpartition('/')
+            if sep:
+                self.name, self.view = name, view
+            else:
+                self.name = path
+
+    def matches(self, object_type, name=None):
+        """Return whether the reference is of an object type and, if given,
+        has a name."""
+        return self.type == object_type and (name is None or
+                                             self.name == name)
+
+    def __getnewargs__(self):
+        return (_text(self),)
+
+
+class Model(object):
+
+    """ Base class of all record objects.
+    Subclasses list their common fields in __slots__ and the fields whose
+    values should be interned in INTERNED.
+    """
+
+    __slots__ = ('_ref', '_extra')
+    INTERNED = ()
+    _slot_names = ('_ref',)
+
+    def __init__(self, fields):
+        """ Class initialization method
+        :param fields: dictionary of the WAPI object
+        """
+        object.__setattr__(self, '_extra', None)
+        self.update(fields)
+
+    def update(self, fields):
+        """Set fields, like dict.update.
+        :param fields: dictionary or record object
+        """
+        extra = self._extra
+        for name, value in fields.items():
+            if name in self.INTERNED and isinstance(value, str):
+                value = _intern(value)
+            try:
+                object.__setattr__(self, name, value)
+            except AttributeError:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        object.__setattr__(self, '_extra', extra)
+
+    @classmethod
+    def fields(cls):
+        """Return the names of the fields stored in slots."""
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(name for name in getattr(klass, '__slots__', ())
+                         if name != '_extra')
+        return names
+
+    def __getattr__(self, name):
+        # only called for empty slots and names which are not slots
+        if name.startswith('__'):
+            raise AttributeError(name)
+        extra = object.__getattribute__(self, '_extra')
+        if extra is not None and name in extra:
+            return extra[name]
+        return None
+
+    def get(self, name, default=None):
+        value = self._lookup(name)
+        return default if value is _MISSING else value
+
+    def _lookup(self, name):
+        if name in self.__class__._slot_names:
+            try:
+                return object.__getattribute__(self, name)
+            except AttributeError:
+                return _MISSING
+        if self._extra is not None:
+            return self._extra.get(name, _MISSING)
+        return _MISSING
+
+    def __getitem__(self, name):
+        value = self._lookup(name)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self._lookup(name) is not _MISSING
+
+    def keys(self):
+        names = [name for name in self.__class__._slot_names
+                 if self._lookup(name) is not _MISSING]
+        if self._extra is not None:
+            names.extend(self._extra)
+        return names
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        """Return the object as the dictionary WAPI returned."""
+        return dict((name, self[name]) for name in self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, Model):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+
+class HostRecord(Model):
+    __slots__ = ('name', 'view', 'zone', 'ipv4addrs', 'aliases',
+                 'configure_for_dns', 'comment')
+    INTERNED = ('view', 'zone')
+
+
+class ARecord(Model):
+    __slots__ = ('name', 'ipv4addr', 'view', 'zone', 'comment')
+    INTERNED = ('view', 'zone')
+
+
+class CNAMERecord(Model):
+    __slots__ = ('name', 'canonical', 'view', 'zone', 'comment')
+    INTERNED = ('view', 'zone')
+
+
+class TXTRecord(Model):
+    __slots__ = ('name', 'text', 'view', 'zone', 'comment')
+    INTERNED = ('view', 'zone')
+
+
+class Network(Model):
+    __slots__ = ('network', 'network_view', 'network_container', 'comment')
+    INTERNED = ('network_view', 'network_container')
+
+
+class Range(Model):
+    __slots__ = ('start_addr', 'end_addr', 'network', 'network_view',
+                 'comment')
+    INTERNED = ('network', 'network_view')
+
+
+class FixedAddress(Model):
+    __slots__ = ('ipv4addr', 'mac', 'name', 'network', 'network_view',
+                 'comment')
+    INTERNED = ('network', 'network_view')
+
+
+class Lease(Model):
+    __slots__ = ('address', 'hardware', 'client_hostname', 'binding_state',
+                 'starts', 'ends', 'network', 'network_view')
+    INTERNED = ('binding_state', 'network', 'network_view')
+
+
+# WAPI object type (the _ref prefix) to record class
+MODELS = {
+    'record:host': HostRecord,
+    'record:a': ARecord,
+    'record:cname': CNAMERecord,
+    'record:txt': TXTRecord,
+    'network': Network,
+    'range': Range,
+    'fixedaddress': FixedAddress,
+    'lease': Lease,
+}
+
+for _model in MODELS.values():
+    _model._slot_names = tuple(_model.fields())
+
+
+def _object_hook(obj):
+    ref = obj.get('_ref')
+    if isinstance(ref, (str, _text)):
+        model = MODELS.get(ref.partition('/')[0])
+        if model is not None:
+            return model(obj)
+    return obj
+
+
+def decode(text, identity_map=None):
+    """Parse a WAPI response body, returning record objects for objects of
+    the types in MODELS and plain dictionaries and lists for everything
+    else.
+    :param text: JSON text
+    :param identity_map: IdentityMap the objects are merged into (optional)
+    """
+    if identity_map is None:
+        return json.loads(text, object_hook=_object_hook)
+    return json.loads(
+        text, object_hook=lambda obj: identity_map.add(_object_hook(obj)))
+
+
+class IdentityMap(object):
+
+    """ One instance per WAPI object, keyed by _ref.
+    Objects added again, e.g. by another query or with other return fields,
+    are merged into the instance added first, so every query result refers
+    to the same, most complete object. Objects are kept until clear() is
+    called.
+    """
+
+    def __init__(self):
+        """ Class initialization method
+        """
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def add(self, obj):
+        """Return the instance of an object, merging its fields into the
+        instance known already. Objects without _ref are returned as they
+        are.
+        :param obj: dictionary or record object
+        """
+        ref = obj.get('_ref')
+        if not isinstance(ref, (str, _text)):
+            return obj
+        with self._lock:
+            known = self._objects.setdefault(ref, obj)
+            if known is not obj:
+                known.update(obj)
+        return known
+
+    def get(self, ref, default=None):
+        return self._objects.get(ref, default)
+
+    def __getitem__(self, ref):
+        return self._objects[ref]
+
+    def __contains__(self, ref):
+        return ref in self._objects
+
+    def __len__(self):
+        return len(self._objects)
+
+    def discard(self, ref):
+        """Forget an object, e.g. after it was changed on the server."""
+        with self._lock:
+            self._objects.pop(ref, None)
+
+    def objects(self, object_type=None):
+        """Return the known objects, optionally only those of one object
+        type (e.g. record:host)."""
+        if object_type is None:
+            return list(self._objects.values())
+        return [obj for ref, obj in list(self._objects.items())
+                if Ref(ref).type == object_type]
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
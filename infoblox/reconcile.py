@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# Reconcile the DNS records of a zone with a desired-state inventory.
+#
+# An inventory is a JSON (or, with PyYAML installed, YAML) document:
+#
+#     zone: example.com
+#     view: default                  # optional, default: the API's DNS view
+#     records:
+#       - {type: host, name: a.example.com, ipv4addrs: [10.0.0.1]}
+#       - {type: a, name: b.example.com, ipv4addr: 10.0.0.2}
+#       - {type: cname, name: www.example.com, canonical: a.example.com}
+#       - {type: txt, name: a.example.com, text: "v=spf1 -all"}
+#
+# The current records of the zone are read with one paged query per record
+# type and joined with the inventory by key, so the plan costs a handful of
+# round trips no matter how many records the zone has. Records of the zone
+# which are not in the inventory are deleted. Records of child zones (e.g.
+# lab.example.com in example.com) are neither read nor accepted in the
+# inventory; reconcile the child zone with its own inventory.
+#
+# Example:
+#
+#     changes = reconcile.plan(iba_api, reconcile.load_inventory(path))
+#     for change in reconcile.apply(iba_api, changes, jobs=8):
+#         print(change)
+#
+
+import collections
+import io
+import json
+import re
+
+from .infoblox import InfobloxBadInputParameter
+
+# fields read and compared per record type; the first one after name is
+# part of the key for types with several records per name
+RECORD_TYPES = collections.OrderedDict([
+    ('host', ('record:host', ['name', 'ipv4addrs', 'comment'])),
+    ('a', ('record:a', ['name', 'ipv4addr', 'comment'])),
+    ('cname', ('record:cname', ['name', 'canonical', 'comment'])),
+    ('txt', ('record:txt', ['name', 'text', 'comment'])),
+])
+
+# record types which may have several records of the same name
+_MULTI_VALUED = {'a': 'ipv4addr', 'txt': 'text'}
+
+
+class Change(collections.namedtuple(
+        'Change',
+        ['action', 'type', 'name', 'data', 'ref', 'status', 'detail'])):
+
+    """ One planned or applied change.
+    action is 'create', 'update' or 'delete'; data is the payload sent to
+    WAPI (the changed fields for updates); status is 'planned', 'done' or
+    'failed'.
+    """
+
+    def __new__(cls, action, type, name, data=None, ref=None,
+                status='planned', detail=''):
+        return super(Change, cls).__new__(cls, action, type, name, data, ref,
+                                          status, detail)
+
+    def as_request(self):
+        """Return the change as an operation of a WAPI multi-object
+        request."""
+        if self.action == 'create':
+            return {'method': 'POST', 'object': RECORD_TYPES[self.type][0],
+                    'data': self.data}
+        if self.action == 'update':
+            return {'method': 'PUT', 'object': self.ref, 'data': self.data}
+        return {'method': 'DELETE', 'object': self.ref}
+
+
+def load_inventory(path):
+    """Read an inventory file.
+    :param path: JSON file, or YAML file if the name ends in .yaml/.yml
+    :return: dictionary with zone, view (may be None) and records
+    """
+    with io.open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise InfobloxBadInputParameter(
+                'PyYAML is required to read YAML inventories')
+        inventory = yaml.safe_load(text)
+    else:
+        try:
+            inventory = json.loads(text)
+        except ValueError as e:
+            raise InfobloxBadInputParameter(
+                'Invalid inventory %s: %s' % (path, e))
+    if not isinstance(inventory, dict) or \
+            not isinstance(inventory.get('records', []), list):
+        raise InfobloxBadInputParameter(
+            'Expected a mapping with a list of records in ' + path)
+    return {'zone': inventory.get('zone'),
+            'view': inventory.get('view'),
+            'records': inventory.get('records') or []}
+
+
+def _in_zone(name, zone):
+    return name == zone or name.endswith('.' + zone)
+
+
+def _zone_of(name, zone, child_zones):
+    """Return the zone a name in zone belongs to: the longest matching
+    child zone, or zone itself."""
+    children = [child for child in child_zones if _in_zone(name, child)]
+    return max(children, key=len) if children else zone
+
+
+def _addresses(ipv4addrs):
+    return sorted(a['ipv4addr'] if isinstance(a, dict) else a
+                  for a in ipv4addrs or [])
+
+
+def _key(rtype, record):
+    name = record['name'].lower().rstrip('.')
+    if rtype in _MULTI_VALUED:
+        return (rtype, name, record.get(_MULTI_VALUED[rtype]))
+    return (rtype, name)
+
+
+def desired_records(inventory, zone):
+    """Index the records of an inventory by key.
+    :param inventory: dictionary as returned by load_inventory
+    :param zone: zone all records must belong to
+    :return: dictionary of key to (type, record)
+    """
+    desired = {}
+    for record in inventory['records']:
+        if not isinstance(record, dict) or 'name' not in record:
+            raise InfobloxBadInputParameter(
+                'Record without name: %r' % (record,))
+        rtype = record.get('type')
+        if rtype not in RECORD_TYPES:
+            raise InfobloxBadInputParameter(
+                'Unsupported record type %r, expected one of %s' %
+                (rtype, ', '.join(RECORD_TYPES)))
+        for field in RECORD_TYPES[rtype][1][1:2]:
+            if field not in record:
+                raise InfobloxBadInputParameter(
+                    '%s record %s needs %s' % (rtype, record['name'], field))
+        if not _in_zone(record['name'].lower().rstrip('.'), zone):
+            raise InfobloxBadInputParameter(
+                '%s is not in zone %s' % (record['name'], zone))
+        key = _key(rtype, record)
+        if key in desired:
+            raise InfobloxBadInputParameter(
+                'Duplicate %s record %s' % (rtype, record['name']))
+        desired[key] = (rtype, record)
+    return desired
+
+
+def check_child_zones(desired, zone, child_zones):
+    """Reject desired records which belong to a child zone, as the records
+    of zone are read without them.
+    :param desired: dictionary as returned by desired_records
+    :param child_zones: names of the zones below zone
+    """
+    for rtype, record in desired.values():
+        record_zone = _zone_of(record['name'].lower().rstrip('.'), zone,
+                               child_zones)
+        if record_zone != zone:
+            raise InfobloxBadInputParameter(
+                '%s is in zone %s, not %s' % (record['name'], record_zone,
+                                              zone))
+
+
+def child_zones(api, zone, view, page_size=1000):
+    """Return the names of the authoritative zones below a zone."""
+    return [obj['fqdn'].lower().rstrip('.') for obj in api.util.get_paged(
+        'zone_auth', query_params={'fqdn~': r'\.' + re.escape(zone) + '$',
+                                   'view': view},
+        fields=['fqdn'], page_size=page_size)]
+
+
+def current_records(api, zone, view, page_size=1000):
+    """Read the managed records of a zone, one paged query per type.
+    :return: dictionary of key to (type, WAPI object)
+    """
+    current = {}
+    for rtype, (wapi_type, fields) in RECORD_TYPES.items():
+        for obj in api.util.get_paged(wapi_type,
+                                      query_params={'zone': zone,
+                                                    'view': view},
+                                      fields=fields, page_size=page_size):
+            current[_key(rtype, obj)] = (rtype, obj)
+    return current
+
+
+def _create_data(rtype, record, view):
+    data = {'name': record['name'], 'view': view}
+    for field in RECORD_TYPES[rtype][1][1:]:
+        if field not in record:
+            continue
+        if field == 'ipv4addrs':
+            data[field] = [{'ipv4addr': a}
+                           for a in _addresses(record[field])]
+        else:
+            data[field] = record[field]
+    return data
+
+
+def _update_data(rtype, record, obj):
+    data = {}
+    for field in RECORD_TYPES[rtype][1][1:]:
+        if field not in record:
+            continue
+        if field == 'ipv4addrs':
+            wanted = _addresses(record[field])
+            if wanted != _addresses(obj.get(field)):
+                # keep the DHCP settings of addresses which stay
+                existing = dict((a['ipv4addr'], a)
+                                for a in obj.get(field) or [])
+                data[field] = [
+                    dict((k, v) for k, v in existing.get(
+                        a, {'ipv4addr': a}).items()
+                        if k not in ('_ref', 'host'))
+                    for a in wanted]
+        elif record[field] != obj.get(field, '' if field == 'comment'
+                                      else None):
+            data[field] = record[field]
+    return data
+
+
+def plan(api, inventory, zone=None, view=None, page_size=1000):
+    """Work out the changes which make a zone match an inventory.
+    :param api: Infoblox object
+    :param inventory: dictionary as returned by load_inventory
+    :param zone: zone to reconcile (default: the inventory's zone)
+    :param view: DNS view (default: the inventory's, else the API's view)
+    :return: list of Change, deletes first
+    """
+    zone = (zone or inventory.get('zone') or '').lower().rstrip('.')
+    if not zone:
+        raise InfobloxBadInputParameter('No zone to reconcile')
+    view = view or inventory.get('view') or api.iba_dns_view
+
+    desired = desired_records(inventory, zone)
+    check_child_zones(desired, zone,
+                      child_zones(api, zone, view, page_size=page_size))
+    current = current_records(api, zone, view, page_size=page_size)
+
+    changes = []
+    for key in sorted(set(current) - set(desired), key=str):
+        rtype, obj = current[key]
+        changes.append(Change('delete', rtype, obj['name'], ref=obj['_ref']))
+    for key in sorted(desired, key=str):
+        rtype, record = desired[key]
+        if key not in current:
+            changes.append(Change('create', rtype, record['name'],
+                                  _create_data(rtype, record, view)))
+            continue
+        obj = current[key][1]
+        data = _update_data(rtype, record, obj)
+        if data:
+            changes.append(Change('update', rtype, record['name'], data,
+                                  obj['_ref']))
+    return changes
+
+
+def apply(api, changes, jobs=1, batch_size=None):
+    """Apply planned changes.
+    :param api: Infoblox object
+    :param changes: list of Change as returned by plan
+    :param jobs: number of requests running concurrently
+    :param batch_size: send this many changes per WAPI multi-object request
+        instead of one request per change (optional). A failing batch
+        fails all of its changes.
+    :return: iterator of Change with status 'done' or 'failed', in order
+    """
+    # all deletes finish before anything is created, so that a name can
+    # move from one record type to another (e.g. from a CNAME to a host)
+    phases = [[c for c in changes if c.action == 'delete'],
+              [c for c in changes if c.action != 'delete']]
+    for phase in phases:
+        errors = api.util.write_many([c.as_request() for c in phase],
+                                     jobs=jobs, batch_size=batch_size)
+        for change, error in zip(phase, errors):
+            if error is None:
+                yield change._replace(status='done')
+            else:
+                yield change._replace(status='failed', detail=error)
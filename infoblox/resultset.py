@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# Column-oriented storage for large address query results.
+#
+# A ResultSet keeps one column per field instead of one dictionary per
+# object: IP addresses as 32-bit integers, MAC addresses as 48-bit integers
+# and times as integers in typed arrays, strings interned in lists. With
+# NumPy installed the numeric columns are NumPy arrays and filters run
+# vectorized; without it they run as loops over the arrays.
+#
+# Example:
+#
+#     leases = iba_api.util.get_resultset(
+#         'lease', {'network_view': 'default'},
+#         fields=['address', 'hardware', 'binding_state', 'ends'])
+#     active = leases.filter(binding_state='ACTIVE', subnet='10.1.0.0/16')
+#     per_subnet = active.counts('address', prefixlen=24)
+#
+
+import array
+import socket
+import struct
+
+from .infoblox import InfobloxBadInputParameter
+from .models import _intern
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+IP_FIELDS = ('address', 'ip_address', 'ipv4addr', 'start_addr', 'end_addr')
+MAC_FIELDS = ('hardware', 'mac', 'mac_address')
+TIME_FIELDS = ('starts', 'ends', 'cltt', 'tstp', 'tsfp')
+
+_IP_TYPE = 'I' if array.array('I').itemsize >= 4 else 'L'
+try:
+    array.array('Q')
+    _WIDE_TYPE = 'Q'
+    _TIME_TYPE = 'q'
+except ValueError:  # Python 2 has no 64-bit array types
+    _WIDE_TYPE = 'd'
+    _TIME_TYPE = 'd'
+
+
+def ip_to_int(ip):
+    """Return an IPv4 address in dotted notation as an integer."""
+    packed = socket.inet_aton(ip)
+    # inet_aton also takes short (10.1) and hex or octal forms
+    if socket.inet_ntoa(packed) != ip:
+        raise ValueError('Expected IPv4 address, got: ' + ip)
+    return struct.unpack('!I', packed)[0]
+
+
+def int_to_ip(value):
+    """Return an integer as an IPv4 address in dotted notation."""
+    return socket.inet_ntoa(struct.pack('!I', int(value)))
+
+
+def mac_to_int(mac):
+    """Return a MAC address (aa:bb:cc:dd:ee:ff) as an integer."""
+    return int(mac.replace(':', '').replace('-', ''), 16)
+
+
+def int_to_mac(value):
+    """Return an integer as a MAC address (aa:bb:cc:dd:ee:ff)."""
+    digits = '%012x' % int(value)
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def parse_network(network):
+    """Return the first address and netmask of a network in CIDR format
+    as integers."""
+    address, sep, prefixlen = network.partition('/')
+    try:
+        prefixlen = int(prefixlen) if sep else 32
+        if not 0 <= prefixlen <= 32:
+            raise ValueError(prefixlen)
+        mask = (0xffffffff << (32 - prefixlen)) & 0xffffffff
+        return ip_to_int(address) & mask, mask
+    except (ValueError, socket.error):
+        raise InfobloxBadInputParameter(
+            'Expected network in CIDR format, got: ' + network)
+
+
+def column_kind(field):
+    """Return how a field is stored: 'ip', 'mac', 'time' or 'object'."""
+    if field in IP_FIELDS:
+        return 'ip'
+    if field in MAC_FIELDS:
+        return 'mac'
+    if field in TIME_FIELDS:
+        return 'time'
+    return 'object'
+
+
+_ENCODERS = {'ip': ip_to_int, 'mac': mac_to_int, 'time': int}
+_DECODERS = {'ip': int_to_ip, 'mac': int_to_mac, 'time': int}
+_TYPECODES = {'ip': _IP_TYPE, 'mac': _WIDE_TYPE, 'time': _TIME_TYPE}
+
+
+class ResultSet(object):
+
+    """ Column-oriented set of WAPI objects.
+    Numeric columns store 0 where an object had no value.
+    """
+
+    def __init__(self, columns, length):
+        """ Class initialization method
+        :param columns: dictionary of field name to column (array, NumPy
+            array or list)
+        :param length: number of rows
+        """
+        self.columns = columns
+        self._length = length
+
+    @classmethod
+    def from_objects(cls, objects, fields):
+        """Build a result set from WAPI objects.
+        :param objects: iterable of dictionaries (e.g. Util.get_paged)
+        :param fields: list of the fields to keep
+        """
+        kinds = [(field, column_kind(field)) for field in fields]
+        columns = dict((field, array.array(_TYPECODES[kind])
+                        if kind in _TYPECODES else [])
+                       for field, kind in kinds)
+        length = 0
+        for obj in objects:
+            length += 1
+            for field, kind in kinds:
+                value = obj.get(field)
+                if kind in _ENCODERS:
+                    value = _ENCODERS[kind](value) if value else 0
+                elif isinstance(value, str):
+                    value = _intern(value)
+                columns[field].append(value)
+        if numpy is not None:
+            for field, kind in kinds:
+                if kind in _TYPECODES:
+                    columns[field] = numpy.frombuffer(
+                        columns[field], dtype=columns[field].typecode)
+        return cls(columns, length)
+
+    def __len__(self):
+        return self._length
+
+    def row(self, index):
+        """Return one object as a dictionary, with addresses in their usual
+        notation."""
+        row = {}
+        for field, column in self.columns.items():
+            value = column[index]
+            kind = column_kind(field)
+            if kind in _DECODERS:
+                value = _DECODERS[kind](value) if value else None
+            row[field] = value
+        return row
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.row(index)
+
+    def _match(self, field, condition):
+        """Return the row selection of one condition: a NumPy bool array or
+        a list of bools."""
+        if field not in self.columns:
+            raise InfobloxBadInputParameter('No column ' + field)
+        column = self.columns[field]
+        kind = column_kind(field)
+        if kind in _ENCODERS:
+            encode = _ENCODERS[kind]
+            if isinstance(condition, (list, set, frozenset)):
+                values = [encode(v) if isinstance(v, str) else v
+                          for v in condition]
+                if numpy is not None:
+                    return numpy.isin(column, values)
+                values = frozenset(values)
+                return [v in values for v in column]
+            if isinstance(condition, tuple):
+                low, high = condition
+                low = encode(low) if isinstance(low, str) else low
+                high = encode(high) if isinstance(high, str) else high
+                if numpy is not None:
+                    mask = numpy.ones(self._length, dtype=bool)
+                    if low is not None:
+                        mask &= column >= low
+                    if high is not None:
+                        mask &= column < high
+                    return mask
+                return [(low is None or v >= low) and
+                        (high is None or v < high) for v in column]
+            if isinstance(condition, str):
+                condition = encode(condition)
+            if numpy is not None:
+                return column == condition
+            return [v == condition for v in column]
+        if isinstance(condition, (list, set, frozenset, tuple)):
+            condition = frozenset(condition)
+            selected = [v in condition for v in column]
+        else:
+            selected = [v == condition for v in column]
+        if numpy is not None:
+            return numpy.array(selected, dtype=bool)
+        return selected
+
+    def _in_subnet(self, network, field):
+        first, mask = parse_network(network)
+        column = self.columns[field]
+        if numpy is not None:
+            return (column & mask) == first
+        return [(v & mask) == first for v in column]
+
+    def _ip_field(self, field):
+        if field is not None:
+            return field
+        for name in self.columns:
+            if column_kind(name) == 'ip':
+                return name
+        raise InfobloxBadInputParameter('No IP address column')
+
+    def filter(self, subnet=None, field=None, **conditions):
+        """Return the rows matching all given conditions.
+        :param subnet: network in CIDR format the IP address must be in
+        :param field: IP address column subnet applies to (default: the
+            first IP address column)
+        :param conditions: field=value pairs. The value is compared for
+            equality, may be a list or set of accepted values, or for
+            address and time columns a (low, high) tuple selecting
+            low <= value < high, where either bound may be None.
+        """
+        masks = []
+        if subnet is not None:
+            masks.append(self._in_subnet(subnet, self._ip_field(field)))
+        for name, condition in conditions.items():
+            masks.append(self._match(name, condition))
+        if not masks:
+            return self
+        if numpy is not None:
+            mask = masks[0]
+            for other in masks[1:]:
+                mask = mask & other
+            return self._take(numpy.nonzero(mask)[0])
+        return self._take([i for i, selected in enumerate(zip(*masks))
+                           if all(selected)])
+
+    def _take(self, indices):
+        columns = {}
+        for field, column in self.columns.items():
+            if numpy is not None and isinstance(column, numpy.ndarray):
+                columns[field] = column[indices]
+            elif isinstance(column, array.array):
+                columns[field] = array.array(column.typecode,
+                                             (column[i] for i in indices))
+            else:
+                columns[field] = [column[i] for i in indices]
+        return ResultSet(columns, len(indices))
+
+    def _raw_keys(self, field, prefixlen):
+        """Return the raw values to group a column by and the function
+        turning them into keys."""
+        if field not in self.columns:
+            raise InfobloxBadInputParameter('No column ' + field)
+        column = self.columns[field]
+        kind = column_kind(field)
+        if prefixlen is not None:
+            if kind != 'ip':
+                raise InfobloxBadInputParameter(
+                    'prefixlen needs an IP address column')
+            mask = (0xffffffff << (32 - prefixlen)) & 0xffffffff
+            if numpy is not None:
+                column = column & mask
+            else:
+                column = [v & mask for v in column]
+            suffix = '/%d' % prefixlen
+            return column, lambda v: int_to_ip(v) + suffix
+        if kind in _DECODERS:
+            decode = _DECODERS[kind]
+            return column, lambda v: decode(v) if v else None
+        return column, None
+
+    def group_by(self, field, prefixlen=None):
+        """Split the rows by the value of a column.
+        :param field: column to group by
+        :param prefixlen: group an IP address column by the network of this
+            prefix length instead (e.g. 24)
+        :return: dictionary of value (or network) to ResultSet
+        """
+        column, decode = self._raw_keys(field, prefixlen)
+        groups = {}
+        for index, value in enumerate(column):
+            groups.setdefault(value, []).append(index)
+        return dict((decode(value) if decode else value,
+                     self._take(indices))
+                    for value, indices in groups.items())
+
+    def counts(self, field, prefixlen=None):
+        """Count the rows per value of a column, see group_by.
+        :return: dictionary of value (or network) to number of rows
+        """
+        column, decode = self._raw_keys(field, prefixlen)
+        if decode is not None and numpy is not None:
+            values, numbers = numpy.unique(column, return_counts=True)
+            counts = dict(zip(values.tolist(), numbers.tolist()))
+        else:
+            counts = {}
+            for value in column:
+                counts[value] = counts.get(value, 0) + 1
+        if decode is None:
+            return counts
+        return dict((decode(value), number)
+                    for value, number in counts.items())
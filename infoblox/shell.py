@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# Interactive shell for the infoblox CLI.
+#
+# All commands typed into the shell run through the click groups in
+# infoblox.cli against one Infoblox object, so the session, its pooled
+# connections, its authentication cookie and its read cache are reused from
+# one command to the next.
+
+import shlex
+
+import click
+
+try:
+    input = raw_input  # Python 2
+except NameError:
+    pass
+
+# fields of cached WAPI objects offered as argument completions
+COMPLETION_FIELDS = ('name', 'names', 'aliases', 'canonical', 'network',
+                     'ipv4addr', 'ip_address', 'address')
+
+NOT_IN_SHELL = ('shell', 'daemon')
+
+
+class Completer(object):
+
+    """ Tab completion for command names, options, and names and networks
+    found in the session's read cache.
+    """
+
+    def __init__(self, group, cache=None):
+        """ Class initialization method
+        :param group: click group the shell runs commands of
+        :param cache: ReadCache of the API session (optional)
+        """
+        self.group = group
+        self.cache = cache
+        self._matches = []
+
+    def cached_values(self):
+        """Return the names and networks seen in cached responses."""
+        values = set()
+        if self.cache is None:
+            return values
+        for response in self.cache.responses():
+            try:
+                data = response.json()
+            except ValueError:
+                continue
+            self._collect(data, values)
+        return values
+
+    def _collect(self, data, values):
+        if isinstance(data, list):
+            for item in data:
+                self._collect(item, values)
+        elif isinstance(data, dict):
+            for field, value in data.items():
+                if field in COMPLETION_FIELDS:
+                    if isinstance(value, list):
+                        values.update(v for v in value if isinstance(v, str))
+                    elif isinstance(value, str):
+                        values.add(value)
+                if isinstance(value, (list, dict)):
+                    self._collect(value, values)
+
+    def candidates(self, words, text):
+        """Return completions for text following the given words."""
+        command = self.group
+        for word in words:
+            if not isinstance(command, click.Group):
+                break
+            command = command.commands.get(word, command)
+        if isinstance(command, click.Group):
+            names = [name for name in command.commands
+                     if name not in NOT_IN_SHELL]
+        else:
+            names = [opt for param in command.params
+                     for opt in getattr(param, 'opts', [])
+                     if opt.startswith('-')]
+            names.extend(self.cached_values())
+        return sorted(name for name in set(names) if name.startswith(text))
+
+    def complete(self, text, state):
+        """readline completer function."""
+        if state == 0:
+            import readline
+            line = readline.get_line_buffer()[:readline.get_begidx()]
+            try:
+                words = shlex.split(line)
+            except ValueError:
+                words = line.split()
+            self._matches = self.candidates(words, text)
+        if state < len(self._matches):
+            return self._matches[state]
+        return None
+
+
+def run(api, group, execute, read_line=None, prompt='infoblox> '):
+    """Read and run commands until end of input or 'exit'.
+    :param api: Infoblox object all commands run against
+    :param group: click group providing the commands
+    :param execute: function running one command line against api
+    :param read_line: function returning the next input line and raising
+        EOFError at the end (default: interactive input with readline)
+    :param prompt: prompt shown for every command
+    """
+    if read_line is None:
+        read_line = input
+        try:
+            import readline
+        except ImportError:  # e.g. Windows
+            pass
+        else:
+            completer = Completer(group, getattr(api.session, 'cache', None))
+            readline.set_completer(completer.complete)
+            readline.set_completer_delims(' \t\n"\'')
+            readline.parse_and_bind('tab: complete')
+
+    while True:
+        try:
+            line = read_line(prompt)
+        except EOFError:
+            click.echo()
+            break
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            click.echo('Error: %s' % (e,), err=True)
+            continue
+        if not argv:
+            continue
+        if argv[0] in ('exit', 'quit'):
+            break
+        if argv[0] == 'help':
+            argv = argv[1:] + ['--help']
+        if argv[0] in NOT_IN_SHELL:
+            click.echo('Error: %s cannot be run from the shell' % argv[0],
+                       err=True)
+            continue
+        exit_code, out, err = execute(api, argv)
+        click.echo(out, nl=False)
+        click.echo(err, nl=False, err=True)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Subnet utilization computed from bulk ipv4address data.
+#
+# The used addresses of a network are read with one paged ipv4address query
+# and marked in bitmaps (one bit per address of the network), from which the
+# used, free, DHCP and static counts and the largest free blocks are taken.
+#
+
+import collections
+import heapq
+
+from .resultset import int_to_ip, ip_to_int, parse_network
+
+# number of bits set in every byte value
+_POPCOUNT = bytearray(bin(i).count('1') for i in range(256))
+
+# ipv4address types which are not assignable addresses
+_RESERVED_TYPES = frozenset(['NETWORK', 'BROADCAST'])
+
+
+class Utilization(collections.namedtuple(
+        'Utilization',
+        ['network', 'total', 'used', 'free', 'dhcp', 'static',
+         'free_blocks'])):
+
+    """ Utilization of one network.
+    total counts the assignable addresses (without network and broadcast
+    address); dhcp counts addresses with a lease, static all other used
+    addresses; free_blocks lists the largest ranges of free addresses as
+    'first-last' strings, largest first.
+    """
+
+    @property
+    def percent_used(self):
+        if not self.total:
+            return 0.0
+        return round(100.0 * self.used / self.total, 1)
+
+    def as_dict(self):
+        row = dict(zip(self._fields, self))
+        row['percent_used'] = self.percent_used
+        return row
+
+
+def _popcount(bitmap):
+    return sum(bitmap.translate(_POPCOUNT))
+
+
+def _free_runs(bitmap, size):
+    """Yield (first, length) of every run of clear bits."""
+    start = None
+    index = 0
+    while index < size:
+        byte = bitmap[index >> 3]
+        if not index & 7 and index + 8 <= size and byte in (0, 255):
+            step = 8
+            free = byte == 0
+        else:
+            step = 1
+            free = not byte >> (index & 7) & 1
+        if free:
+            if start is None:
+                start = index
+        elif start is not None:
+            yield start, index - start
+            start = None
+        index += step
+    if start is not None:
+        yield start, size - start
+
+
+def compute(network, addresses, blocks=3):
+    """Compute the utilization of a network.
+    :param network: network in CIDR format
+    :param addresses: iterable of ipv4address objects of the network with
+        ip_address and types, e.g. from a paged query for status=USED
+    :param blocks: number of largest free blocks to report
+    :return: Utilization
+    """
+    first, mask = parse_network(network)
+    size = (~mask & 0xffffffff) + 1
+    used = bytearray((size + 7) >> 3)
+    dhcp = bytearray(len(used))
+
+    reserved = 0
+    if size > 2:
+        # network and broadcast address
+        used[0] |= 1
+        used[(size - 1) >> 3] |= 1 << ((size - 1) & 7)
+        reserved = 2
+
+    for address in addresses:
+        offset = ip_to_int(address['ip_address']) - first
+        if not 0 <= offset < size:
+            continue
+        types = address.get('types') or []
+        if _RESERVED_TYPES.intersection(types):
+            continue
+        used[offset >> 3] |= 1 << (offset & 7)
+        if 'LEASE' in types:
+            dhcp[offset >> 3] |= 1 << (offset & 7)
+
+    total = size - reserved
+    n_used = _popcount(used) - reserved
+    n_dhcp = _popcount(dhcp)
+    largest = heapq.nlargest(blocks, _free_runs(used, size),
+                             key=lambda run: run[1])
+    free_blocks = ['%s-%s' % (int_to_ip(first + start),
+                              int_to_ip(first + start + length - 1))
+                   for start, length in largest]
+    return Utilization(network, total, n_used, total - n_used, n_dhcp,
+                       n_used - n_dhcp, free_blocks)
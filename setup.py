@@ -43,7 +43,7 @@ setup(
                  'infoblox'},
     entry_points={
         'console_scripts': [
-            'infoblox = infoblox.cli:cli',
+            'infoblox = infoblox.cli:main',
             'hlinfoblox = infoblox.hla:cli'
         ]
     },
@@ -0,0 +1,96 @@
+import json
+
+import responses
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import infoblox
+from infoblox.allocator import Allocator
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+USED = ['10.0.0.0/24', '10.0.2.0/23', '10.0.128.0/17']
+
+
+class TestAllocator(unittest.TestCase):
+
+    def setUp(self):
+        self.allocator = Allocator('10.0.0.0/16', USED)
+
+    def test_free_blocks(self):
+        self.assertEqual(self.allocator.free_blocks(), [
+            '10.0.1.0/24', '10.0.4.0/22', '10.0.8.0/21', '10.0.16.0/20',
+            '10.0.32.0/19', '10.0.64.0/18'])
+        self.assertEqual(self.allocator.free_addresses(), 32000)
+        self.assertEqual(self.allocator.largest_free_block(), '10.0.64.0/18')
+        self.assertAlmostEqual(self.allocator.fragmentation(), 0.488)
+
+    def test_best_fit(self):
+        self.assertEqual(self.allocator.next_available(24, count=3),
+                         ['10.0.1.0/24', '10.0.4.0/24', '10.0.5.0/24'])
+        self.assertEqual(self.allocator.next_available(22),
+                         ['10.0.8.0/22'])
+        self.assertEqual(self.allocator.largest_free_block(), '10.0.64.0/18')
+
+    def test_first_fit(self):
+        self.assertEqual(
+            self.allocator.next_available(21, count=2, best_fit=False),
+            ['10.0.8.0/21', '10.0.16.0/21'])
+
+    def test_release_merges_free_space(self):
+        self.allocator.next_available(24, count=3)
+        for network in list(self.allocator.allocated):
+            self.allocator.release(network)
+        self.assertEqual(self.allocator.free_blocks()[:2],
+                         ['10.0.1.0/24', '10.0.4.0/22'])
+        self.assertEqual(self.allocator.allocated, [])
+
+    def test_allocate(self):
+        self.allocator.allocate('10.0.6.0/24')
+        self.assertFalse(self.allocator.is_free('10.0.6.0/24'))
+        self.assertTrue(self.allocator.is_free('10.0.7.0/24'))
+        with self.assertRaises(infoblox.InfobloxNoNetworkAvailableException):
+            self.allocator.allocate('10.0.2.0/24')
+
+    def test_exhausted_allocates_nothing(self):
+        with self.assertRaises(infoblox.InfobloxNoNetworkAvailableException):
+            self.allocator.next_available(18, count=2)
+        self.assertEqual(self.allocator.allocated, [])
+        self.assertEqual(self.allocator.free_addresses(), 32000)
+
+    def test_bad_prefixlen(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.allocator.next_available(8)
+
+    def test_full_container(self):
+        allocator = Allocator('10.0.0.0/24', ['10.0.0.0/24'])
+        self.assertEqual(allocator.free_blocks(), [])
+        self.assertIsNone(allocator.largest_free_block())
+        self.assertEqual(allocator.fragmentation(), 0.0)
+
+
+class TestAllocatorGrid(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_load_and_commit(self):
+        responses.add(responses.GET, BASE_URL + 'network', status=200,
+                      body=json.dumps({'result': [{'network': n}
+                                                  for n in USED[:2]]}))
+        responses.add(responses.GET, BASE_URL + 'networkcontainer',
+                      status=200,
+                      body=json.dumps({'result': [{'network': USED[2]}]}))
+        allocator = Allocator.load(self.iba_ipa, '10.0.0.0/16')
+        self.assertEqual(len(responses.calls), 2)
+        self.assertIn('network_container=10.0.0.0%2F16',
+                      responses.calls[0].request.url)
+        self.assertEqual(allocator.free_addresses(), 32000)
+
+        allocator.next_available(24, count=2)
+        responses.add(responses.POST, BASE_URL + 'network', status=201,
+                      body='"network/ZG5z:10.0.1.0/24/default"')
+        results = allocator.commit(self.iba_ipa, jobs=2)
+        self.assertEqual(results, [('10.0.1.0/24', None),
+                                   ('10.0.4.0/24', None)])
@@ -0,0 +1,87 @@
+import responses
+
+from . import testcasefixture
+from .testcasefixture import BASE_URL, page
+
+
+class TestBatchLookups(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_get_hosts_joins_input_keys(self):
+        responses.add(responses.GET, BASE_URL + 'record:host', status=200,
+                      body=page([{'name': 'a.example.com',
+                                  'ipv4addrs': [{'ipv4addr': '10.0.0.1'}]}]))
+        hosts = self.iba_ipa.get_hosts(['A.example.com', 'b.example.com'],
+                                       fields='ipv4addrs')
+        self.assertEqual(hosts, {
+            'A.example.com': {'name': 'a.example.com',
+                              'ipv4addrs': [{'ipv4addr': '10.0.0.1'}]},
+            'b.example.com': None})
+        params = responses.calls[0].request.params
+        self.assertEqual(params['name~'],
+                         '^(a\\.example\\.com|b\\.example\\.com)$')
+        self.assertEqual(params['_return_fields'], 'name,ipv4addrs')
+        self.assertEqual(params['view'], 'default')
+
+    @responses.activate
+    def test_get_ips_by_hosts_in_chunks(self):
+        fqdns = ['host%04d.example.com' % i for i in range(300)]
+        responses.add(responses.GET, BASE_URL + 'record:host', status=200,
+                      body=page([{'name': 'host0001.example.com',
+                                  'ipv4addrs': [{'ipv4addr': '10.0.0.1'},
+                                                {'ipv4addr': '10.0.0.2'}]}]))
+        ips = self.iba_ipa.get_ips_by_hosts(fqdns)
+        self.assertEqual(ips['host0001.example.com'],
+                         ['10.0.0.1', '10.0.0.2'])
+        self.assertIsNone(ips['host0002.example.com'])
+        self.assertEqual(len(ips), 300)
+        self.assertGreater(len(responses.calls), 1)
+        self.assertLess(len(responses.calls), 10)
+        for call in responses.calls:
+            self.assertLess(len(call.request.url), 2500)
+
+    @responses.activate
+    def test_get_cname_records(self):
+        responses.add(responses.GET, BASE_URL + 'record:cname', status=200,
+                      body=page([{'name': 'www.example.com',
+                                  'canonical': 'a.example.com'}]))
+        cnames = self.iba_ipa.get_cname_records(['www.example.com'])
+        self.assertEqual(cnames['www.example.com']['canonical'],
+                         'a.example.com')
+
+
+class TestHostsByIps(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_dense_groups_use_range_queries(self):
+        responses.add(responses.GET, BASE_URL + 'ipv4address', status=200,
+                      body=page([{'ip_address': '10.0.0.%d' % i,
+                                  'names': ['h%d.example.com' % i]}
+                                 for i in (1, 2, 5)]))
+        responses.add(responses.GET, BASE_URL + 'ipv4address', status=200,
+                      body=page([{'ip_address': '10.9.0.1',
+                                  'names': ['x.example.com']}]))
+        ips = ['10.0.0.%d' % i for i in range(1, 6)] + ['10.9.0.1']
+        names = self.iba_ipa.get_hosts_by_ips(ips, jobs=2)
+        self.assertEqual(names, {'10.0.0.1': ['h1.example.com'],
+                                 '10.0.0.2': ['h2.example.com'],
+                                 '10.0.0.3': [], '10.0.0.4': [],
+                                 '10.0.0.5': ['h5.example.com'],
+                                 '10.9.0.1': ['x.example.com']})
+        self.assertEqual(len(responses.calls), 2)
+        params = [call.request.params for call in responses.calls]
+        self.assertEqual(params[0]['ip_address>'], '10.0.0.1')
+        self.assertEqual(params[0]['ip_address<'], '10.0.0.5')
+        self.assertEqual(params[0]['status'], 'USED')
+        self.assertEqual(params[1]['ip_address'], '10.9.0.1')
+
+    def test_bad_address(self):
+        from infoblox import infoblox
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.get_hosts_by_ips(['10.0.0.300'])
+
+    def test_short_address_forms_rejected(self):
+        from infoblox import infoblox
+        for ip in ('10.1', '10.0.1', '167772161', None):
+            with self.assertRaises(infoblox.InfobloxBadInputParameter):
+                self.iba_ipa.get_hosts_by_ips(['10.0.0.1', ip])
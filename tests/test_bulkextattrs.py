@@ -0,0 +1,113 @@
+import json
+
+import responses
+
+from infoblox import infoblox
+from . import testcasefixture
+from .testcasefixture import BASE_URL, page
+
+NEW_URL = 'https://10.10.10.10/wapi/v2.3/'
+
+NETWORKS = [
+    {'_ref': 'network/ZG5z:10.0.0.0/24/default', 'network': '10.0.0.0/24',
+     'extattrs': {'Site': {'value': 'HQ'}}},
+    {'_ref': 'network/ZG5z:10.0.1.0/24/default', 'network': '10.0.1.0/24',
+     'extattrs': {'Site': {'value': 'HQ', 'inheritance_source': {}},
+                  'CostCenter': {'value': '42'}}},
+]
+
+
+class TestBulkExtattrs(testcasefixture.TestCaseWithFixture):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestBulkExtattrs, cls).setUpClass()
+        cls.iba_new = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                        '2.3', 'default', 'default')
+
+    @responses.activate
+    def test_update_by_extattrs_rewrites_extattrs(self):
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=page(NETWORKS), status=200)
+        for network in NETWORKS:
+            responses.add(responses.PUT, BASE_URL + network['_ref'],
+                          status=200)
+        results = self.iba_ipa.update_extattrs(
+            'network', {'CostCenter': '42'}, extattrs='Site=HQ', jobs=2)
+        self.assertEqual(results, [('10.0.0.0/24', None),
+                                   ('10.0.1.0/24', None)])
+        self.assertEqual(len(responses.calls), 2)
+        self.assertIn('%2ASite=HQ', responses.calls[0].request.url)
+        self.assertEqual(json.loads(responses.calls[1].request.body),
+                         {'extattrs': {'Site': {'value': 'HQ'},
+                                       'CostCenter': {'value': '42'}}})
+
+    @responses.activate
+    def test_delete_incremental_in_batches(self):
+        responses.add(responses.GET, NEW_URL + 'network',
+                      body=page(NETWORKS), status=200)
+        responses.add(responses.POST, NEW_URL + 'request', body='[]',
+                      status=200)
+        results = self.iba_new.delete_extattrs(
+            'network', ['Site'], values=['10.0.0.0/24', '10.0.1.0/24'],
+            batch_size=10)
+        self.assertEqual(results, [('10.0.0.0/24', None),
+                                   ('10.0.1.0/24', None)])
+        self.assertIn('network~=', responses.calls[0].request.url)
+        operations = json.loads(responses.calls[1].request.body)
+        self.assertEqual([op['data'] for op in operations],
+                         [{'extattrs-': {'Site': {}}}] * 2)
+
+    @responses.activate
+    def test_failures_are_reported_per_object(self):
+        hosts = [{'_ref': 'record:host/ZG5z:a.example.com/default',
+                  'name': 'a.example.com'},
+                 {'_ref': 'record:host/ZG5z:b.example.com/default',
+                  'name': 'b.example.com'}]
+        responses.add(responses.GET, NEW_URL + 'record:host',
+                      body=page(hosts), status=200)
+        responses.add(responses.PUT, NEW_URL + hosts[0]['_ref'], status=200)
+        responses.add(responses.PUT, NEW_URL + hosts[1]['_ref'], status=400,
+                      body='{"text": "Bad extattr"}')
+        results = self.iba_new.update_extattrs(
+            'host', {'Owner': 'ops'}, regexp=r'\.example\.com$')
+        self.assertEqual(results, [('a.example.com', None),
+                                   ('b.example.com', 'Bad extattr')])
+        self.assertEqual(json.loads(responses.calls[1].request.body),
+                         {'extattrs+': {'Owner': {'value': 'ops'}}})
+
+    @responses.activate
+    def test_fixed_addresses_by_network(self):
+        fixed = [{'_ref': 'fixedaddress/ZG5z:10.0.0.5/default',
+                  'ipv4addr': '10.0.0.5', 'network': '10.0.0.0/24',
+                  'extattrs': {'Owner': {'value': 'ops'}}}]
+        responses.add(responses.GET, BASE_URL + 'fixedaddress',
+                      body=page(fixed), status=200)
+        results = self.iba_ipa.update_extattrs(
+            'fixedaddress', {'Owner': 'ops'}, values=['10.0.0.0/24'])
+        # unchanged objects are not written
+        self.assertEqual(results, [('10.0.0.5', None)])
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_values_without_objects_reported(self):
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=page(NETWORKS[:1]), status=200)
+        responses.add(responses.PUT, BASE_URL + NETWORKS[0]['_ref'],
+                      status=200)
+        results = self.iba_ipa.update_extattrs(
+            'network', {'Owner': 'ops'},
+            values=['10.0.0.0/24', '10.0.9.0/24', '10.0.8.0/24'])
+        self.assertEqual(results, [('10.0.0.0/24', None),
+                                   ('10.0.8.0/24', 'No network found'),
+                                   ('10.0.9.0/24', 'No network found')])
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_bad_selection(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.update_extattrs('network', {'A': 'b'})
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.update_extattrs('network', {'A': 'b'},
+                                         extattrs='A=c', regexp='.')
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.update_extattrs('zone', {'A': 'b'}, regexp='.')
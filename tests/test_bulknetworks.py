@@ -0,0 +1,135 @@
+import json
+
+import responses
+
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+
+class TestCreateNetworks(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_containers_before_networks(self):
+        responses.add(responses.POST, BASE_URL + 'networkcontainer',
+                      status=201, body='"networkcontainer/ZG5z:x"')
+        responses.add(responses.POST, BASE_URL + 'network', status=201,
+                      body='"network/ZG5z:x"')
+        results = self.iba_ipa.create_networks(
+            ['10.1.1.0/24', '10.1.0.0/24', 'bogus', '10.1.0.0/24'],
+            networkcontainers=['10.1.0.0/22', '10.0.0.0/8'], jobs=4)
+        self.assertEqual(results[-2:], [('10.1.0.0/24', None),
+                                        ('10.1.1.0/24', None)])
+        self.assertEqual(results[0], ('10.0.0.0/8', None))
+        self.assertEqual(results[1], ('10.1.0.0/22', None))
+        self.assertEqual(results[2][0], 'bogus')
+        created = [json.loads(c.request.body)['network']
+                   for c in responses.calls]
+        self.assertEqual(created, ['10.0.0.0/8', '10.1.0.0/22',
+                                   '10.1.0.0/24', '10.1.1.0/24'])
+
+    @responses.activate
+    def test_invalid_networks_are_reported(self):
+        results = self.iba_ipa.create_networks(['10.1.0.1/24', 'fe80::/64'])
+        self.assertEqual([network for network, __ in results],
+                         ['10.1.0.1/24', 'fe80::/64'])
+        self.assertTrue(all(error for __, error in results))
+        self.assertEqual(len(responses.calls), 0)
+
+    @responses.activate
+    def test_duplicates_are_reported(self):
+        responses.add(responses.POST, BASE_URL + 'network', status=201,
+                      body='"network/ZG5z:x"')
+        results = self.iba_ipa.create_networks(
+            ['10.1.0.0/24', '10.1.1.0/24', u'10.1.0.0/24'])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0],
+                         ('10.1.0.0/24', 'Duplicate network: 10.1.0.0/24'))
+        self.assertEqual(results[1:], [('10.1.0.0/24', None),
+                                       ('10.1.1.0/24', None)])
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_failures_are_reported_per_network(self):
+        def create(request):
+            if json.loads(request.body)['network'] == '10.1.1.0/24':
+                return 400, {}, json.dumps({'text': 'overlaps'})
+            return 201, {}, '"network/ZG5z:x"'
+
+        responses.add_callback(responses.POST, BASE_URL + 'network',
+                               callback=create)
+        results = self.iba_ipa.create_networks(['10.1.0.0/24',
+                                                '10.1.1.0/24'])
+        self.assertEqual(results, [('10.1.0.0/24', None),
+                                   ('10.1.1.0/24', 'overlaps')])
+
+    @responses.activate
+    def test_batches(self):
+        responses.add(responses.POST, BASE_URL + 'request', status=200,
+                      body='[]')
+        networks = ['10.1.%d.0/24' % i for i in range(5)]
+        results = self.iba_ipa.create_networks(networks, batch_size=2)
+        self.assertEqual(results, [(n, None) for n in networks])
+        self.assertEqual([len(json.loads(c.request.body))
+                          for c in responses.calls], [2, 2, 1])
+
+
+class TestDeleteNetworks(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_refs_found_with_one_search(self):
+        responses.add(responses.GET, BASE_URL + 'network', status=200,
+                      body=json.dumps({'result': [
+                          {'_ref': 'network/ZG5z:10.1.0.0/24/default',
+                           'network': '10.1.0.0/24'},
+                          {'_ref': 'network/ZG5z:10.1.1.0/24/default',
+                           'network': '10.1.1.0/24'}]}))
+        responses.add(responses.DELETE,
+                      BASE_URL + 'network/ZG5z:10.1.0.0/24/default',
+                      status=200, body='""')
+        responses.add(responses.DELETE,
+                      BASE_URL + 'network/ZG5z:10.1.1.0/24/default',
+                      status=200, body='""')
+        results = self.iba_ipa.delete_networks(
+            ['10.1.0.0/24', '10.1.1.0/24', '10.1.2.0/24'], jobs=2)
+        self.assertEqual(sorted(results), [
+            ('10.1.0.0/24', None), ('10.1.1.0/24', None),
+            ('10.1.2.0/24', 'No network found: 10.1.2.0/24')])
+        search = responses.calls[0].request.url
+        self.assertIn('network~=', search)
+        self.assertEqual(
+            len([c for c in responses.calls if c.request.method == 'GET']),
+            1)
+
+    @responses.activate
+    def test_inner_containers_deleted_first(self):
+        responses.add(responses.GET, BASE_URL + 'networkcontainer',
+                      status=200, body=json.dumps({'result': [
+                          {'_ref': 'networkcontainer/outer',
+                           'network': '10.0.0.0/8'},
+                          {'_ref': 'networkcontainer/inner',
+                           'network': '10.1.0.0/16'}]}))
+        responses.add(responses.DELETE, BASE_URL + 'networkcontainer/outer',
+                      status=200, body='""')
+        responses.add(responses.DELETE, BASE_URL + 'networkcontainer/inner',
+                      status=200, body='""')
+        results = self.iba_ipa.delete_networkcontainers(['10.0.0.0/8',
+                                                         '10.1.0.0/16'])
+        self.assertEqual(results, [('10.1.0.0/16', None),
+                                   ('10.0.0.0/8', None)])
+
+
+class TestGetIn(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_chunks_and_exact_matches(self):
+        responses.add(responses.GET, BASE_URL + 'record:host', status=200,
+                      body=json.dumps({'result': [
+                          {'name': 'a.example.com'},
+                          {'name': 'A.example.com'}]}))
+        found = list(self.iba_ipa.util.get_in(
+            'record:host', 'name',
+            ['a.example.com', 'b.example.com', 'c.example.com'],
+            max_pattern=60))
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(found, [{'name': 'a.example.com'}] * 2)
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+
+import responses
+from infoblox import cassette, infoblox
+from . import testcasefixture
+
+
+class TestCassette(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'host_get'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def new_api(self):
+        return infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                 '1.6', 'default', 'default')
+
+    def record(self, filename):
+        path = os.path.join(self.tmpdir, filename)
+        api = self.new_api()
+        recorder = cassette.record(api.session, path)
+        with responses.RequestsMock() as res:
+            res.add(responses.GET,
+                    'https://10.10.10.10/wapi/v1.6/record:host',
+                    body=self.body,
+                    status=200)
+            host = api.get_host('host.domain.com')
+        recorder.close()
+        return path, host
+
+    def test_replay_returns_recorded_response(self):
+        path, host = self.record('cassette.jsonl')
+        api = self.new_api()
+        cassette.replay(api.session, path, latency_scale=0)
+        self.assertEqual(api.get_host('host.domain.com'), host)
+
+    def test_replay_compressed_cassette(self):
+        path, host = self.record('cassette.jsonl.gz')
+        api = self.new_api()
+        cassette.replay(api.session, path, latency_scale=0)
+        self.assertEqual(api.get_host('host.domain.com'), host)
+
+    def test_replay_unrecorded_request(self):
+        path, __ = self.record('cassette.jsonl')
+        api = self.new_api()
+        cassette.replay(api.session, path, latency_scale=0)
+        with self.assertRaises(cassette.CassetteError):
+            api.get_host('otherhost.domain.com')
+
+    def test_replay_exhausted(self):
+        path, __ = self.record('cassette.jsonl')
+        api = self.new_api()
+        cassette.replay(api.session, path, latency_scale=0)
+        api.get_host('host.domain.com')
+        with self.assertRaises(cassette.CassetteError):
+            api.get_host('host.domain.com')
+
+    def test_replay_repeat(self):
+        path, host = self.record('cassette.jsonl')
+        api = self.new_api()
+        cassette.replay(api.session, path, latency_scale=0, repeat=True)
+        api.get_host('host.domain.com')
+        self.assertEqual(api.get_host('host.domain.com'), host)
+
+    def test_replay_scales_latency(self):
+        path, __ = self.record('cassette.jsonl')
+        sleeps = []
+        api = self.new_api()
+        adapter = cassette.ReplayAdapter(path, latency_scale=2,
+                                         sleep=sleeps.append)
+        api.session.mount('https://', adapter)
+        api.get_host('host.domain.com')
+        with open(path) as f:
+            recorded = json.loads(f.readline())['elapsed']
+        self.assertEqual(sleeps, [recorded * 2])
@@ -1,3 +1,5 @@
+import json
+
 from click.testing import CliRunner
 
 try:
@@ -13,10 +15,10 @@ except ImportError:
 from infoblox import cli
 
 
-def invoke(*args):
+def invoke(*args, **kwargs):
     runner = CliRunner()
     basics = ['--ipaddr=1.2.3.4', '--user=user1', '--password=pass1']
-    return runner.invoke(cli.cli, basics + list(args))
+    return runner.invoke(cli.cli, basics + list(args), **kwargs)
 
 
 class CreateCnameTests(unittest.TestCase):
@@ -835,6 +837,123 @@ class GetLeaseNotCalledWithoutParamsTests(unittest.TestCase):
         self.assertEqual(self.result.exit_code, 0)
 
 
+class SlowThresholdTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Session.dump_history')
+    @patch('infoblox.infoblox.Infoblox.get_grid')
+    def setUp(self, get_grid_mock, dump_history_mock):
+        self.dump_history_mock = dump_history_mock
+        self.result = invoke('--slow-threshold=0.5', '--dump-requests',
+                             'grid', 'get')
+
+    def test_dump_history_called_exactly_once(self):
+        self.assertEqual(self.dump_history_mock.call_count, 1)
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
+
+
+class NoDumpRequestsTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Session.dump_history')
+    @patch('infoblox.infoblox.Infoblox.get_grid')
+    def setUp(self, get_grid_mock, dump_history_mock):
+        self.dump_history_mock = dump_history_mock
+        self.result = invoke('grid', 'get')
+
+    def test_dump_history_not_called(self):
+        self.assertEqual(self.dump_history_mock.call_count, 0)
+
+
+class CompressionTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.get_grid', autospec=True)
+    def test_no_compression(self, get_grid_mock):
+        result = invoke('--no-compression', 'grid', 'get')
+        self.assertEqual(result.exit_code, 0)
+        api = get_grid_mock.call_args[0][0]
+        self.assertFalse(api.session.compress)
+
+    @patch('infoblox.infoblox.Infoblox.get_grid', autospec=True)
+    def test_compression_by_default(self, get_grid_mock):
+        invoke('grid', 'get')
+        api = get_grid_mock.call_args[0][0]
+        self.assertTrue(api.session.compress)
+
+
+class BatchTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.create_cname_record')
+    @patch('infoblox.infoblox.Session.ensure_pool_size')
+    def setUp(self, ensure_pool_size_mock, create_cname_mock):
+        self.ensure_pool_size_mock = ensure_pool_size_mock
+        self.create_cname_mock = create_cname_mock
+        self.create_cname_mock.side_effect = self.create_cname
+        commands = '\n'.join(
+            ['cname create a%d.domain.com b%d.domain.com' % (i, i)
+             for i in range(20)] +
+            ['# comment', '', '["cname", "create", "c.domain.com", "d"]'])
+        self.result = invoke('batch', '--jobs=4', input=commands)
+        self.lines = [json.loads(line)
+                      for line in self.result.output.splitlines()
+                      if line.startswith('{')]
+
+    @staticmethod
+    def create_cname(fqdn, name):
+        if fqdn == 'a7.domain.com':
+            raise ValueError('boom')
+
+    def test_pool_sized_for_jobs(self):
+        self.ensure_pool_size_mock.assert_called_once_with(4)
+
+    def test_create_cname_called_for_every_command(self):
+        self.assertEqual(self.create_cname_mock.call_count, 21)
+
+    def test_results_in_input_order(self):
+        self.assertEqual([line['line'] for line in self.lines],
+                         list(range(1, 21)) + [23])
+
+    def test_results_contain_command_output(self):
+        for i, line in enumerate(self.lines[:20]):
+            self.assertIn('for a%d.domain.com' % i, line['stdout'])
+
+    def test_json_command(self):
+        self.assertEqual(self.lines[-1]['argv'],
+                         ['cname', 'create', 'c.domain.com', 'd'])
+        self.assertEqual(self.lines[-1]['exit_code'], 0)
+
+    def test_continues_on_error(self):
+        self.assertEqual(self.lines[7]['exit_code'], 1)
+        self.assertIn('boom', self.lines[7]['stderr'])
+        self.assertEqual(self.lines[8]['exit_code'], 0)
+
+    def test_summary(self):
+        self.assertIn('21 commands, 1 failed', self.result.output)
+
+    def test_exit_code_is_one(self):
+        self.assertEqual(self.result.exit_code, 1)
+
+
+class BatchBadLineTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def setUp(self, init_mock):
+        self.result = invoke('batch', input='cname "unterminated\nbatch -\n'
+                             'shell\n--user=foo daemon --socket x\n')
+        self.lines = [json.loads(line)
+                      for line in self.result.output.splitlines()
+                      if line.startswith('{')]
+
+    def test_bad_lines_reported(self):
+        self.assertEqual([line['exit_code'] for line in self.lines],
+                         [2, 2, 2, 2])
+
+    def test_local_commands_not_run(self):
+        for line, command in zip(self.lines[1:], ('batch', 'shell',
+                                                  'daemon')):
+            self.assertEqual(line['stdout'], '')
+            self.assertIn('%s cannot be run from a batch' % command,
+                          line['stderr'])
+
+    def test_exit_code_is_one(self):
+        self.assertEqual(self.result.exit_code, 1)
+
+
 class TestProcessQueryParams(unittest.TestCase):
     def test_raises_value_error(self):
         with self.assertRaises(cli.InvalidParameter):
@@ -843,3 +962,139 @@ class TestProcessQueryParams(unittest.TestCase):
     def test_properly_transforms_to_dict(self):
         params = cli.process_query_params(('fizz=buzz', 'foo=bar'))
         self.assertDictEqual(params, {'fizz': 'buzz', 'foo': 'bar'})
+
+
+class FormatTests(unittest.TestCase):
+
+    @patch('infoblox.infoblox.Infoblox.get_host',
+           return_value={'name': 'a.example.com', 'ipv4addrs': [{'a': 1}]})
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_json_has_no_informational_lines(self, init_mock, get_host_mock):
+        result = invoke('hostrecord', 'get', '--format', 'json',
+                        'a.example.com')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.output),
+                         {'name': 'a.example.com', 'ipv4addrs': [{'a': 1}]})
+
+    @patch('infoblox.infoblox.Infoblox.get_host', return_value={'name': 'a'})
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_text_is_unchanged(self, init_mock, get_host_mock):
+        result = invoke('hostrecord', 'get', 'a')
+        self.assertEqual(result.output,
+                         "get host record a \n{'name': 'a'}\n")
+
+    @patch('infoblox.infoblox.Infoblox.iter_lease',
+           return_value=iter([{'address': '10.0.0.1', 'hardware': 'aa'},
+                              {'address': '10.0.0.2'}]))
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_lease_jsonl_streams_paged_results(self, init_mock, iter_mock):
+        result = invoke('lease', 'get', '--format', 'jsonl',
+                        'network=10.0.0.0/24')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual([json.loads(l) for l in result.output.splitlines()],
+                         [{'address': '10.0.0.1', 'hardware': 'aa'},
+                          {'address': '10.0.0.2'}])
+        __, kwargs = iter_mock.call_args
+        self.assertEqual(kwargs['query_params'], {'network': '10.0.0.0/24'})
+
+    @patch('infoblox.infoblox.Infoblox.iter_host_by_regexp',
+           return_value=iter([{'name': 'a', 'view': 'default',
+                               'extattrs': {'Site': {'value': 'HQ'}}}]))
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_csv_uses_return_fields_as_columns(self, init_mock, iter_mock):
+        result = invoke('hostrecord', 'by_regexp', '--format', 'csv',
+                        '--return-fields', 'name,extattrs', '^a')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output.splitlines(),
+                         ['name,extattrs', 'a,"{""Site"":{""value"":""HQ""}}"'])
+        args, __ = iter_mock.call_args
+        self.assertEqual(args, ('^a', ['name', 'extattrs']))
+
+    @patch('infoblox.infoblox.Infoblox.get_fixed_address',
+           return_value=[{'ipv4addr': '10.0.0.1'},
+                         {'ipv4addr': '10.0.0.2', 'mac': 'aa'}])
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_csv_columns_of_all_objects(self, init_mock, get_mock):
+        result = invoke('fixedaddress', 'get', '--format', 'csv',
+                        '10.0.0.1', 'aa')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output.splitlines(),
+                         ['ipv4addr,mac', '10.0.0.1,', '10.0.0.2,aa'])
+
+    @patch('infoblox.infoblox.Infoblox.iter_lease')
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_csv_stream_needs_columns(self, init_mock, iter_mock):
+        result = invoke('lease', 'get', '--format', 'csv',
+                        'network=10.0.0.0/24')
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('--return-fields', result.output)
+        result = invoke('network', 'by_extattrs', '--format', 'csv',
+                        'Site=HQ')
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('--full', result.output)
+        self.assertEqual(iter_mock.call_count, 0)
+
+    @patch('infoblox.infoblox.Infoblox.iter_network_by_extattrs',
+           return_value=iter([{'network': '10.0.0.0/24', 'utilization': 5,
+                               'comment': 'x'}]))
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_csv_columns_with_full(self, init_mock, iter_mock):
+        from infoblox.infoblox import FULL_FIELDS
+        result = invoke('network', 'by_extattrs', '--format', 'csv',
+                        '--full', '--return-fields', 'utilization', 'Site=HQ')
+        self.assertEqual(result.exit_code, 0)
+        header, row = result.output.splitlines()
+        self.assertEqual(header.split(','),
+                         ['utilization'] + FULL_FIELDS['network'])
+        self.assertTrue(row.startswith('5,10.0.0.0/24,'))
+
+    @patch('infoblox.infoblox.Infoblox.iter_network_by_extattrs',
+           return_value=iter([]))
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_json_of_empty_stream(self, init_mock, iter_mock):
+        result = invoke('network', 'by_extattrs', '--format', 'json',
+                        'Site=HQ')
+        self.assertEqual(result.output, '[]\n')
+
+    @patch('infoblox.infoblox.Infoblox.iter_network_by_extattrs',
+           return_value=iter([{'network': '10.0.0.0/24'}]))
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_full_search(self, init_mock, search_mock):
+        result = invoke('network', 'by_extattrs', '--format', 'jsonl',
+                        '--full', 'Site=HQ')
+        self.assertEqual(json.loads(result.output), {'network': '10.0.0.0/24'})
+        search_mock.assert_called_once_with('Site=HQ', None, full=True)
+
+    @patch('infoblox.infoblox.Infoblox.get_host_by_regexp')
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_search_options_need_machine_readable_format(self, init_mock,
+                                                          search_mock):
+        for args in (['hostrecord', 'by_regexp', '--full', 'a'],
+                     ['hostrecord', 'by_extattrs', '--return-fields=name',
+                      'Site=HQ'],
+                     ['network', 'by_extattrs', '--full', 'Site=HQ'],
+                     ['txtrecord', 'by_regexp', '--return-fields=text', 'a']):
+            result = invoke(*args)
+            self.assertEqual(result.exit_code, 2, args)
+            self.assertIn('--format', result.output)
+        self.assertEqual(search_mock.call_count, 0)
+
+    @patch('infoblox.infoblox.Infoblox.get_hosts_by_ips',
+           return_value={'10.0.0.1': ['a.example.com'], '10.0.0.2': []})
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_host_by_ip_file(self, init_mock, lookup_mock):
+        result = invoke('hostrecord', 'by_ip', '--file', '-', '--jobs', '4',
+                        input='10.0.0.1\n\n# comment\n10.0.0.2\n')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output.splitlines(),
+                         ['10.0.0.1 a.example.com', '10.0.0.2 '])
+        lookup_mock.assert_called_once_with(['10.0.0.1', '10.0.0.2'], jobs=4)
+
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def test_host_by_ip_needs_ip_or_file(self, init_mock):
+        result = invoke('hostrecord', 'by_ip')
+        self.assertEqual(result.exit_code, 2)
+
+    def test_unknown_format(self):
+        result = invoke('hostrecord', 'get', '--format', 'xml', 'a')
+        self.assertEqual(result.exit_code, 2)
@@ -0,0 +1,264 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from infoblox import cli, daemon
+from infoblox.infoblox import Session
+
+
+class ExecuteTests(unittest.TestCase):
+    def setUp(self):
+        self.api = mock.Mock()
+        self.api.get_grid.return_value = [{'_ref': 'grid/abc:Infoblox'}]
+
+    def test_output_captured(self):
+        exit_code, out, err = cli.execute(self.api, ['grid', 'get'])
+        self.assertIn('Getting Grid.', out)
+        self.assertIn('grid/abc:Infoblox', out)
+
+    def test_exit_code_is_zero(self):
+        exit_code, out, err = cli.execute(self.api, ['grid', 'get'])
+        self.assertEqual(exit_code, 0)
+
+    def test_api_object_reused(self):
+        cli.execute(self.api, ['grid', 'get'])
+        cli.execute(self.api, ['grid', 'get'])
+        self.assertEqual(self.api.get_grid.call_count, 2)
+
+    def test_usage_error(self):
+        exit_code, out, err = cli.execute(self.api, ['nosuchcommand'])
+        self.assertEqual(exit_code, 2)
+        self.assertIn('nosuchcommand', err)
+
+    def test_local_commands_refused(self):
+        for argv in (['shell'], ['batch', '-'], ['--user=x', 'daemon']):
+            exit_code, out, err = cli.execute(self.api, argv)
+            self.assertEqual(exit_code, 2, argv)
+            self.assertEqual(out, '')
+            self.assertIn('cannot be run', err)
+        self.assertEqual(self.api.method_calls, [])
+
+    def test_matching_connection_options_accepted(self):
+        self.api.iba_host = '1.2.3.4'
+        self.api.iba_verify_ssl = False
+        exit_code, out, err = cli.execute(
+            self.api, ['--ipaddr', '1.2.3.4', '--no-verify-ssl', 'grid', 'get'])
+        self.assertEqual(exit_code, 0)
+
+    def test_other_connection_options_rejected(self):
+        self.api.iba_user = 'admin'
+        exit_code, out, err = cli.execute(
+            self.api, ['--user=someone', 'grid', 'get'])
+        self.assertEqual(exit_code, 2)
+        self.assertIn('--user', err)
+        self.assertEqual(self.api.get_grid.call_count, 0)
+
+    def test_session_options_apply_to_one_command(self):
+        self.api.session = Session()
+        seen = []
+        self.api.get_grid.side_effect = \
+            lambda *args, **kwargs: seen.append(
+                self.api.session.slow_threshold) or []
+        cli.execute(self.api, ['--slow-threshold=0.5', 'grid', 'get'])
+        self.assertEqual(seen, [0.5])
+        self.assertIsNone(self.api.session.slow_threshold)
+
+    def test_compression_set_for_one_command(self):
+        self.api.session = Session()
+        seen = []
+        self.api.get_grid.side_effect = lambda *args, **kwargs: seen.append(
+            self.api.session.compress) or []
+        cli.execute(self.api, ['--no-compression', 'grid', 'get'])
+        self.assertTrue(self.api.session.compress)
+        self.api.session.compress = False
+        cli.execute(self.api, ['--compression', 'grid', 'get'])
+        self.assertFalse(self.api.session.compress)
+        self.assertEqual(seen, [False, True])
+
+    def test_session_options_of_concurrent_commands(self):
+        self.api.session = Session()
+        started = {'a': threading.Event(), 'b': threading.Event()}
+        seen = {}
+
+        def get_grid(*args, **kwargs):
+            # both commands run at the same time
+            name = threading.current_thread().name
+            started[name].set()
+            started['b' if name == 'a' else 'a'].wait(5)
+            session = self.api.session
+            seen[name] = (session.slow_threshold, session.compress)
+            return []
+        self.api.get_grid.side_effect = get_grid
+        threads = [
+            threading.Thread(name='a', target=cli.execute, args=(
+                self.api, ['--slow-threshold=1', 'grid', 'get'])),
+            threading.Thread(name='b', target=cli.execute, args=(
+                self.api, ['--no-compression', 'grid', 'get']))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {'a': (1.0, True), 'b': (None, False)})
+        self.assertIsNone(self.api.session.slow_threshold)
+        self.assertTrue(self.api.session.compress)
+
+    def test_api_error(self):
+        self.api.get_grid.side_effect = ValueError('boom')
+        exit_code, out, err = cli.execute(self.api, ['grid', 'get'])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('boom', err)
+
+
+class DaemonTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.socket_path = os.path.join(tmpdir, 'infoblox.sock')
+        self.api = mock.Mock()
+        self.api.get_grid.return_value = [{'_ref': 'grid/abc:Infoblox'}]
+        self.server = daemon.CommandServer(
+            self.socket_path, lambda argv: cli.execute(self.api, argv))
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_forward_returns_output(self):
+        exit_code, out, err = daemon.forward(self.socket_path, ['grid', 'get'])
+        self.assertEqual(exit_code, 0)
+        self.assertIn('grid/abc:Infoblox', out)
+
+    def test_forward_returns_exit_code(self):
+        exit_code, out, err = daemon.forward(self.socket_path, ['nope'])
+        self.assertEqual(exit_code, 2)
+
+    def test_main_forwards_to_daemon(self):
+        with mock.patch.dict(os.environ,
+                             {'IB_DAEMON_SOCKET': self.socket_path}):
+            with mock.patch('sys.stdout') as stdout:
+                with self.assertRaises(SystemExit) as exit:
+                    cli.main(['grid', 'get'])
+        self.assertEqual(exit.exception.code, 0)
+        self.assertIn('grid/abc:Infoblox', stdout.write.call_args[0][0])
+
+    def test_forward_without_daemon(self):
+        with self.assertRaises(socket.error):
+            daemon.forward(self.socket_path + '.missing', ['grid', 'get'])
+
+
+class DroppedConnectionTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.socket_path = os.path.join(tmpdir, 'infoblox.sock')
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(1)
+        self.addCleanup(listener.close)
+
+        def accept_and_drop():
+            conn, __ = listener.accept()
+            conn.recv(65536)
+            conn.close()
+        thread = threading.Thread(target=accept_and_drop)
+        thread.daemon = True
+        thread.start()
+
+    def test_forward_raises_daemon_error(self):
+        with self.assertRaises(daemon.DaemonError):
+            daemon.forward(self.socket_path, ['grid', 'get'])
+
+    @mock.patch('infoblox.infoblox.Infoblox.get_grid')
+    def test_main_does_not_run_command_again(self, get_grid_mock):
+        with mock.patch.dict(os.environ,
+                             {'IB_DAEMON_SOCKET': self.socket_path}):
+            with mock.patch('sys.stderr') as stderr:
+                with self.assertRaises(SystemExit) as exit:
+                    cli.main(['--ipaddr=1.2.3.4', 'grid', 'get'])
+        self.assertEqual(exit.exception.code, 1)
+        self.assertEqual(get_grid_mock.call_count, 0)
+        self.assertIn('daemon', stderr.write.call_args[0][0])
+
+
+class MainForwardingTests(unittest.TestCase):
+    def main(self, *args):
+        with mock.patch.dict(os.environ,
+                             {'IB_DAEMON_SOCKET': '/tmp/infoblox.sock'}):
+            with mock.patch('infoblox.daemon.forward',
+                            return_value=(0, '', '')) as forward:
+                with mock.patch('infoblox.cli.cli.main') as local:
+                    try:
+                        cli.main(list(args))
+                    except SystemExit:
+                        pass
+        return forward.called, local.called
+
+    def test_argument_named_daemon_forwarded(self):
+        self.assertEqual(self.main('--ipaddr', '1.2.3.4', 'hostrecord', 'get',
+                                   'daemon'), (True, False))
+
+    def test_batch_and_shell_run_locally(self):
+        for args in (['batch', '-'], ['--user=foo', 'batch', 'cmds.txt'],
+                     ['shell'], ['daemon', '--socket', 'x']):
+            forwarded, __ = self.main(*args)
+            self.assertFalse(forwarded, args)
+
+    def test_help_runs_locally(self):
+        forwarded, __ = self.main('--help')
+        self.assertFalse(forwarded)
+
+    def forwarded_args(self, environ, *args):
+        environ = dict(environ, IB_DAEMON_SOCKET='/tmp/infoblox.sock')
+        with mock.patch.dict(os.environ, environ):
+            with mock.patch('infoblox.daemon.forward',
+                            return_value=(0, '', '')) as forward:
+                with self.assertRaises(SystemExit):
+                    cli.main(list(args))
+        return forward.call_args[0][1]
+
+    def test_environment_options_forwarded(self):
+        args = self.forwarded_args(
+            {'IB_DNS_VIEW': 'internal', 'IB_COMPRESSION': 'false',
+             'IB_SLOW_THRESHOLD': '0.5'}, 'grid', 'get')
+        self.assertIn('--dns-view=internal', args)
+        self.assertIn('--no-compression', args)
+        self.assertIn('--slow-threshold=0.5', args)
+        self.assertEqual(args[-2:], ['grid', 'get'])
+
+    def test_command_line_overrides_environment(self):
+        args = self.forwarded_args({'IB_DNS_VIEW': 'internal'},
+                                   '--dns-view=external', 'grid', 'get')
+        self.assertEqual(args, ['--dns-view=external', 'grid', 'get'])
+
+    def test_environment_mismatch_rejected(self):
+        api = mock.Mock(iba_dns_view='default')
+        with mock.patch.dict(os.environ, {'IB_DNS_VIEW': 'internal'}):
+            argv = cli._environment_options(['grid', 'get']) + ['grid', 'get']
+        exit_code, out, err = cli.execute(api, argv)
+        self.assertEqual(exit_code, 2)
+        self.assertIn('--dns-view', err)
+        self.assertEqual(api.get_grid.call_count, 0)
+
+
+class MainWithoutDaemonTests(unittest.TestCase):
+    @mock.patch('infoblox.infoblox.Infoblox.get_grid')
+    def test_runs_locally_when_daemon_missing(self, get_grid_mock):
+        env = {'IB_DAEMON_SOCKET': '/nonexistent/infoblox.sock'}
+        with mock.patch.dict(os.environ, env):
+            with self.assertRaises(SystemExit) as exit:
+                cli.main(['--ipaddr=1.2.3.4', 'grid', 'get'])
+        self.assertEqual(exit.exception.code, 0)
+        self.assertEqual(get_grid_mock.call_count, 1)
@@ -0,0 +1,77 @@
+import json
+
+import responses
+
+from infoblox import infoblox
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+HOST_REF = 'record:host/ZG5z:a.example.com/default'
+
+
+class TestFieldProfiles(testcasefixture.TestCaseWithFixture):
+
+    def setUp(self):
+        self.iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default')
+
+    def return_fields(self, index=0):
+        request = responses.calls[index].request
+        return request.params.get('_return_fields')
+
+    @responses.activate
+    def test_minimal_fields_requested(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([{'_ref': HOST_REF, 'ipv4addrs': [
+                          {'ipv4addr': '10.0.0.1'}]}]))
+        self.assertEqual(self.iba_api.get_ip_by_host('a.example.com'),
+                         ['10.0.0.1'])
+        self.assertEqual(self.return_fields(), 'ipv4addrs')
+
+    @responses.activate
+    def test_ref_only(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([{'_ref': HOST_REF}]))
+        responses.add(responses.DELETE, BASE_URL + HOST_REF,
+                      body=json.dumps(HOST_REF))
+        self.iba_api.delete_host_record('a.example.com')
+        self.assertIn('_return_fields=&', responses.calls[0].request.url +
+                      '&')
+
+    @responses.activate
+    def test_profile_overridden(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([{'_ref': HOST_REF,
+                                        'name': 'a.example.com'}]))
+        self.iba_api.field_profiles['get_host_by_regexp'] = ['name', 'view']
+        self.iba_api.get_host_by_regexp('^a\\.')
+        del self.iba_api.field_profiles['get_host_by_regexp']
+        self.iba_api.get_host_by_regexp('^a\\.')
+        self.assertEqual(self.return_fields(0), 'name,view')
+        self.assertIsNone(self.return_fields(1))
+
+    def test_profiles_per_instance(self):
+        self.iba_api.field_profiles['get_ip_by_host'] = None
+        self.assertEqual(infoblox.FIELD_PROFILES['get_ip_by_host'],
+                         ['ipv4addrs'])
+
+
+class TestExists(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_exists(self):
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=json.dumps([{'_ref': 'network/ZG5z:10.0.0.0/24/'
+                                                'default'}]))
+        self.assertTrue(self.iba_ipa.exists(
+            'network', {'network': '10.0.0.0/24', 'network_view': 'default'}))
+        request = responses.calls[0].request
+        self.assertEqual(request.params['network'], '10.0.0.0/24')
+        self.assertEqual(request.params['_max_results'], '-1')
+        self.assertIn('_return_fields=&', request.url + '&')
+
+    @responses.activate
+    def test_not_exists(self):
+        responses.add(responses.GET, BASE_URL + 'record:cname', body='[]')
+        self.assertFalse(self.iba_ipa.exists('record:cname',
+                                             {'name': 'www.example.com'}))
@@ -0,0 +1,50 @@
+import json
+
+import responses
+from infoblox.hlinfoblox import HighLevelInfobloxActions
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+
+class TestGuessFqdn(unittest.TestCase):
+
+    def setUp(self):
+        self.actions = HighLevelInfobloxActions('10.10.10.10', 'foo', 'bar',
+                                                '1.6', 'default', 'default')
+        self.lease_url = 'https://10.10.10.10/wapi/v1.6/lease'
+        self.record = {'objects': ['lease/ZG5z:10.0.0.2/default1/1',
+                                   'lease/ZG5z:10.0.0.2/default2/2',
+                                   'lease/ZG5z:10.0.0.2/default3/3']}
+
+    @responses.activate
+    def test_one_lookup_for_all_leases(self):
+        responses.add(responses.GET, self.lease_url, status=200,
+                      body=json.dumps([{'_ref': 'lease/1'},
+                                       {'_ref': 'lease/2',
+                                        'client_hostname': 'build02'},
+                                       {'_ref': 'lease/3'}]))
+        fqdn = self.actions._guess_fqdn('10.0.0.2', self.record)
+        self.assertEqual(fqdn, 'build02')
+        self.assertEqual(len(responses.calls), 1)
+        url = responses.calls[0].request.url
+        self.assertIn('address=10.0.0.2', url)
+        self.assertIn('_return_fields=client_hostname', url)
+
+    @responses.activate
+    def test_no_lease_refs_no_lookup(self):
+        fqdn = self.actions._guess_fqdn('10.0.0.2', {'objects': []})
+        self.assertIsNone(fqdn)
+        self.assertEqual(len(responses.calls), 0)
+
+    @responses.activate
+    def test_no_hostname(self):
+        responses.add(responses.GET, self.lease_url, status=200, body='[]')
+        self.assertIsNone(self.actions._guess_fqdn('10.0.0.2', self.record))
+
+    def test_dhcp_client_identifier_wins(self):
+        self.record['dhcp_client_identifier'] = 'client.example.com'
+        self.assertEqual(self.actions._guess_fqdn('10.0.0.2', self.record),
+                         'client.example.com')
@@ -0,0 +1,144 @@
+import json
+
+import responses
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import infoblox, models
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+HOST_REF = 'record:host/ZG5z:a.example.com/default'
+ADDR_REF = 'record:host_ipv4addr/ZG5z:10.0.0.1/a.example.com/default'
+
+
+def host(**fields):
+    fields.update({'_ref': HOST_REF, 'name': 'a.example.com'})
+    return fields
+
+
+class TestIdentityMap(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default')
+        self.identity_map = models.IdentityMap()
+        self.iba_api.util.identity_map = self.identity_map
+
+    @responses.activate
+    def test_same_object_merged(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([host(view='default')]))
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([host(comment='web')]))
+        first = self.iba_api.get_host('a.example.com')
+        second = self.iba_api.get_host('a.example.com', fields='comment')
+        self.assertIs(first, second)
+        self.assertEqual(first['view'], 'default')
+        self.assertEqual(first['comment'], 'web')
+        self.assertIs(self.identity_map[HOST_REF], first)
+
+    @responses.activate
+    def test_nested_objects_shared(self):
+        address = {'_ref': ADDR_REF, 'ipv4addr': '10.0.0.1'}
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps({'result': [host(ipv4addrs=[address])]}))
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([host(ipv4addrs=[
+                          dict(address, configure_for_dhcp=True)])]))
+        hosts = list(self.iba_api.iter_host_by_regexp('^a\\.'))
+        again = self.iba_api.get_host('a.example.com')
+        self.assertIs(hosts[0], again)
+        self.assertIs(self.identity_map[ADDR_REF], again['ipv4addrs'][0])
+        self.assertTrue(self.identity_map[ADDR_REF]['configure_for_dhcp'])
+
+    @responses.activate
+    def test_record_objects_merged(self):
+        lease = {'_ref': 'lease/ZG5z:10.0.0.1/default',
+                 'address': '10.0.0.1'}
+        responses.add(responses.GET, BASE_URL + 'lease',
+                      body=json.dumps({'result': [lease]}))
+        responses.add(responses.GET, BASE_URL + 'lease',
+                      body=json.dumps({'result': [
+                          dict(lease, hardware='aa:aa:aa:aa:aa:01',
+                               extattrs={})]}))
+        first = list(self.iba_api.iter_lease(models=True))[0]
+        second = list(self.iba_api.iter_lease(models=True))[0]
+        self.assertIsInstance(first, models.Lease)
+        self.assertIs(first, second)
+        self.assertEqual(first.hardware, 'aa:aa:aa:aa:aa:01')
+        self.assertEqual(first.extattrs, {})
+
+    def test_objects_by_type(self):
+        self.identity_map.add(host())
+        self.identity_map.add({'_ref': ADDR_REF})
+        self.identity_map.add({'name': 'no reference'})
+        self.assertEqual(len(self.identity_map), 2)
+        self.assertEqual(self.identity_map.objects('record:host'), [host()])
+        self.identity_map.clear()
+        self.assertNotIn(HOST_REF, self.identity_map)
+
+    @responses.activate
+    def test_disabled_by_default(self):
+        self.iba_api.util.identity_map = None
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([host()]))
+        self.assertIsNot(self.iba_api.get_host('a.example.com'),
+                         self.iba_api.get_host('a.example.com'))
+
+    @responses.activate
+    def test_failed_update_leaves_object_as_read(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps([host(aliases=['b.example.com'])]))
+        responses.add(responses.PUT, BASE_URL + HOST_REF, status=500)
+        first = self.iba_api.get_host('a.example.com')
+        with self.assertRaises(Exception):
+            self.iba_api.add_host_alias('a.example.com', 'c.example.com')
+        self.assertEqual(first['aliases'], ['b.example.com'])
+        self.assertNotIn(HOST_REF, self.identity_map)
+
+    @responses.activate
+    def test_writes_evict_object(self):
+        for method in (responses.PUT, responses.DELETE):
+            responses.add(method, BASE_URL + HOST_REF, body='""')
+        for write in (lambda: self.iba_api.util.write('PUT', HOST_REF,
+                                                      payload={}),
+                      lambda: self.iba_api.util.put(host(), {}),
+                      lambda: self.iba_api.util.delete_by_ref(HOST_REF)):
+            self.identity_map.add(host())
+            write()
+            self.assertNotIn(HOST_REF, self.identity_map)
+
+    @responses.activate
+    def test_update_by_query_evicts_object(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]')
+        self.identity_map.add(host())
+        self.identity_map.add({'_ref': 'record:host/ZG5y:b.example.com/'
+                                       'default', 'name': 'b.example.com'})
+        self.iba_api.util.update_by_query(
+            'record:host', {'name': 'a.example.com', 'view': 'default'},
+            {'aliases+': ['c.example.com']})
+        self.assertNotIn(HOST_REF, self.identity_map)
+        self.assertEqual(len(self.identity_map), 1)
+
+    @responses.activate
+    def test_deleted_alias_read_back(self):
+        url = 'https://10.10.10.10/wapi/v2.3/'
+        self.iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '2.3',
+                                         'default', 'default')
+        self.iba_api.util.identity_map = self.identity_map
+        responses.add(responses.GET, url + 'record:host',
+                      body=json.dumps([host(aliases=['old.example.com'])]))
+        responses.add(responses.POST, url + 'request', body='[]')
+        responses.add(responses.GET, url + 'record:host',
+                      body=json.dumps([host(aliases=[])]))
+        self.assertEqual(
+            self.iba_api.get_host('a.example.com', fields='aliases')[
+                'aliases'], ['old.example.com'])
+        self.iba_api.delete_host_alias('a.example.com', 'old.example.com')
+        self.assertNotIn(HOST_REF, self.identity_map)
+        self.assertEqual(
+            self.iba_api.get_host('a.example.com', fields='aliases')[
+                'aliases'], [])
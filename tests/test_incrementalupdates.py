@@ -0,0 +1,223 @@
+import json
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+
+from infoblox import infoblox
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v2.3/'
+OLD_URL = 'https://10.10.10.10/wapi/v1.6/'
+HOST_REF = 'record:host/ZG5z:host.domain.com/default'
+HOST = [{'_ref': HOST_REF, 'name': 'host.domain.com',
+         'ipv4addrs': [{'_ref': 'record:host_ipv4addr/ZG5z:10.0.0.1/'
+                                'host.domain.com/default',
+                        'host': 'host.domain.com',
+                        'ipv4addr': '10.0.0.1',
+                        'configure_for_dhcp': False}]}]
+
+
+class TestIncrementalUpdates(testcasefixture.TestCaseWithFixture):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestIncrementalUpdates, cls).setUpClass()
+        cls.iba_new = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                        '2.3', 'default', 'default')
+
+    def _request(self):
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(responses.calls[0].request.url, BASE_URL + 'request')
+        get, put = json.loads(responses.calls[0].request.body)
+        self.assertEqual(get['assign_state'], {'ref': '_ref'})
+        self.assertEqual(put['object'], '##STATE:ref:##')
+        self.assertTrue(put['enable_substitution'])
+        return get['data'], put['data']
+
+    def test_version_check(self):
+        self.assertFalse(self.iba_ipa._use_incremental_updates())
+        self.assertTrue(self.iba_new._use_incremental_updates())
+        api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                '2.10', 'default', 'default')
+        self.assertTrue(api._use_incremental_updates())
+        api.incremental_updates = False
+        self.assertFalse(api._use_incremental_updates())
+
+    @responses.activate
+    def test_add_host_alias(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.add_host_alias('host.domain.com', 'alias.domain.com')
+        query, payload = self._request()
+        self.assertEqual(query, {'name': 'host.domain.com',
+                                 'view': 'default'})
+        self.assertEqual(payload, {'aliases+': ['alias.domain.com']})
+
+    @responses.activate
+    def test_delete_host_alias(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.delete_host_alias('host.domain.com', 'alias.domain.com')
+        self.assertEqual(self._request()[1],
+                         {'aliases-': ['alias.domain.com']})
+
+    @responses.activate
+    def test_update_network_extattrs(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.update_network_extattrs('10.0.0.0/24', {'Site': 'HQ'})
+        query, payload = self._request()
+        self.assertEqual(query, {'network': '10.0.0.0/24',
+                                 'network_view': 'default'})
+        self.assertEqual(payload, {'extattrs+': {'Site': {'value': 'HQ'}}})
+
+    @responses.activate
+    def test_delete_network_extattrs(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.delete_network_extattrs('10.0.0.0/24', ['Site'])
+        self.assertEqual(self._request()[1], {'extattrs-': {'Site': {}}})
+
+    @responses.activate
+    def test_add_host_ipv4addr(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.add_host_ipv4addr('host.domain.com', '10.0.0.2',
+                                       mac='aa:bb:cc:dd:ee:ff',
+                                       configure_for_dhcp=True)
+        self.assertEqual(self._request()[1], {'ipv4addrs+': [
+            {'ipv4addr': '10.0.0.2', 'mac': 'aa:bb:cc:dd:ee:ff',
+             'configure_for_dhcp': True}]})
+
+    @responses.activate
+    def test_delete_host_ipv4addr(self):
+        responses.add(responses.POST, BASE_URL + 'request', body='[]',
+                      status=200)
+        self.iba_new.delete_host_ipv4addr('host.domain.com', '10.0.0.2')
+        self.assertEqual(self._request()[1],
+                         {'ipv4addrs-': [{'ipv4addr': '10.0.0.2'}]})
+
+
+class TestHostAddressFallback(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_add_host_ipv4addr(self):
+        responses.add(responses.GET, OLD_URL + 'record:host',
+                      body=json.dumps(HOST), status=200)
+        responses.add(responses.PUT, OLD_URL + HOST_REF, status=200)
+        with mock.patch('sys.stdout') as stdout:
+            self.iba_ipa.add_host_ipv4addr('host.domain.com', '10.0.0.2')
+        self.assertFalse(stdout.write.called)
+        self.assertEqual(json.loads(responses.calls[1].request.body),
+                         {'ipv4addrs': [
+                             {'ipv4addr': '10.0.0.1',
+                              'configure_for_dhcp': False},
+                             {'ipv4addr': '10.0.0.2',
+                              'configure_for_dhcp': False}]})
+
+    @responses.activate
+    def test_delete_host_ipv4addr(self):
+        host = json.loads(json.dumps(HOST))
+        host[0]['ipv4addrs'].append({'ipv4addr': '10.0.0.2'})
+        responses.add(responses.GET, OLD_URL + 'record:host',
+                      body=json.dumps(host), status=200)
+        responses.add(responses.PUT, OLD_URL + HOST_REF, status=200)
+        with mock.patch('sys.stdout') as stdout:
+            self.iba_ipa.delete_host_ipv4addr('host.domain.com', '10.0.0.2')
+        self.assertFalse(stdout.write.called)
+        self.assertEqual(json.loads(responses.calls[1].request.body),
+                         {'ipv4addrs': [{'ipv4addr': '10.0.0.1',
+                                         'configure_for_dhcp': False}]})
+
+    @responses.activate
+    def test_delete_missing_host_ipv4addr(self):
+        responses.add(responses.GET, OLD_URL + 'record:host',
+                      body=json.dumps(HOST), status=200)
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.delete_host_ipv4addr('host.domain.com', '10.0.0.9')
+        self.assertEqual(len(responses.calls), 1)
+
+
+class TestUpdateNotFound(testcasefixture.TestCaseWithFixture):
+    """ Both the incremental and the read-then-write path raise
+    InfobloxNotFoundException for a missing host, network, alias or
+    address.
+    """
+
+    ERROR = json.dumps({'Error': 'AdmConProtoError: Result set is empty',
+                        'code': 'Client.Ibap.Proto',
+                        'text': 'Result set is empty'})
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestUpdateNotFound, cls).setUpClass()
+        cls.iba_new = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                        '2.3', 'default', 'default')
+
+    def _failing_update(self, object_type, *found):
+        responses.add(responses.POST, BASE_URL + 'request', body=self.ERROR,
+                      status=400)
+        for body in found:
+            responses.add(responses.GET, BASE_URL + object_type,
+                          body=json.dumps(body), status=200)
+
+    def _fallback(self, object_type, body):
+        responses.add(responses.GET, OLD_URL + object_type,
+                      body=json.dumps(body), status=200)
+
+    @responses.activate
+    def test_missing_host(self):
+        self._failing_update('record:host', [])
+        self._fallback('record:host', [])
+        for api in (self.iba_new, self.iba_ipa):
+            for call in (api.add_host_alias, api.delete_host_alias):
+                with self.assertRaises(infoblox.InfobloxNotFoundException):
+                    call('host.domain.com', 'alias.domain.com')
+            with self.assertRaises(infoblox.InfobloxNotFoundException):
+                api.delete_host_ipv4addr('host.domain.com', '10.0.0.1')
+
+    @responses.activate
+    def test_missing_network(self):
+        self._failing_update('network', [])
+        self._fallback('network', [])
+        for api in (self.iba_new, self.iba_ipa):
+            with self.assertRaises(infoblox.InfobloxNotFoundException):
+                api.update_network_extattrs('10.0.0.0/24', {'Site': 'HQ'})
+            with self.assertRaises(infoblox.InfobloxNotFoundException):
+                api.delete_network_extattrs('10.0.0.0/24', ['Site'])
+
+    @responses.activate
+    def test_missing_alias(self):
+        self._failing_update('record:host', HOST, [])
+        self._fallback('record:host', HOST)
+        for api in (self.iba_new, self.iba_ipa):
+            with self.assertRaises(infoblox.InfobloxNotFoundException) as e:
+                api.delete_host_alias('host.domain.com', 'alias.domain.com')
+            self.assertIn('alias', str(e.exception))
+        self.assertEqual(
+            json.loads(responses.calls[0].request.body)[0]['data'],
+            {'name': 'host.domain.com', 'view': 'default',
+             'aliases': 'alias.domain.com'})
+
+    @responses.activate
+    def test_missing_address(self):
+        self._failing_update('record:host', HOST, [])
+        self._fallback('record:host', HOST)
+        for api in (self.iba_new, self.iba_ipa):
+            with self.assertRaises(infoblox.InfobloxNotFoundException) as e:
+                api.delete_host_ipv4addr('host.domain.com', '10.0.0.9')
+            self.assertIn('10.0.0.9', str(e.exception))
+
+    @responses.activate
+    def test_other_errors_raised(self):
+        self._failing_update('record:host', HOST, HOST)
+        with self.assertRaises(infoblox.InfobloxGeneralException) as e:
+            self.iba_new.delete_host_alias('host.domain.com',
+                                           'alias.domain.com')
+        self.assertNotIsInstance(e.exception,
+                                 infoblox.InfobloxNotFoundException)
+        self.assertEqual(str(e.exception), 'Result set is empty')
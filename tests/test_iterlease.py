@@ -0,0 +1,66 @@
+import json
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+from . import testcasefixture
+
+
+class TestIterLease(testcasefixture.TestCaseWithFixture):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestIterLease, cls).setUpClass()
+        cls.get_url = 'https://10.10.10.10/wapi/v1.6/lease'
+        cls.query_params = {'network': '192.168.1.0/24'}
+
+    @responses.activate
+    def test_iter_lease_follows_pages(self):
+        responses.add(responses.GET, self.get_url, status=200,
+                      body=json.dumps({'result': [{'address': '192.168.1.10'}],
+                                       'next_page_id': 'page2'}))
+        responses.add(responses.GET, self.get_url, status=200,
+                      body=json.dumps({'result': [{'address': '192.168.1.11'}]}))
+        leases = list(self.iba_ipa.iter_lease(query_params=self.query_params,
+                                              fields=['address'],
+                                              page_size=1))
+        self.assertEqual([l['address'] for l in leases],
+                         ['192.168.1.10', '192.168.1.11'])
+        first, second = [c.request.url for c in responses.calls]
+        self.assertIn('_paging=1', first)
+        self.assertIn('_max_results=1', first)
+        self.assertIn('_return_fields=address', first)
+        self.assertIn('_page_id=page2', second)
+
+    @responses.activate
+    def test_iter_lease_is_lazy(self):
+        responses.add(responses.GET, self.get_url, status=200,
+                      body=json.dumps({'result': [{'address': '192.168.1.10'}],
+                                       'next_page_id': 'page2'}))
+        leases = self.iba_ipa.iter_lease(query_params=self.query_params)
+        next(leases)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_iter_lease_plain_list(self):
+        responses.add(responses.GET, self.get_url, status=200,
+                      body='[{"address": "192.168.1.10"}]')
+        leases = list(self.iba_ipa.iter_lease(query_params=self.query_params))
+        self.assertEqual(leases, [{'address': '192.168.1.10'}])
+
+    @responses.activate
+    def test_iter_lease_serverfail(self):
+        responses.add(responses.GET, self.get_url, body='{}', status=500)
+        with self.assertRaises(HTTPError):
+            list(self.iba_ipa.iter_lease(query_params=self.query_params))
+
+
+class TestExtattrsQuery(testcasefixture.TestCaseWithFixture):
+
+    def test_extattrs_query(self):
+        self.assertEqual(infoblox.extattrs_query('Site=HQ,Owner=ops'),
+                         {'*Site': 'HQ', '*Owner': 'ops'})
+
+    def test_extattrs_query_bad_input(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            infoblox.extattrs_query('Site')
@@ -0,0 +1,104 @@
+import json
+
+import responses
+from click.testing import CliRunner
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import hla
+from infoblox.hlinfoblox import HighLevelInfobloxActions
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+LEASES = [
+    {'address': '10.0.0.10', 'hardware': 'aa:aa:aa:aa:aa:0a',
+     'client_hostname': 'build10', 'binding_state': 'ACTIVE'},
+    {'address': '10.0.0.2', 'hardware': 'aa:aa:aa:aa:aa:02',
+     'client_hostname': 'build02', 'binding_state': 'ACTIVE'},
+    {'address': '10.0.0.3', 'hardware': 'aa:aa:aa:aa:aa:03',
+     'binding_state': 'ACTIVE'},
+    {'address': '10.0.0.4', 'hardware': 'aa:aa:aa:aa:aa:04',
+     'client_hostname': 'build04', 'binding_state': 'FREE'},
+    {'address': '10.0.0.5', 'hardware': 'aa:aa:aa:aa:aa:05',
+     'client_hostname': 'build05', 'binding_state': 'ACTIVE'},
+]
+
+HOST_ADDRS = [
+    {'_ref': 'record:host_ipv4addr/ZG5z:10.0.0.2/build02.example.com/default',
+     'ipv4addr': '10.0.0.2', 'host': 'build02.example.com',
+     'configure_for_dhcp': False},
+    {'_ref': 'record:host_ipv4addr/ZG5z:10.0.0.5/build05.example.com/default',
+     'ipv4addr': '10.0.0.5', 'host': 'build05.example.com',
+     'configure_for_dhcp': True, 'mac': 'aa:aa:aa:aa:aa:05'},
+]
+
+
+class TestLeaseToFixedSubnet(unittest.TestCase):
+
+    def setUp(self):
+        self.actions = HighLevelInfobloxActions('10.10.10.10', 'foo', 'bar',
+                                                '1.6', 'default', 'default')
+
+    def add_reads(self):
+        responses.add(responses.GET, BASE_URL + 'lease', status=200,
+                      body=json.dumps({'result': LEASES}))
+        responses.add(responses.GET, BASE_URL + 'record:host_ipv4addr',
+                      status=200, body=json.dumps({'result': HOST_ADDRS}))
+
+    @responses.activate
+    def test_plan_reads_each_object_type_once(self):
+        self.add_reads()
+        plan = self.actions.plan_subnet_lease_conversion(
+            '10.0.0.0/24', domain='example.com')
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(
+            [(c.address, c.action, c.fqdn) for c in plan],
+            [('10.0.0.2', 'update', 'build02.example.com'),
+             ('10.0.0.3', 'skip', None),
+             ('10.0.0.4', 'skip', 'build04'),
+             ('10.0.0.5', 'skip', 'build05.example.com'),
+             ('10.0.0.10', 'create', 'build10.example.com')])
+
+    @responses.activate
+    def test_dry_run_makes_no_changes(self):
+        self.add_reads()
+        results = list(self.actions.convert_subnet_leases_to_fixed_addresses(
+            '10.0.0.0/24'))
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(set(r.status for r in results), set(['planned']))
+
+    @responses.activate
+    def test_confirm_applies_plan(self):
+        self.add_reads()
+        responses.add(responses.PUT, BASE_URL + HOST_ADDRS[0]['_ref'],
+                      status=200, body='"%s"' % HOST_ADDRS[0]['_ref'])
+        responses.add(responses.POST, BASE_URL + 'record:host', status=500,
+                      body='{"text": "zone not found"}')
+        results = list(self.actions.convert_subnet_leases_to_fixed_addresses(
+            '10.0.0.0/24', confirm=True, jobs=4))
+        by_address = dict((r.address, r) for r in results)
+        self.assertEqual(by_address['10.0.0.2'].status, 'done')
+        self.assertEqual(by_address['10.0.0.10'].status, 'failed')
+        self.assertEqual(by_address['10.0.0.3'].status, 'planned')
+        put = [c for c in responses.calls if c.request.method == 'PUT'][0]
+        self.assertEqual(json.loads(put.request.body),
+                         {'configure_for_dhcp': True,
+                          'mac': 'aa:aa:aa:aa:aa:02'})
+        post = [c for c in responses.calls if c.request.method == 'POST'][0]
+        self.assertEqual(json.loads(post.request.body)['name'], 'build10')
+
+    @responses.activate
+    def test_cli_exit_code_reflects_failures(self):
+        self.add_reads()
+        responses.add(responses.PUT, BASE_URL + HOST_ADDRS[0]['_ref'],
+                      status=200, body='""')
+        responses.add(responses.POST, BASE_URL + 'record:host', status=500,
+                      body='{"text": "zone not found"}')
+        result = CliRunner().invoke(hla.cli, [
+            '--ipaddr=10.10.10.10', '--user=foo', '--password=bar',
+            'lease2fixed-subnet', '--confirm', '10.0.0.0/24'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('10.0.0.2        update done', result.output)
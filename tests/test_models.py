@@ -0,0 +1,135 @@
+import json
+
+import responses
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from infoblox import models
+from . import testcasefixture
+
+LEASE = {'_ref': 'lease/ZG5z:10.0.0.1/default', 'address': '10.0.0.1',
+         'hardware': 'aa:aa:aa:aa:aa:01', 'binding_state': 'ACTIVE',
+         'extattrs': {'Site': {'value': 'HQ'}}}
+
+
+class TestModels(unittest.TestCase):
+
+    def test_decode_known_types(self):
+        data = models.decode(json.dumps([
+            LEASE,
+            {'_ref': 'record:host/ZG5z:a.example.com/default',
+             'name': 'a.example.com',
+             'ipv4addrs': [{'_ref': 'record:host_ipv4addr/ZG5z:x',
+                            'ipv4addr': '10.0.0.2'}]},
+            {'_ref': 'grid/b25l', 'name': 'Infoblox'},
+        ]))
+        self.assertIsInstance(data[0], models.Lease)
+        self.assertIsInstance(data[1], models.HostRecord)
+        # nested objects of other types stay dictionaries
+        self.assertIsInstance(data[1]['ipv4addrs'][0], dict)
+        self.assertIsInstance(data[2], dict)
+
+    def test_dictionary_access(self):
+        lease = models.decode(json.dumps(LEASE))
+        self.assertEqual(lease['address'], '10.0.0.1')
+        self.assertEqual(lease.address, '10.0.0.1')
+        self.assertEqual(lease.get('client_hostname', 'x'), 'x')
+        self.assertIsNone(lease.client_hostname)
+        self.assertNotIn('client_hostname', lease)
+        self.assertIn('hardware', lease)
+        with self.assertRaises(KeyError):
+            lease['client_hostname']
+        self.assertEqual(lease.to_dict(), LEASE)
+        self.assertEqual(lease, LEASE)
+
+    def test_rare_fields(self):
+        lease = models.decode(json.dumps(LEASE))
+        self.assertEqual(lease.extattrs, {'Site': {'value': 'HQ'}})
+        self.assertEqual(lease['extattrs'], {'Site': {'value': 'HQ'}})
+        plain = models.Lease({'_ref': 'lease/x', 'address': '10.0.0.3'})
+        self.assertIsNone(plain._extra)
+        self.assertIsNone(plain.extattrs)
+
+    def test_interned_values(self):
+        first, second = models.decode(json.dumps([LEASE, LEASE]))
+        self.assertIs(first.binding_state, second.binding_state)
+
+    @unittest.skipIf(tracemalloc is None, 'needs tracemalloc')
+    def test_smaller_than_dictionaries(self):
+        text = json.dumps([{'_ref': 'lease/ZG5z:%d/default' % i,
+                            'address': '10.0.%d.%d' % (i // 256, i % 256),
+                            'hardware': 'aa:aa:aa:aa:%02x:%02x' % (
+                                i // 256, i % 256),
+                            'client_hostname': 'build%05d' % i,
+                            'binding_state': 'ACTIVE'}
+                           for i in range(5000)])
+
+        def measure(decode):
+            tracemalloc.start()
+            try:
+                result = decode(text)
+                return tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+                del result
+
+        self.assertLess(measure(models.decode), 0.8 * measure(json.loads))
+
+
+class TestPagedModels(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_iter_lease_models(self):
+        responses.add(responses.GET, 'https://10.10.10.10/wapi/v1.6/lease',
+                      status=200, body=json.dumps({'result': [LEASE]}))
+        leases = list(self.iba_ipa.iter_lease(
+            query_params={'network': '10.0.0.0/24'}, models=True))
+        self.assertIsInstance(leases[0], models.Lease)
+        self.assertEqual(leases[0].hardware, 'aa:aa:aa:aa:aa:01')
+
+
+class TestRef(unittest.TestCase):
+
+    HOST = 'record:host/ZG5zLmhvc3Q:a.example.com/default'
+
+    def test_parts(self):
+        ref = models.Ref(self.HOST)
+        self.assertEqual((ref.type, ref.id, ref.name, ref.view),
+                         ('record:host', 'ZG5zLmhvc3Q', 'a.example.com',
+                          'default'))
+
+    def test_network_name_keeps_prefix(self):
+        ref = models.Ref('network/ZG5zLm5ldHdvcms:10.0.0.0/24/default')
+        self.assertEqual((ref.name, ref.view), ('10.0.0.0/24', 'default'))
+
+    def test_missing_parts(self):
+        ref = models.Ref('grid/b25lLmNsdXN0ZXIkMA:Infoblox')
+        self.assertEqual((ref.name, ref.view), ('Infoblox', None))
+        ref = models.Ref('grid/b25lLmNsdXN0ZXIkMA')
+        self.assertEqual((ref.type, ref.name), ('grid', None))
+
+    def test_interned(self):
+        self.assertIs(models.Ref(self.HOST), models.Ref(self.HOST[:]))
+        ref = models.Ref(self.HOST)
+        self.assertIs(models.Ref(ref), ref)
+
+    def test_behaves_like_the_string(self):
+        ref = models.Ref(self.HOST)
+        self.assertEqual(ref, self.HOST)
+        self.assertEqual({self.HOST: 1}[ref], 1)
+        self.assertEqual(json.dumps([ref]), json.dumps([self.HOST]))
+
+    def test_matches(self):
+        ref = models.Ref(self.HOST)
+        self.assertTrue(ref.matches('record:host'))
+        self.assertTrue(ref.matches('record:host', 'a.example.com'))
+        self.assertFalse(ref.matches('record:host', 'b.example.com'))
+        self.assertFalse(ref.matches('record:a', 'a.example.com'))
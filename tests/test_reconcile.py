@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import tempfile
+
+import responses
+from click.testing import CliRunner
+
+from infoblox import cli, infoblox, reconcile
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+CURRENT = {
+    'record:host': [
+        {'_ref': 'record:host/ZG5z:a.example.com/default',
+         'name': 'a.example.com',
+         'ipv4addrs': [{'_ref': 'record:host_ipv4addr/x',
+                        'host': 'a.example.com', 'ipv4addr': '10.0.0.1',
+                        'configure_for_dhcp': True,
+                        'mac': 'aa:aa:aa:aa:aa:01'}]},
+        {'_ref': 'record:host/ZG5z:old.example.com/default',
+         'name': 'old.example.com',
+         'ipv4addrs': [{'ipv4addr': '10.0.0.9'}]},
+    ],
+    'record:a': [],
+    'record:cname': [
+        {'_ref': 'record:cname/ZG5z:www.example.com/default',
+         'name': 'www.example.com', 'canonical': 'a.example.com'},
+    ],
+    'record:txt': [
+        {'_ref': 'record:txt/ZG5z:a.example.com/default',
+         'name': 'a.example.com', 'text': 'v=spf1 -all'},
+    ],
+}
+
+INVENTORY = {
+    'zone': 'example.com',
+    'records': [
+        {'type': 'host', 'name': 'a.example.com',
+         'ipv4addrs': ['10.0.0.1', '10.0.0.2']},
+        {'type': 'cname', 'name': 'www.example.com',
+         'canonical': 'a.example.com'},
+        {'type': 'txt', 'name': 'a.example.com', 'text': 'v=spf1 -all'},
+        {'type': 'a', 'name': 'b.example.com', 'ipv4addr': '10.0.0.3'},
+    ],
+}
+
+
+def add_reads(zones=()):
+    responses.add(responses.GET, BASE_URL + 'zone_auth', status=200,
+                  body=json.dumps({'result': [{'fqdn': zone}
+                                              for zone in zones]}))
+    for wapi_type, objects in CURRENT.items():
+        responses.add(responses.GET, BASE_URL + wapi_type, status=200,
+                      body=json.dumps({'result': objects}))
+
+
+class TestReconcilePlan(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_plan(self):
+        add_reads()
+        changes = reconcile.plan(self.iba_ipa, INVENTORY)
+        self.assertEqual(len(responses.calls), 5)
+        self.assertIn('fqdn~=%5C.example%5C.com%24',
+                      responses.calls[0].request.url)
+        self.assertIn('zone=example.com', responses.calls[1].request.url)
+        self.assertEqual(
+            [(c.action, c.type, c.name) for c in changes],
+            [('delete', 'host', 'old.example.com'),
+             ('create', 'a', 'b.example.com'),
+             ('update', 'host', 'a.example.com')])
+        self.assertEqual(changes[1].data, {'name': 'b.example.com',
+                                           'view': 'default',
+                                           'ipv4addr': '10.0.0.3'})
+        # DHCP settings of the address which stays are kept
+        self.assertEqual(changes[2].data, {'ipv4addrs': [
+            {'ipv4addr': '10.0.0.1', 'configure_for_dhcp': True,
+             'mac': 'aa:aa:aa:aa:aa:01'},
+            {'ipv4addr': '10.0.0.2'}]})
+
+    def test_record_outside_zone(self):
+        inventory = {'zone': 'example.com', 'records': [
+            {'type': 'cname', 'name': 'www.example.org', 'canonical': 'x'}]}
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            reconcile.plan(self.iba_ipa, inventory)
+
+    @responses.activate
+    def test_record_in_child_zone(self):
+        add_reads(zones=['lab.example.com'])
+        inventory = dict(INVENTORY, records=INVENTORY['records'] + [
+            {'type': 'a', 'name': 'x.Lab.example.com',
+             'ipv4addr': '10.0.1.1'}])
+        with self.assertRaises(infoblox.InfobloxBadInputParameter) as e:
+            reconcile.plan(self.iba_ipa, inventory)
+        self.assertIn('lab.example.com', str(e.exception))
+        # names deeper in the zone itself are fine
+        responses.reset()
+        add_reads(zones=['lab.example.com'])
+        inventory['records'][-1]['name'] = 'x.dev.example.com'
+        changes = reconcile.plan(self.iba_ipa, inventory)
+        self.assertIn('x.dev.example.com', [c.name for c in changes])
+
+    def test_unsupported_type(self):
+        inventory = {'zone': 'example.com', 'records': [
+            {'type': 'mx', 'name': 'example.com'}]}
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            reconcile.plan(self.iba_ipa, inventory)
+
+    def test_duplicate_record(self):
+        record = {'type': 'cname', 'name': 'www.example.com',
+                  'canonical': 'a.example.com'}
+        inventory = {'zone': 'example.com', 'records': [record, record]}
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            reconcile.plan(self.iba_ipa, inventory)
+
+
+class TestReconcileApply(testcasefixture.TestCaseWithFixture):
+
+    def setUp(self):
+        self.changes = [
+            reconcile.Change('delete', 'host', 'old.example.com',
+                             ref='record:host/old'),
+            reconcile.Change('create', 'cname', 'x.example.com',
+                             {'name': 'x.example.com', 'canonical': 'y'}),
+            reconcile.Change('update', 'cname', 'www.example.com',
+                             {'canonical': 'z'}, ref='record:cname/www'),
+        ]
+
+    @responses.activate
+    def test_apply_one_request_per_change(self):
+        responses.add(responses.DELETE, BASE_URL + 'record:host/old',
+                      status=200, body='"record:host/old"')
+        responses.add(responses.POST, BASE_URL + 'record:cname',
+                      status=400, body='{"text": "bad canonical"}')
+        responses.add(responses.PUT, BASE_URL + 'record:cname/www',
+                      status=200, body='"record:cname/www"')
+        results = list(reconcile.apply(self.iba_ipa, self.changes, jobs=2))
+        self.assertEqual([(r.action, r.status) for r in results],
+                         [('delete', 'done'), ('create', 'failed'),
+                          ('update', 'done')])
+        self.assertEqual(results[1].detail, 'bad canonical')
+
+    @responses.activate
+    def test_apply_in_batches(self):
+        responses.add(responses.POST, BASE_URL + 'request', status=200,
+                      body='[]')
+        results = list(reconcile.apply(self.iba_ipa, self.changes,
+                                       batch_size=10))
+        self.assertEqual([r.status for r in results], ['done'] * 3)
+        # deletes are sent before anything is created
+        bodies = [json.loads(c.request.body) for c in responses.calls]
+        self.assertEqual(bodies, [
+            [{'method': 'DELETE', 'object': 'record:host/old'}],
+            [{'method': 'POST', 'object': 'record:cname',
+              'data': {'name': 'x.example.com', 'canonical': 'y'}},
+             {'method': 'PUT', 'object': 'record:cname/www',
+              'data': {'canonical': 'z'}}]])
+
+    @responses.activate
+    def test_failed_batch_fails_all_changes(self):
+        responses.add(responses.POST, BASE_URL + 'request', status=400,
+                      body='{"text": "rolled back"}')
+        results = list(reconcile.apply(self.iba_ipa, self.changes[1:],
+                                       batch_size=10))
+        self.assertEqual([(r.status, r.detail) for r in results],
+                         [('failed', 'rolled back')] * 2)
+
+
+class TestReconcileCli(testcasefixture.TestCaseWithFixture):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'inventory.json')
+        with open(self.path, 'w') as f:
+            json.dump(INVENTORY, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def invoke(self, *args):
+        return CliRunner().invoke(cli.cli, [
+            '--ipaddr=10.10.10.10', '--user=foo', '--password=bar',
+            'reconcile', self.path] + list(args))
+
+    @responses.activate
+    def test_dry_run(self):
+        add_reads()
+        result = self.invoke('--format', 'jsonl')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(len(responses.calls), 5)
+        rows = [json.loads(line) for line in result.output.splitlines()
+                if line.startswith('{')]
+        self.assertEqual([(r['action'], r['status']) for r in rows],
+                         [('delete', 'planned'), ('create', 'planned'),
+                          ('update', 'planned')])
+
+    @responses.activate
+    def test_confirm_with_failures(self):
+        add_reads()
+        responses.add(responses.POST, BASE_URL + 'request', status=400,
+                      body='{"text": "rolled back"}')
+        result = self.invoke('--confirm', '--batch-size', '100')
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('3 changes failed', result.output)
+
+    def test_invalid_inventory(self):
+        with open(self.path, 'w') as f:
+            f.write('{"records": "nope"}')
+        result = self.invoke()
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Expected a mapping', result.output)
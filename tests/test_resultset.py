@@ -0,0 +1,133 @@
+import json
+
+import responses
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from infoblox import infoblox, resultset
+from . import testcasefixture
+
+LEASES = [
+    {'address': '10.0.0.1', 'hardware': 'aa:bb:cc:dd:ee:01',
+     'binding_state': 'ACTIVE', 'ends': 1500},
+    {'address': '10.0.0.200', 'hardware': 'aa:bb:cc:dd:ee:02',
+     'binding_state': 'FREE', 'ends': 1000},
+    {'address': '10.0.1.5', 'binding_state': 'ACTIVE', 'ends': 2000},
+    {'address': '10.1.0.9', 'hardware': 'aa:bb:cc:dd:ee:04',
+     'binding_state': 'ACTIVE', 'ends': 3000},
+]
+FIELDS = ['address', 'hardware', 'binding_state', 'ends']
+
+
+class ResultSetTests(object):
+
+    def build(self):
+        return resultset.ResultSet.from_objects(LEASES, FIELDS)
+
+    def addresses(self, results):
+        return [row['address'] for row in results]
+
+    def test_rows(self):
+        results = self.build()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0], LEASES[0])
+        self.assertEqual(results[2]['hardware'], None)
+
+    def test_filter_subnet(self):
+        results = self.build().filter(subnet='10.0.0.0/24')
+        self.assertEqual(self.addresses(results), ['10.0.0.1', '10.0.0.200'])
+
+    def test_filter_conditions(self):
+        results = self.build().filter(subnet='10.0.0.0/16',
+                                      binding_state='ACTIVE',
+                                      ends=(1200, None))
+        self.assertEqual(self.addresses(results), ['10.0.0.1', '10.0.1.5'])
+
+    def test_filter_membership_and_address_range(self):
+        results = self.build().filter(binding_state=['FREE', 'ABANDONED'])
+        self.assertEqual(self.addresses(results), ['10.0.0.200'])
+        results = self.build().filter(address=('10.0.0.100', '10.1.0.0'))
+        self.assertEqual(self.addresses(results), ['10.0.0.200', '10.0.1.5'])
+        results = self.build().filter(hardware='aa:bb:cc:dd:ee:04')
+        self.assertEqual(self.addresses(results), ['10.1.0.9'])
+
+    def test_filter_membership_of_encoded_columns(self):
+        results = self.build().filter(address=['10.0.1.5', '10.1.0.9'])
+        self.assertEqual(self.addresses(results), ['10.0.1.5', '10.1.0.9'])
+        results = self.build().filter(
+            hardware=set(['aa:bb:cc:dd:ee:01', 'aa:bb:cc:dd:ee:04']))
+        self.assertEqual(self.addresses(results), ['10.0.0.1', '10.1.0.9'])
+        results = self.build().filter(ends=[1000, 3000], address=[])
+        self.assertEqual(len(results), 0)
+        results = self.build().filter(ends=[1000, 3000])
+        self.assertEqual(self.addresses(results), ['10.0.0.200', '10.1.0.9'])
+
+    def test_group_by(self):
+        groups = self.build().group_by('address', prefixlen=24)
+        self.assertEqual(sorted(groups), ['10.0.0.0/24', '10.0.1.0/24',
+                                          '10.1.0.0/24'])
+        self.assertEqual(self.addresses(groups['10.0.0.0/24']),
+                         ['10.0.0.1', '10.0.0.200'])
+        groups = self.build().group_by('binding_state')
+        self.assertEqual(len(groups['ACTIVE']), 3)
+
+    def test_counts(self):
+        self.assertEqual(self.build().counts('address', prefixlen=16),
+                         {'10.0.0.0/16': 3, '10.1.0.0/16': 1})
+        self.assertEqual(self.build().counts('binding_state'),
+                         {'ACTIVE': 3, 'FREE': 1})
+
+    def test_bad_input(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.build().filter(subnet='10.0.0.0/33')
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.build().filter(subnet='10.1/16')
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.build().counts('binding_state', prefixlen=24)
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.build().filter(client_hostname='x')
+
+
+@unittest.skipIf(resultset.numpy is None, 'needs numpy')
+class TestResultSetNumpy(ResultSetTests, unittest.TestCase):
+
+    def test_numpy_columns(self):
+        column = self.build().columns['address']
+        self.assertIsInstance(column, resultset.numpy.ndarray)
+
+
+class TestResultSetArrays(ResultSetTests, unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(resultset, 'numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_array_columns(self):
+        column = self.build().columns['address']
+        self.assertEqual(column.typecode, resultset._IP_TYPE)
+
+
+class TestGetResultSet(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_get_resultset(self):
+        responses.add(responses.GET, 'https://10.10.10.10/wapi/v1.6/lease',
+                      status=200, body=json.dumps({'result': LEASES}))
+        results = self.iba_ipa.util.get_resultset(
+            'lease', {'network_view': 'default'}, fields=','.join(FIELDS))
+        self.assertEqual(len(results), 4)
+        self.assertIn('_return_fields=address%2Chardware',
+                      responses.calls[0].request.url)
+
+    def test_fields_required(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.util.get_resultset('lease')
@@ -0,0 +1,70 @@
+import json
+
+import responses
+
+from infoblox import infoblox
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+HOSTS = [{'_ref': 'record:host/ZG5z:a.example.com/default',
+          'name': 'a.example.com', 'view': 'default',
+          'ipv4addrs': [{'ipv4addr': '10.0.0.1'}],
+          'extattrs': {'Site': {'value': 'HQ'}}}]
+
+
+class TestSearchFields(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_host_by_regexp_full(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps({'result': HOSTS}), status=200)
+        hosts = list(self.iba_ipa.iter_host_by_regexp('^a\\.', full=True))
+        self.assertEqual(hosts, HOSTS)
+        self.assertEqual(len(responses.calls), 1)
+        params = responses.calls[0].request.params
+        self.assertEqual(params['_return_fields'],
+                         ','.join(infoblox.FULL_FIELDS['record:host']))
+        self.assertEqual(params['name~'], '^a\\.')
+
+    @responses.activate
+    def test_host_by_extattrs_fields(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps({'result': HOSTS}), status=200)
+        hosts = list(self.iba_ipa.iter_host_by_extattrs(
+            'Site=HQ', fields='name,ipv4addrs'))
+        self.assertEqual(hosts, HOSTS)
+        params = responses.calls[0].request.params
+        self.assertEqual(params['_return_fields'], 'name,ipv4addrs')
+        self.assertEqual(params['*Site'], 'HQ')
+
+    @responses.activate
+    def test_network_by_extattrs_full_adds_fields(self):
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=json.dumps({'result': [], 'next_page_id': 'p2'}),
+                      status=200)
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=json.dumps({'result': [{'network': '10.0.0.0/24'}]}),
+                      status=200)
+        networks = self.iba_ipa.iter_network_by_extattrs(
+            'Site=HQ', fields=['utilization'], full=True)
+        self.assertEqual(list(networks), [{'network': '10.0.0.0/24'}])
+        self.assertEqual(len(responses.calls), 2)
+        fields = responses.calls[0].request.params['_return_fields']
+        self.assertEqual(fields.split(','),
+                         ['utilization'] + infoblox.FULL_FIELDS['network'])
+
+    @responses.activate
+    def test_names_without_fields(self):
+        responses.add(responses.GET, BASE_URL + 'record:host',
+                      body=json.dumps(HOSTS), status=200)
+        self.assertEqual(self.iba_ipa.get_host_by_regexp('^a\\.'),
+                         ['a.example.com'])
+
+    @responses.activate
+    def test_default_fields_without_full(self):
+        responses.add(responses.GET, BASE_URL + 'network',
+                      body=json.dumps({'result': []}), status=200)
+        list(self.iba_ipa.iter_network_by_extattrs('Site=HQ'))
+        self.assertNotIn('_return_fields',
+                         responses.calls[0].request.params)
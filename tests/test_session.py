@@ -1,3 +1,8 @@
+import gzip
+import io
+import json
+import threading
+
 try:
     import unittest2 as unittest
 except ImportError:
@@ -11,6 +16,7 @@ import requests
 import responses
 
 from infoblox import infoblox
+from infoblox.bulk import imap
 
 
 class SessionLogging(unittest.TestCase):
@@ -90,3 +96,278 @@ class SessionWhenHttpError(SessionLogging):
         args, __ = self.m_logger.error.call_args
         self.assertTrue("response-content=b'foo-body'" in args[0] or
                         "response-content='foo-body'" in args[0])
+
+
+class SessionHistory(SessionLogging):
+    @responses.activate
+    def setUp(self):
+        super(SessionHistory, self).setUp()
+        self.session = infoblox.Session(history_size=2)
+        for status in (200, 201, 202):
+            responses.add(responses.GET, 'http://www.foo.com/%d' % status,
+                          body='[]', status=status,
+                          content_type='application/json')
+            self.session.request('GET', 'http://www.foo.com/%d' % status,
+                                 params={'name': 'foo'})
+
+    def test_history_keeps_last_requests(self):
+        self.assertEqual([r.status for r in self.session.history], [201, 202])
+
+    def test_history_records_url(self):
+        self.assertEqual(self.session.history[-1].url, 'http://www.foo.com/202')
+
+    def test_history_records_params(self):
+        self.assertEqual(self.session.history[-1].params, {'name': 'foo'})
+
+    def test_history_records_elapsed(self):
+        self.assertGreaterEqual(self.session.history[-1].elapsed, 0)
+
+    def test_dump_history_writes_one_line_per_request(self):
+        stream = mock.Mock()
+        self.session.dump_history(stream)
+        lines = [args[0] for args, __ in stream.write.call_args_list]
+        self.assertEqual(len(lines), 2)
+        self.assertIn('GET 202', lines[1])
+        self.assertIn('http://www.foo.com/202', lines[1])
+
+
+class SessionWhenFailedRequestRecorded(SessionLogging):
+    @responses.activate
+    def test_failed_request_recorded(self):
+        responses.add(responses.GET, 'http://www.foo.com',
+                      body='foo-body', status=500)
+        with self.assertRaises(requests.HTTPError):
+            self.session.request('GET', 'http://www.foo.com')
+        self.assertEqual(self.session.history[-1].status, 500)
+
+
+class SessionSlowCall(SessionLogging):
+    @responses.activate
+    def test_slow_call_logged(self):
+        self.session.slow_threshold = 0
+        responses.add(responses.GET, 'http://www.foo.com', body='[]')
+        self.session.request('GET', 'http://www.foo.com',
+                             params={'name': 'foo'})
+        args, __ = self.m_logger.warning.call_args
+        self.assertIn('http://www.foo.com', args)
+        self.assertIn({'name': 'foo'}, args)
+        self.assertIn(200, args)
+
+    @responses.activate
+    def test_fast_call_not_logged(self):
+        self.session.slow_threshold = 60
+        responses.add(responses.GET, 'http://www.foo.com', body='[]')
+        self.session.request('GET', 'http://www.foo.com')
+        self.assertFalse(self.m_logger.warning.called)
+
+    @responses.activate
+    def test_threshold_disabled_by_default(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[]')
+        self.session.request('GET', 'http://www.foo.com')
+        self.assertFalse(self.m_logger.warning.called)
+
+
+class SessionPoolSize(unittest.TestCase):
+    def test_pool_grown(self):
+        session = infoblox.Session()
+        session.ensure_pool_size(32)
+        self.assertEqual(session.get_adapter('https://foo')._pool_maxsize, 32)
+
+    def test_pool_not_shrunk(self):
+        session = infoblox.Session()
+        adapter = session.get_adapter('https://foo')
+        session.ensure_pool_size(2)
+        self.assertIs(session.get_adapter('https://foo'), adapter)
+
+
+class SessionReadCache(unittest.TestCase):
+    def setUp(self):
+        self.session = infoblox.Session(cache=infoblox.ReadCache(ttl=60))
+
+    @responses.activate
+    def test_get_served_from_cache(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[1]')
+        self.session.get('http://www.foo.com', params={'name': 'foo'})
+        response = self.session.get('http://www.foo.com',
+                                    params={'name': 'foo'})
+        self.assertEqual(response.json(), [1])
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_different_params_not_cached(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[1]')
+        self.session.get('http://www.foo.com', params={'name': 'foo'})
+        self.session.get('http://www.foo.com', params={'name': 'bar'})
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_write_clears_cache(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[1]')
+        responses.add(responses.POST, 'http://www.foo.com', body='"ref"')
+        self.session.get('http://www.foo.com')
+        self.session.post('http://www.foo.com', data='{}')
+        self.session.get('http://www.foo.com')
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_expired_entries_not_used(self):
+        self.session.cache.ttl = -1
+        responses.add(responses.GET, 'http://www.foo.com', body='[1]')
+        self.session.get('http://www.foo.com')
+        self.session.get('http://www.foo.com')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_errors_not_cached(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[]',
+                      status=500)
+        for __ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                self.session.get('http://www.foo.com')
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_cache_size_bounded(self):
+        cache = infoblox.ReadCache(max_entries=2)
+        for key in 'abc':
+            cache.put(key, key)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+
+
+class SessionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.session = infoblox.Session()
+        self.calls = []
+
+    def step(self, name):
+        def middleware(send, method, url, *args, **kwargs):
+            self.calls.append(name)
+            kwargs.setdefault('headers', {})[name] = '1'
+            return send(method, url, *args, **kwargs)
+        return middleware
+
+    @responses.activate
+    def test_middleware_runs_outermost_last_added(self):
+        responses.add(responses.GET, 'http://www.foo.com', body='[]')
+        self.session.add_middleware(self.step('inner'))
+        self.session.add_middleware(self.step('outer'))
+        self.session.request('GET', 'http://www.foo.com')
+        self.assertEqual(self.calls, ['outer', 'inner'])
+        headers = responses.calls[0].request.headers
+        self.assertEqual((headers['inner'], headers['outer']), ('1', '1'))
+
+    @responses.activate
+    def test_middleware_sees_wapi_calls(self):
+        responses.add(responses.GET,
+                      'https://10.10.10.10/wapi/v1.6/record:host',
+                      body='[{"_ref": "record:host/ZG5z:a.example.com/default",'
+                           ' "ipv4addrs": [{"ipv4addr": "10.0.0.1"}]}]')
+        iba_api = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        iba_api.session.add_middleware(self.step('wapi'))
+        iba_api.get_ip_by_host('a.example.com')
+        self.assertEqual(self.calls, ['wapi'])
+
+
+class SessionEnvironmentSettings(unittest.TestCase):
+    def setUp(self):
+        self.session = infoblox.Session()
+
+    def test_looked_up_once_per_host(self):
+        with mock.patch('requests.sessions.get_environ_proxies',
+                        return_value={}) as m_proxies:
+            for __ in range(3):
+                self.session.merge_environment_settings(
+                    'https://foo/wapi/v1.6/network', {}, None, None, None)
+            self.session.merge_environment_settings(
+                'https://bar/wapi/v1.6/network', {}, None, None, None)
+        self.assertEqual(m_proxies.call_count, 2)
+
+    def test_cached_settings_not_shared(self):
+        settings = self.session.merge_environment_settings(
+            'https://foo/', {}, None, None, None)
+        settings['proxies']['https'] = 'http://proxy'
+        self.assertNotIn('https', self.session.merge_environment_settings(
+            'https://foo/', {}, None, None, None)['proxies'])
+
+    def test_not_cached_without_trust_env(self):
+        self.session.trust_env = False
+        self.session.merge_environment_settings(
+            'https://foo/', {}, None, None, None)
+        self.assertEqual(self.session._environment_settings, {})
+
+
+class SessionCompression(unittest.TestCase):
+    def setUp(self):
+        self.body = json.dumps([{'address': '10.0.0.%d' % i}
+                                for i in range(200)]).encode('utf-8')
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+            f.write(self.body)
+        self.compressed = buf.getvalue()
+
+    @responses.activate
+    def test_compressed_response(self):
+        responses.add(responses.GET, 'http://www.foo.com',
+                      body=self.compressed,
+                      headers={'Content-Encoding': 'gzip'})
+        session = infoblox.Session()
+        response = session.request('GET', 'http://www.foo.com')
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(
+            responses.calls[0].request.headers['Accept-Encoding'],
+            'gzip, deflate')
+        record = session.history[-1]
+        self.assertEqual(record.bytes_received, len(self.compressed))
+        self.assertEqual(record.bytes_decoded, len(self.body))
+
+    @responses.activate
+    def test_compression_disabled(self):
+        responses.add(responses.GET, 'http://www.foo.com', body=self.body)
+        session = infoblox.Session(compress=False)
+        self.assertFalse(session.compress)
+        session.request('GET', 'http://www.foo.com')
+        self.assertEqual(
+            responses.calls[0].request.headers['Accept-Encoding'],
+            'identity')
+        record = session.history[-1]
+        self.assertEqual(record.bytes_received, len(self.body))
+        self.assertEqual(record.bytes_decoded, len(self.body))
+
+    @responses.activate
+    def test_compression_overridden_for_thread(self):
+        responses.add(responses.GET, 'http://www.foo.com', body=self.body)
+        session = infoblox.Session()
+        previous = session.override(compress=False)
+        self.assertFalse(session.compress)
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(session.compress))
+        thread.start()
+        thread.join()
+        self.assertEqual(other, [True])
+        session.request('GET', 'http://www.foo.com')
+        session.restore(previous)
+        session.request('GET', 'http://www.foo.com')
+        self.assertEqual(
+            [call.request.headers['Accept-Encoding']
+             for call in responses.calls], ['identity', 'gzip, deflate'])
+        self.assertEqual(session.headers['Accept-Encoding'], 'gzip, deflate')
+
+    def test_override_inherited_by_bulk_threads(self):
+        session = infoblox.Session()
+        session.override(slow_threshold=2)
+        try:
+            seen = list(imap(lambda i: session.slow_threshold, range(4),
+                             jobs=2))
+        finally:
+            session.restore({})
+        self.assertEqual(seen, [2] * 4)
+        self.assertIsNone(session.slow_threshold)
+
+    def test_sizes_in_history_dump(self):
+        session = infoblox.Session()
+        session._record('GET', 'http://www.foo.com', None, 200, 0.1, 10, 40)
+        stream = mock.Mock()
+        session.dump_history(stream)
+        self.assertIn(' 10/40B ', stream.write.call_args[0][0])
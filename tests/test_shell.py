@@ -0,0 +1,101 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from click.testing import CliRunner
+
+from infoblox import cli, infoblox, shell
+
+
+class CompleterTests(unittest.TestCase):
+    def setUp(self):
+        response = mock.Mock()
+        response.json.return_value = [
+            {'name': 'host.domain.com', 'aliases': ['alias.domain.com'],
+             'ipv4addrs': [{'ipv4addr': '192.168.40.10'}]},
+            {'network': '192.168.40.0/24'}]
+        cache = mock.Mock()
+        cache.responses.return_value = [response]
+        self.completer = shell.Completer(cli.cli, cache)
+
+    def test_top_level_commands(self):
+        self.assertEqual(self.completer.candidates([], 'host'),
+                         ['hostrecord'])
+
+    def test_shell_and_daemon_not_offered(self):
+        candidates = self.completer.candidates([], '')
+        self.assertNotIn('shell', candidates)
+        self.assertNotIn('daemon', candidates)
+
+    def test_subcommands(self):
+        self.assertEqual(self.completer.candidates(['cname'], 'up'),
+                         ['update'])
+
+    def test_cached_names(self):
+        self.assertEqual(
+            self.completer.candidates(['hostrecord', 'get'], 'host'),
+            ['host.domain.com'])
+
+    def test_cached_nested_names(self):
+        self.assertEqual(
+            self.completer.candidates(['hostrecord', 'get'], 'alias'),
+            ['alias.domain.com'])
+
+    def test_cached_networks_and_addresses(self):
+        self.assertEqual(
+            self.completer.candidates(['network', 'get'], '192.'),
+            ['192.168.40.0/24', '192.168.40.10'])
+
+    def test_options(self):
+        self.assertIn('--name',
+                      self.completer.candidates(['grid', 'get'], '--'))
+
+
+class ShellTests(unittest.TestCase):
+    @mock.patch('infoblox.infoblox.Infoblox.get_host')
+    def setUp(self, get_host_mock):
+        self.get_host_mock = get_host_mock
+        get_host_mock.return_value = {'name': 'host.domain.com'}
+        commands = '\n'.join(['hostrecord get host.domain.com',
+                              '',
+                              'hostrecord get "unterminated',
+                              'shell',
+                              'hostrecord get host.domain.com',
+                              'exit',
+                              'hostrecord get never.domain.com'])
+        runner = CliRunner()
+        self.result = runner.invoke(cli.cli, ['--ipaddr=1.2.3.4', 'shell'],
+                                    input=commands)
+
+    def test_commands_run_until_exit(self):
+        self.assertEqual(self.get_host_mock.call_count, 2)
+
+    def test_output_written(self):
+        self.assertIn("{'name': 'host.domain.com'}", self.result.output)
+
+    def test_errors_reported(self):
+        self.assertIn('shell cannot be run from the shell', self.result.output)
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
+
+
+class ShellRunTests(unittest.TestCase):
+    def test_api_object_and_session_reused(self):
+        api = mock.Mock()
+        lines = iter(['grid get', 'grid get'])
+
+        def read_line(prompt):
+            try:
+                return next(lines)
+            except StopIteration:
+                raise EOFError()
+
+        shell.run(api, cli.cli, cli.execute, read_line=read_line)
+        self.assertEqual(api.get_grid.call_count, 2)
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous ceiling for importing a CLI module, in microseconds. Importing
+# requests alone costs more than this on most machines.
+IMPORT_BUDGET_US = 150000
+
+
+def importtime(code):
+    """Run code in a fresh interpreter with -X importtime and return a
+    dict of module name -> cumulative import time in microseconds."""
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    __, err = proc.communicate()
+    modules = {}
+    for line in err.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        __, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime needs Python 3.7')
+class StartupTests(unittest.TestCase):
+    def assertLazy(self, modules):
+        self.assertNotIn('requests', modules)
+        self.assertNotIn('infoblox.infoblox', modules)
+
+    def test_cli_help_does_not_import_requests(self):
+        self.assertLazy(importtime(
+            "from infoblox.cli import main\n"
+            "try:\n    main(['--help'])\nexcept SystemExit:\n    pass"))
+
+    def test_cli_usage_error_does_not_import_requests(self):
+        self.assertLazy(importtime(
+            "from infoblox.cli import main\n"
+            "try:\n    main(['cname', 'create'])\nexcept SystemExit:\n    pass"))
+
+    def test_hla_help_does_not_import_requests(self):
+        self.assertLazy(importtime(
+            "from infoblox.hla import cli\n"
+            "try:\n    cli.main(['--help'])\nexcept SystemExit:\n    pass"))
+
+    def test_cli_import_time(self):
+        modules = importtime('import infoblox.cli')
+        self.assertLess(modules['infoblox.cli'], IMPORT_BUDGET_US)
+
+    def test_hla_import_time(self):
+        modules = importtime('import infoblox.hla')
+        self.assertLess(modules['infoblox.hla'], IMPORT_BUDGET_US)
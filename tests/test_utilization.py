@@ -0,0 +1,110 @@
+import json
+
+import responses
+from click.testing import CliRunner
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import cli, utilization
+from . import testcasefixture
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+USED = [
+    {'ip_address': '10.0.0.0', 'types': ['NETWORK']},
+    {'ip_address': '10.0.0.1', 'types': ['HOST']},
+    {'ip_address': '10.0.0.2', 'types': ['LEASE']},
+    {'ip_address': '10.0.0.3', 'types': ['FIXED_ADDRESS']},
+    {'ip_address': '10.0.0.20', 'types': ['LEASE', 'A']},
+    {'ip_address': '10.0.0.255', 'types': ['BROADCAST']},
+]
+
+
+class TestCompute(unittest.TestCase):
+
+    def test_counts_and_free_blocks(self):
+        result = utilization.compute('10.0.0.0/24', USED)
+        self.assertEqual(result.total, 254)
+        self.assertEqual(result.used, 4)
+        self.assertEqual(result.free, 250)
+        self.assertEqual(result.dhcp, 2)
+        self.assertEqual(result.static, 2)
+        self.assertEqual(result.free_blocks, ['10.0.0.21-10.0.0.254',
+                                              '10.0.0.4-10.0.0.19'])
+        self.assertEqual(result.percent_used, 1.6)
+
+    def test_empty_network(self):
+        result = utilization.compute('10.0.0.0/29', [], blocks=1)
+        self.assertEqual((result.total, result.used, result.free), (6, 0, 6))
+        self.assertEqual(result.free_blocks, ['10.0.0.1-10.0.0.6'])
+
+    def test_full_network(self):
+        addresses = [{'ip_address': '10.0.0.%d' % i, 'types': ['HOST']}
+                     for i in range(1, 255)]
+        result = utilization.compute('10.0.0.0/24', addresses)
+        self.assertEqual((result.used, result.free), (254, 0))
+        self.assertEqual(result.free_blocks, [])
+
+    def test_point_to_point(self):
+        result = utilization.compute(
+            '10.0.0.0/31', [{'ip_address': '10.0.0.1', 'types': ['A']}])
+        self.assertEqual((result.total, result.used, result.free), (2, 1, 1))
+        self.assertEqual(result.free_blocks, ['10.0.0.0-10.0.0.0'])
+
+
+class TestNetworkUtilization(testcasefixture.TestCaseWithFixture):
+
+    @responses.activate
+    def test_one_paged_read(self):
+        responses.add(responses.GET, BASE_URL + 'ipv4address', status=200,
+                      body=json.dumps({'result': USED}))
+        result = self.iba_ipa.get_network_utilization('10.0.0.0/24')
+        self.assertEqual(result.used, 4)
+        self.assertEqual(len(responses.calls), 1)
+        url = responses.calls[0].request.url
+        self.assertIn('status=USED', url)
+        self.assertIn('network=10.0.0.0%2F24', url)
+
+    @responses.activate
+    def test_container(self):
+        def networks(request):
+            if 'network_container=10.0.0.0%2F16' in request.url:
+                found = [{'network': '10.0.0.0/24'}]
+            else:
+                found = [{'network': '10.0.4.0/24'}]
+            return 200, {}, json.dumps({'result': found})
+
+        def containers(request):
+            if 'network_container=10.0.0.0%2F16' in request.url:
+                found = [{'network': '10.0.4.0/22'}]
+            else:
+                found = []
+            return 200, {}, json.dumps({'result': found})
+
+        responses.add_callback(responses.GET, BASE_URL + 'network',
+                               callback=networks)
+        responses.add_callback(responses.GET, BASE_URL + 'networkcontainer',
+                               callback=containers)
+        responses.add(responses.GET, BASE_URL + 'ipv4address', status=200,
+                      body=json.dumps({'result': USED}))
+
+        results = list(self.iba_ipa.iter_container_utilization(
+            '10.0.0.0/16', jobs=2))
+        self.assertEqual([r.network for r in results],
+                         ['10.0.0.0/24', '10.0.4.0/24'])
+        self.assertEqual(results[1].used, 0)
+
+    @responses.activate
+    def test_cli(self):
+        responses.add(responses.GET, BASE_URL + 'ipv4address', status=200,
+                      body=json.dumps({'result': USED}))
+        result = CliRunner().invoke(cli.cli, [
+            '--ipaddr=10.10.10.10', '--user=foo', '--password=bar',
+            'network', 'utilization', '--format', 'json', '10.0.0.0/24'])
+        self.assertEqual(result.exit_code, 0)
+        rows = json.loads(result.output)
+        self.assertEqual(rows[0]['dhcp'], 2)
+        self.assertEqual(rows[0]['percent_used'], 1.6)
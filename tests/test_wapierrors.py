@@ -0,0 +1,91 @@
+import json
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+from . import testcasefixture
+
+
+def wapi_error(code, text):
+    return json.dumps({'Error': 'AdmConDataError: None (%s)' % text,
+                       'code': code, 'text': text})
+
+
+class TestWapiErrors(testcasefixture.TestCaseWithFixture):
+    @classmethod
+    def setUpClass(cls):
+        super(TestWapiErrors, cls).setUpClass()
+        cls.base_url = 'https://10.10.10.10/wapi/v1.6/'
+        cls.network_ref = 'network/ZG5zLm5ldHdvcmskMTAuMC4wLjAvMjQvMA:' \
+                          '10.0.0.0/24/default'
+
+    @responses.activate
+    def test_no_ip_available(self):
+        responses.add(responses.GET, self.base_url + 'network',
+                      body=json.dumps([{'_ref': self.network_ref}]),
+                      status=200)
+        responses.add(responses.POST, self.base_url + self.network_ref,
+                      body=wapi_error('Client.Ibap.Data',
+                                      'No IP available in 10.0.0.0/24'),
+                      status=400)
+        with self.assertRaises(infoblox.InfobloxNoIPavailableException) as e:
+            self.iba_ipa.get_next_available_ip('10.0.0.0/24')
+        self.assertIn('No IP available', str(e.exception))
+
+    @responses.activate
+    def test_error_text_raised(self):
+        responses.add(responses.POST, self.base_url + 'record:cname',
+                      body=wapi_error('Client.Ibap.Data.Conflict',
+                                      'The record already exists.'),
+                      status=400)
+        with self.assertRaises(infoblox.InfobloxGeneralException) as e:
+            self.iba_ipa.create_cname_record('a.example.com',
+                                             'b.example.com')
+        self.assertEqual(str(e.exception), 'The record already exists.')
+
+    @responses.activate
+    def test_error_on_write(self):
+        responses.add(responses.DELETE, self.base_url + self.network_ref,
+                      body=wapi_error('Client.Ibap.Proto',
+                                      'Reference not found'),
+                      status=404)
+        with self.assertRaises(infoblox.InfobloxGeneralException) as e:
+            self.iba_ipa.util.write('DELETE', self.network_ref)
+        self.assertEqual(str(e.exception), 'Reference not found')
+
+    @responses.activate
+    def test_error_on_put(self):
+        responses.add(responses.PUT, self.base_url + self.network_ref,
+                      body=wapi_error('Client.Ibap.Data',
+                                      'Invalid comment'),
+                      status=400)
+        with self.assertRaises(infoblox.InfobloxNotUpdatedException):
+            self.iba_ipa.util.put({'_ref': self.network_ref},
+                                  {'comment': 'x'})
+
+    @responses.activate
+    def test_error_on_paged_get(self):
+        responses.add(responses.GET, self.base_url + 'lease',
+                      body=wapi_error('Client.Ibap.Proto',
+                                      'Unknown argument/field: foo'),
+                      status=400)
+        with self.assertRaises(infoblox.InfobloxGeneralException) as e:
+            list(self.iba_ipa.iter_lease(fields=['foo']))
+        self.assertIn('foo', str(e.exception))
+
+    @responses.activate
+    def test_error_text_of_write_many(self):
+        responses.add(responses.DELETE, self.base_url + self.network_ref,
+                      body=wapi_error('Client.Ibap.Proto',
+                                      'Reference not found'),
+                      status=404)
+        self.assertEqual(list(self.iba_ipa.util.write_many(
+            [{'method': 'DELETE', 'object': self.network_ref}])),
+            ['Reference not found'])
+
+    @responses.activate
+    def test_other_errors_unchanged(self):
+        responses.add(responses.GET, self.base_url + 'record:host',
+                      body='<html>Internal Server Error</html>', status=500)
+        with self.assertRaises(HTTPError):
+            self.iba_ipa.get_host('host.example.com')
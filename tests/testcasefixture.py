@@ -1,3 +1,4 @@
+import json
 import os
 try:
     import unittest2 as unittest
@@ -6,6 +7,14 @@ except ImportError:
 
 from infoblox import infoblox
 
+# URL of the WAPI the fixture's iba_ipa object talks to
+BASE_URL = 'https://10.10.10.10/wapi/v1.6/'
+
+
+def page(objects):
+    """Body of a paged search response holding objects."""
+    return json.dumps({'result': objects})
+
 
 class TestCaseWithFixture(unittest.TestCase):
     location = os.path.dirname(__file__)